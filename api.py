@@ -1,22 +1,38 @@
 """FastAPI backend for WatchNext — mood-based movie recommendations."""
 
+import json
+import asyncio
 import time
 import logging
+from typing import Literal
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
 
-from core.mood_parser import parse_mood, _parse_mood_cached
-from core.tmdb_client import discover_movies, enrich_movies
-from core.recommender import rank_movies
-from core.ml.similar import SimilarMovies
-
+# Before importing core: its settings are read from the environment at import time
 load_dotenv()
 
+from core.metrics import observe, render, start_timings
+from core.mood_parser import mood_cache_info
+from core.request_log import REQUEST_LOG_PATH, flush as flush_request_log, flush_periodically, top_signatures
+from core.tmdb_client import (
+    CATALOG_INDEX_PATH,
+    DISCOVER_WARMUP_TOP,
+    close_clients,
+    load_catalog_index,
+    open_clients,
+    preload_people_async,
+    tmdb_cache_info,
+    warm_discover_cache_async,
+)
+from core.pipeline import recommend_cached, response_cache_info, stream_recommendation
+from core.ml.similar import SimilarMovies
+
 app = FastAPI(title="WatchNext", version="0.2.0")
 
 # V2 ML models — loaded once at startup
@@ -37,6 +53,20 @@ app.add_middleware(
 
 class RecommendRequest(BaseModel):
     mood: str
+    # "local" skips the GPT ranking call (templated explanations, ~ms instead of 1-3 s)
+    ranking: Literal["llm", "local"] = "llm"
+    # Return the per-stage latency breakdown (not part of the response cache key)
+    timings: bool = False
+    # Latency budget for this request; stages degrade instead of overrunning it (default RECOMMEND_BUDGET)
+    budget_ms: int | None = Field(default=None, ge=100, le=60_000)
+    # Movies never to recommend (e.g. already seen); Discover fetches more pages to make up for them
+    exclude_ids: list[int] = Field(default_factory=list, max_length=1000)
+
+
+class SimilarBatchRequest(BaseModel):
+    tmdb_ids: list[int] = Field(min_length=1, max_length=50)
+    # Per rail; each seed fetches metadata for up to 2n movies
+    n: int = Field(default=5, ge=1, le=20)
 
 
 @app.on_event("startup")
@@ -49,55 +79,137 @@ def load_ml_models():
         logger.warning(f"ML models not available: {e}")
 
 
+@app.on_event("startup")
+def open_tmdb_clients():
+    """One pooled TMDB client for the app lifetime — no TCP+TLS handshake per call."""
+    open_clients()
+
+
+@app.on_event("startup")
+def load_discover_index():
+    """Local catalogue index for Discover queries (CATALOG_INDEX_PATH) — built before the first request."""
+    if CATALOG_INDEX_PATH:
+        load_catalog_index()
+
+
+@app.on_event("startup")
+async def preload_people():
+    """Popular actors into the person index, in the background — startup doesn't wait on TMDB."""
+    app.state.preload_task = asyncio.create_task(preload_people_async())
+
+
+@app.on_event("startup")
+async def warm_discover_cache():
+    """Most common filter signatures of the request log into the Discover cache, in the background."""
+    signatures = await asyncio.to_thread(top_signatures, DISCOVER_WARMUP_TOP)
+    if signatures:
+        app.state.warmup_task = asyncio.create_task(warm_discover_cache_async(signatures))
+
+
+@app.on_event("startup")
+async def start_request_log_flusher():
+    """Background task writing the request log buffer every few seconds (record() only buffers)."""
+    if REQUEST_LOG_PATH:
+        app.state.request_log_task = asyncio.create_task(flush_periodically())
+
+
+@app.on_event("shutdown")
+async def close_tmdb_clients():
+    await close_clients()
+
+
+@app.on_event("shutdown")
+async def flush_request_log_buffer():
+    """Stop the flusher and write the request log lines still buffered."""
+    task = getattr(app.state, "request_log_task", None)
+    if task:
+        task.cancel()
+    await asyncio.to_thread(flush_request_log)
+
+
 @app.get("/health")
 def health():
-    cache_info = _parse_mood_cached.cache_info()
     return {
         "status": "ok",
         "version": "0.2.0",
-        "cache": {
-            "hits": cache_info.hits,
-            "misses": cache_info.misses,
-            "size": cache_info.currsize,
-            "maxsize": cache_info.maxsize,
-        },
+        "cache": mood_cache_info(),
+        "tmdb_cache": tmdb_cache_info(),
+        "response_cache": response_cache_info(),
+        "catalog": _ml_recommender.catalog_info(),
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint — stage latencies, upstream calls, cache hits."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/recommend")
-def recommend(req: RecommendRequest):
+async def recommend(req: RecommendRequest):
+    # Async end to end: while waiting on OpenAI/TMDB, the worker serves other requests
     t0 = time.time()
+    timings = start_timings()
 
     try:
-        # Step 1: GPT-4o-mini translates mood → TMDB filters
-        filters = parse_mood(req.mood)
-
-        # Step 2: TMDB Discover API returns 20 candidates
-        raw_movies = discover_movies(filters, limit=20)
-
-        # Step 3: Enrich with full details + streaming providers
-        candidates = enrich_movies(raw_movies, include_providers=True)
-
-        # Step 4: GPT-4o-mini ranks 20 → top 5 with explanations
-        movies = rank_movies(req.mood, candidates)
+        # Popular moods come straight from the response cache (see core/pipeline.py)
+        result, cache_status = await recommend_cached(
+            req.mood,
+            req.model_dump(exclude={"mood", "timings", "budget_ms"}),
+            budget_seconds=req.budget_ms / 1000 if req.budget_ms else None,
+        )
 
     except Exception as e:
         logger.error(f"Recommendation failed: {type(e).__name__}: {e}")
         raise HTTPException(status_code=502, detail=f"Recommendation engine error: {type(e).__name__}")
 
     latency = time.time() - t0
+    observe("watchnext_request_seconds", latency, endpoint="/recommend", cache=cache_status)
 
-    return {
+    response = {
         "mood": req.mood,
-        "filters_applied": filters,
-        "movies": movies,
-        "count": len(movies),
+        "filters_applied": result["filters_applied"],
+        "movies": result["movies"],
+        "count": len(result["movies"]),
         "latency": round(latency, 1),
+        "cache": cache_status,
+        "degraded": result.get("degraded", []),
     }
+    if req.timings:
+        response["timings"] = {**timings, "total_ms": round(latency * 1000, 1)}
+    return response
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/recommend/stream")
+async def recommend_stream(req: RecommendRequest):
+    """Server-sent events: filters → each candidate as it is enriched → each pick as GPT writes it → done."""
+    async def events():
+        t0 = time.time()
+        count = 0
+        try:
+            async for event, data in stream_recommendation(req.mood, ranking=req.ranking, exclude_ids=req.exclude_ids):
+                count += event == "pick"
+                yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"Recommendation stream failed: {type(e).__name__}: {e}")
+            yield _sse("error", {"detail": f"Recommendation engine error: {type(e).__name__}"})
+            return
+        yield _sse("done", {"mood": req.mood, "count": count, "latency": round(time.time() - t0, 1)})
+
+    # X-Accel-Buffering: stop nginx-style proxies from holding events back
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/movie/{tmdb_id}/similar")
-def get_similar_movies(tmdb_id: int, n: int = 5):
+def get_similar_movies(tmdb_id: int, n: int = Query(default=5, ge=1, le=20)):
     """V2 ML endpoint — returns content-based + collaborative recommendations."""
     t0 = time.time()
     result = _ml_recommender.get_recommendations(tmdb_id, n=n)
@@ -105,5 +217,23 @@ def get_similar_movies(tmdb_id: int, n: int = 5):
     if "error" in result:
         raise HTTPException(status_code=503, detail=result["error"])
 
-    result["latency"] = round(time.time() - t0, 1)
+    latency = time.time() - t0
+    observe("watchnext_request_seconds", latency, endpoint="/movie/{tmdb_id}/similar")
+    result["latency"] = round(latency, 1)
+    return result
+
+
+@app.post("/movies/similar:batch")
+def get_similar_movies_batch(req: SimilarBatchRequest):
+    """V2 ML endpoint — recommendations for many seed movies in one call (e.g. a page of carousels)."""
+    t0 = time.time()
+    result = _ml_recommender.get_recommendations_batch(req.tmdb_ids, n=req.n)
+
+    if "error" in result:
+        raise HTTPException(status_code=503, detail=result["error"])
+
+    latency = time.time() - t0
+    observe("watchnext_request_seconds", latency, endpoint="/movies/similar:batch")
+    result["count"] = len(result["results"])
+    result["latency"] = round(latency, 1)
     return result
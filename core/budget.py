@@ -0,0 +1,42 @@
+"""Request budget — a latency deadline carried through the pipeline stages.
+
+Without it, a slow TMDB or OpenAI call holds /recommend until the client
+timeouts fire and the request ends in a 502. A Budget starts when the request
+arrives; each stage asks how much time it may use (remaining time minus a
+reserve for the stages after it) and degrades instead of overrunning:
+
+- parse_mood: default filters (popular, well-rated movies)
+- discover_movies: nothing to fall back on — an empty, degraded response
+- enrich_movies: skip providers, then keep Discover-only data for stragglers
+- rank_movies: the local ranker instead of GPT-4o-mini
+
+Every degradation is recorded, so the response can say what was given up.
+"""
+
+import time
+import asyncio
+import logging
+
+from core.metrics import inc
+
+logger = logging.getLogger(__name__)
+
+
+class Budget:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.degraded = []  # [{"stage": ..., "reason": ...}]
+        self._deadline = time.monotonic() + seconds
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """Seconds left, keeping `reserve` seconds for the stages that come after."""
+        return max(self._deadline - time.monotonic() - reserve, 0.0)
+
+    async def run(self, awaitable, reserve: float = 0.0):
+        """Await within the budget (minus reserve); raises asyncio.TimeoutError when it runs out."""
+        return await asyncio.wait_for(awaitable, timeout=self.remaining(reserve))
+
+    def degrade(self, stage: str, reason: str):
+        logger.warning(f"Budget ({self.seconds}s): {stage} degraded — {reason}")
+        self.degraded.append({"stage": stage, "reason": reason})
+        inc("watchnext_degraded_total", stage=stage)
@@ -0,0 +1,548 @@
+"""Caches shared by the sync and async request paths.
+
+functools.lru_cache can only wrap a sync function, so an async caller cannot
+look up an entry without blocking on the wrapped call. The caches here expose
+explicit get/set instead, with the same hit/miss bookkeeping as lru_cache.
+
+- LRUCache: in-process, bounded by entry count, optional per-entry TTL.
+- SQLiteCache: same interface, stored on disk so it survives restarts and is
+  shared by every worker on the machine. Values must be JSON-serializable.
+- RedisCache: same interface on a Redis-compatible server (Redis, Valkey,
+  KeyDB, a local stand-in...), shared by every worker of the fleet.
+  Needs the optional `redis` package.
+- TieredCache: a small in-process L1 in front of a shared L2.
+- StaleWhileRevalidate: wraps any of the above for async callers — fresh
+  entries are served as-is, stale ones are served while a background task
+  recomputes them, misses are computed once (singleflight).
+
+Every cache also has aget/aset for async callers: the in-process LRU answers
+inline, SQLite runs in a worker thread and Redis uses its asyncio client, so
+a shared backend never blocks the event loop. LRUCache and SQLiteCache also
+read and write several keys at once (get_many/set_many and async twins) —
+for SQLite that is one query and one commit.
+
+The shared backends keep their hit/miss counters in the store itself, so
+info() reports the same fleet-wide numbers from every worker and they survive
+restarts. make_cache() picks a backend from configuration.
+"""
+
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from core.singleflight import AsyncSingleFlight
+
+try:
+    import redis
+    import redis.asyncio
+except ImportError:  # Optional: only needed for the "redis" backend
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value (and mark it recently used), or default on a miss."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] is not None and entry[0] <= time.time():
+                del self._data[key]  # Expired
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float | None = None):
+        """Store a value (expiring after ttl seconds if given), evicting the LRU entry when full."""
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    async def aget(self, key, default=None):
+        return self.get(key, default)
+
+    async def aset(self, key, value, ttl: float | None = None):
+        self.set(key, value, ttl=ttl)
+
+    def get_many(self, keys) -> dict:
+        """{key: value} for the keys that are cached (missing ones are left out)."""
+        values = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                values[key] = value
+        return values
+
+    def set_many(self, entries):
+        """Store (key, value, ttl) entries."""
+        for key, value, ttl in entries:
+            self.set(key, value, ttl=ttl)
+
+    async def aget_many(self, keys) -> dict:
+        return self.get_many(keys)
+
+    async def aset_many(self, entries):
+        self.set_many(entries)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict:
+        """Stats in the same shape /health reports."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+class SQLiteCache:
+    """On-disk LRU cache with per-entry TTL, backed by a single SQLite file.
+
+    WAL mode lets several uvicorn workers read and write the same file.
+    Eviction drops the least recently read rows once the table exceeds maxsize.
+    Hit/miss counters live in the same file, shared by every worker.
+
+    A lookup is a plain read: the access times and hit/miss counts it produces
+    are buffered in memory and written in one transaction at most every
+    _FLUSH_EVERY seconds (or with the next write), so readers never queue on
+    the SQLite writer lock.
+    """
+
+    # Evict in batches rather than on every write
+    _EVICT_EVERY = 100
+    # Seconds between flushes of the buffered access times and counters
+    _FLUSH_EVERY = 5.0
+
+    def __init__(self, path, maxsize: int = 50_000):
+        self.path = str(path)
+        self.maxsize = maxsize
+        self._writes = 0
+        self._accessed = {}  # key -> last read time, not yet written
+        self._counts = {"hits": 0, "misses": 0}  # not yet written
+        self._flushed_at = time.time()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+
+    def _flush(self, now: float):
+        """Write the buffered access times and hit/miss counts (caller holds the lock and commits)."""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+        for name, count in self._counts.items():
+            if count:
+                self._conn.execute(
+                    "INSERT INTO stats (name, value) VALUES (?, ?)"
+                    " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, count),
+                )
+                self._counts[name] = 0
+        self._flushed_at = now
+
+    @property
+    def hits(self) -> int:
+        return self._stat("hits")
+
+    @property
+    def misses(self) -> int:
+        return self._stat("misses")
+
+    def _stat(self, name: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM stats WHERE name = ?", (name,)).fetchone()
+            return (row[0] if row else 0) + self._counts[name]
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set(self, key, value, ttl: float | None = None):
+        self.set_many([(key, value, ttl)])
+
+    def get_many(self, keys) -> dict:
+        """{key: value} for the keys that are cached (missing ones are left out), in one query."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, value, expires_at FROM cache WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+            # Expired rows are left to the next eviction
+            values = {key: value for key, value, expires_at in rows if expires_at is None or expires_at > now}
+            self._counts["hits"] += len(values)
+            self._counts["misses"] += len(keys) - len(values)
+            for key in values:
+                self._accessed[key] = now
+            if now - self._flushed_at >= self._FLUSH_EVERY:
+                self._flush(now)
+                self._conn.commit()
+        return {key: json.loads(value) for key, value in values.items()}
+
+    def set_many(self, entries):
+        """Store (key, value, ttl) entries in one transaction."""
+        now = time.time()
+        rows = [
+            (key, json.dumps(value), now + ttl if ttl is not None else None, now)
+            for key, value, ttl in entries
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)", rows
+            )
+            before = self._writes
+            self._writes += len(rows)
+            self._flush(now)
+            if self._writes // self._EVICT_EVERY != before // self._EVICT_EVERY:
+                self._evict(now)
+            self._conn.commit()
+
+    async def aget(self, key, default=None):
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key, value, ttl: float | None = None):
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def aget_many(self, keys) -> dict:
+        return await asyncio.to_thread(self.get_many, keys)
+
+    async def aset_many(self, entries):
+        await asyncio.to_thread(self.set_many, entries)
+
+    def _evict(self, now: float):
+        """Drop expired rows, then the least recently read rows beyond maxsize."""
+        self._conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.execute("DELETE FROM stats")
+            self._conn.commit()
+            self._accessed.clear()
+            self._counts = {"hits": 0, "misses": 0}
+
+    def info(self) -> dict:
+        with self._lock:
+            self._flush(time.time())
+            self._conn.commit()
+            size = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            stats = dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+            return {
+                "hits": stats.get("hits", 0),
+                "misses": stats.get("misses", 0),
+                "size": size,
+                "maxsize": self.maxsize,
+            }
+
+
+class RedisCache:
+    """Cache on a Redis-compatible server, shared by every worker of every machine.
+
+    Keys are namespaced by `prefix`; expiry uses the server's own TTLs and
+    size is bounded by its maxmemory policy (so maxsize is informational).
+    A server outage degrades to cache misses rather than failing the request.
+
+    A lookup is one round trip: hit/miss counts are buffered in the worker and
+    sent along with a lookup at most every _FLUSH_EVERY seconds, into a
+    server-side hash. Size comes from a sorted set of key -> expiry kept
+    next to the entries (updated on set), not from scanning the keyspace.
+    """
+
+    # Seconds between flushes of the buffered hit/miss counts
+    _FLUSH_EVERY = 5.0
+
+    def __init__(self, url: str, prefix: str = "watchnext:", maxsize: int | None = None):
+        if redis is None:
+            raise RuntimeError("The redis cache backend needs the redis package (pip install redis)")
+        self.url = url
+        self.prefix = prefix
+        self.maxsize = maxsize
+        self._redis = redis.Redis.from_url(url)
+        self._async_redis = None  # Created on first async use, on the running event loop
+        self._stats_key = f"{prefix}__stats__"
+        self._keys_key = f"{prefix}__keys__"
+        self._counts = {"hits": 0, "misses": 0}  # not yet sent
+        self._flushed_at = time.time()
+        self._lock = threading.Lock()
+
+    def _get_async_redis(self):
+        if self._async_redis is None:
+            self._async_redis = redis.asyncio.Redis.from_url(self.url)
+        return self._async_redis
+
+    def _count(self, raw) -> dict:
+        """Buffer one hit/miss; return the counts to send now (empty until _FLUSH_EVERY has passed)."""
+        now = time.time()
+        with self._lock:
+            self._counts["misses" if raw is None else "hits"] += 1
+            if now - self._flushed_at < self._FLUSH_EVERY:
+                return {}
+            counts = {name: count for name, count in self._counts.items() if count}
+            self._counts = {"hits": 0, "misses": 0}
+            self._flushed_at = now
+            return counts
+
+    def _queue_stats(self, pipe, counts: dict):
+        for name, count in counts.items():
+            pipe.hincrby(self._stats_key, name, count)
+
+    def _queue_set(self, pipe, key, value, ttl: float | None):
+        now = time.time()
+        pipe.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000) if ttl else None)
+        pipe.zadd(self._keys_key, {key: now + ttl if ttl else "+inf"})
+        pipe.zremrangebyscore(self._keys_key, "-inf", now)  # Forget expired keys
+
+    def get(self, key, default=None):
+        try:
+            raw = self._redis.get(self.prefix + key)
+            counts = self._count(raw)
+            if counts:
+                pipe = self._redis.pipeline(transaction=False)
+                self._queue_stats(pipe, counts)
+                pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache unavailable: {type(e).__name__}")
+            return default
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl: float | None = None):
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            self._queue_set(pipe, key, value, ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache unavailable: {type(e).__name__}")
+
+    async def aget(self, key, default=None):
+        try:
+            raw = await self._get_async_redis().get(self.prefix + key)
+            counts = self._count(raw)
+            if counts:
+                pipe = self._get_async_redis().pipeline(transaction=False)
+                self._queue_stats(pipe, counts)
+                await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache unavailable: {type(e).__name__}")
+            return default
+        return default if raw is None else json.loads(raw)
+
+    async def aset(self, key, value, ttl: float | None = None):
+        try:
+            pipe = self._get_async_redis().pipeline(transaction=False)
+            self._queue_set(pipe, key, value, ttl)
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache unavailable: {type(e).__name__}")
+
+    def clear(self):
+        keys = list(self._redis.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self._redis.delete(*keys)
+        with self._lock:
+            self._counts = {"hits": 0, "misses": 0}
+
+    def info(self) -> dict:
+        with self._lock:
+            counts = self._counts
+            self._counts = {"hits": 0, "misses": 0}
+            self._flushed_at = time.time()
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            self._queue_stats(pipe, {name: count for name, count in counts.items() if count})
+            pipe.zremrangebyscore(self._keys_key, "-inf", time.time())
+            pipe.zcard(self._keys_key)
+            pipe.hgetall(self._stats_key)
+            *_, size, stats = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis cache unavailable: {type(e).__name__}")
+            return {"hits": None, "misses": None, "size": None, "maxsize": self.maxsize}
+        return {
+            "hits": int(stats.get(b"hits", 0)),
+            "misses": int(stats.get(b"misses", 0)),
+            "size": size,
+            "maxsize": self.maxsize,
+        }
+
+
+def make_cache(backend: str = "memory", url: str | None = None, maxsize: int = 512, prefix: str = "watchnext:"):
+    """Build a cache from configuration.
+
+    backend: "memory" (per-process LRUCache), "sqlite" (url = file path) or
+    "redis" (url = redis://host:port/db). The two shared backends add hit
+    rates up across workers and keep entries across restarts.
+    """
+    if backend == "memory":
+        return LRUCache(maxsize=maxsize)
+    if backend == "sqlite":
+        if not url:
+            raise ValueError("The sqlite cache backend needs a file path")
+        return SQLiteCache(url, maxsize=maxsize)
+    if backend == "redis":
+        return RedisCache(url or "redis://localhost:6379/0", prefix=prefix, maxsize=maxsize)
+    raise ValueError(f"Unknown cache backend: {backend!r} (expected memory, sqlite or redis)")
+
+
+class TieredCache:
+    """L1 (in-process LRU) in front of an optional L2 (e.g. SQLiteCache shared by all workers)."""
+
+    def __init__(self, l1, l2=None):
+        self.l1 = l1
+        self.l2 = l2
+
+    def get(self, key, default=None):
+        value = self.l1.get(key, _MISSING)
+        if value is _MISSING and self.l2 is not None:
+            value = self.l2.get(key, _MISSING)
+            if value is not _MISSING:
+                self.l1.set(key, value)  # Promote (entries carry their own expiry)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl: float | None = None):
+        self.l1.set(key, value, ttl=ttl)
+        if self.l2 is not None:
+            self.l2.set(key, value, ttl=ttl)
+
+    async def aget(self, key, default=None):
+        value = self.l1.get(key, _MISSING)
+        if value is _MISSING and self.l2 is not None:
+            value = await self.l2.aget(key, _MISSING)
+            if value is not _MISSING:
+                self.l1.set(key, value)
+        return default if value is _MISSING else value
+
+    async def aset(self, key, value, ttl: float | None = None):
+        self.l1.set(key, value, ttl=ttl)
+        if self.l2 is not None:
+            await self.l2.aset(key, value, ttl=ttl)
+
+    def clear(self):
+        self.l1.clear()
+        if self.l2 is not None:
+            self.l2.clear()
+
+    def info(self) -> dict:
+        info = {"l1": self.l1.info()}
+        if self.l2 is not None:
+            info["l2"] = self.l2.info()
+        return info
+
+
+class StaleWhileRevalidate:
+    """Async get-or-compute with TTL and stale-while-revalidate on top of a cache.
+
+    An entry is fresh for `ttl` seconds, then stale for `stale_ttl` more:
+    a stale hit is returned immediately and refreshed by a background task.
+    After that it is gone and the next caller computes it (concurrent misses
+    share one computation). Values rejected by `cacheable` are returned but
+    not stored (e.g. degraded responses).
+    """
+
+    def __init__(self, store, ttl: float, stale_ttl: float, cacheable=None):
+        self.store = store
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.cacheable = cacheable
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._flight = AsyncSingleFlight()
+        self._refreshing = set()  # Strong refs so background tasks aren't garbage-collected
+
+    async def get_or_compute(self, key: str, compute) -> tuple:
+        """Return (value, status) where status is "hit", "stale" or "miss"."""
+        entry = await self.store.aget(key)
+        now = time.time()
+
+        if entry is not None and now < entry["stale_until"]:
+            if now < entry["fresh_until"]:
+                self.fresh_hits += 1
+                return entry["value"], "hit"
+            self.stale_hits += 1
+            self._refresh_in_background(key, compute)
+            return entry["value"], "stale"
+
+        self.misses += 1
+        value = await self._flight.do(key, lambda: self._compute_and_store(key, compute))
+        return value, "miss"
+
+    async def _compute_and_store(self, key: str, compute):
+        value = await compute()
+        if self.cacheable is not None and not self.cacheable(value):
+            return value
+        now = time.time()
+        await self.store.aset(
+            key,
+            {"value": value, "fresh_until": now + self.ttl, "stale_until": now + self.ttl + self.stale_ttl},
+            ttl=self.ttl + self.stale_ttl,
+        )
+        return value
+
+    def _refresh_in_background(self, key: str, compute):
+        async def refresh():
+            try:
+                await self._flight.do(key, lambda: self._compute_and_store(key, compute))
+            except Exception as e:
+                logger.warning(f"Background refresh failed for '{key[:50]}': {type(e).__name__}")
+
+        task = asyncio.ensure_future(refresh())
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    def info(self) -> dict:
+        return {
+            "hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "store": self.store.info(),
+        }
@@ -0,0 +1,195 @@
+"""Local ranker — picks the top 5 of the candidates without an LLM call.
+
+The low-latency alternative to recommender.rank_movies (ranking="local" on
+/recommend): a few milliseconds instead of a 1-3 s GPT-4o-mini round trip.
+Same output shape: 5 movie dicts, each with a templated "why".
+
+How it works:
+1. Each candidate gets a weighted score against the parsed filters:
+   genre overlap, rating, runtime fit, provider match, and mood ↔ overview
+   text similarity (hashed n-gram vectors, as in the semantic mood cache —
+   the TF-IDF vocabulary of ContentBasedModel isn't persisted, so the mood
+   can't be projected into its space)
+2. Picks are made greedily, best score first, with diversity penalties:
+   a genre combination already picked, or a second animated movie when
+   animation wasn't asked for (the same rules the LLM prompt gives GPT)
+3. "why" strings are filled from templates, in French when the mood is French
+"""
+
+import re
+
+from core.metrics import timed
+from core.mood_parser import PROVIDER_MAP
+from core.semantic_cache import embed
+from core.tmdb_client import GENRE_ID_TO_NAME
+
+TOP_N = 5
+
+WEIGHTS = {
+    "genre": 0.35,
+    "rating": 0.25,
+    "text": 0.20,
+    "runtime": 0.10,
+    "provider": 0.10,
+}
+
+# Diversity penalties (subtracted from the score of a not-yet-picked candidate)
+SAME_GENRES_PENALTY = 0.08
+EXTRA_ANIMATION_PENALTY = 0.15
+
+_FRENCH_MARKERS = {
+    "un", "une", "des", "le", "la", "les", "du", "pour", "avec", "je", "veux", "ce",
+    "soir", "quelque", "chose", "qui", "pas", "envie", "triste", "policier",
+}
+
+_TEMPLATES = {
+    "en": {
+        "genre": "A {genres} pick that fits what you asked for",
+        "rating": "rated {rating}/10",
+        "runtime": "{runtime} min",
+        "provider": "streaming on {provider}",
+        "themes": "Its story touches on {themes}.",
+    },
+    "fr": {
+        "genre": "Un film {genres} qui colle à ton envie",
+        "rating": "noté {rating}/10",
+        "runtime": "{runtime} min",
+        "provider": "dispo sur {provider}",
+        "themes": "L'histoire parle de {themes}.",
+    },
+}
+
+_GENRE_FR = {
+    "Action": "d'action", "Adventure": "d'aventure", "Animation": "d'animation",
+    "Comedy": "comique", "Crime": "policier", "Documentary": "documentaire",
+    "Drama": "dramatique", "Family": "familial", "Fantasy": "fantastique",
+    "History": "historique", "Horror": "d'horreur", "Music": "musical",
+    "Mystery": "à mystère", "Romance": "romantique", "Science Fiction": "de science-fiction",
+    "Thriller": "à suspense", "War": "de guerre", "Western": "western",
+}
+
+
+def _provider_key(name: str) -> str:
+    """"Disney Plus" / "Disney+" → "disney" so TMDB and PROVIDER_MAP names compare equal."""
+    return re.sub(r"(\+| plus)$", "", name.strip().lower()).strip()
+
+
+_PROVIDER_ID_TO_KEY = {pid: _provider_key(name) for name, pid in PROVIDER_MAP.items()}
+
+
+def _language(mood: str) -> str:
+    """"fr" for French moods (accents or French function words), else "en"."""
+    mood = mood.lower()
+    if re.search(r"[éèêàçùôî]", mood):
+        return "fr"
+    words = set(re.findall(r"\w+", mood))
+    return "fr" if len(words & _FRENCH_MARKERS) >= 2 else "en"
+
+
+def _ids(value) -> list[int]:
+    """'35|10749' → [35, 10749] (filters hold pipe-separated ids)."""
+    return [int(part) for part in str(value or "").replace(",", "|").split("|") if part.strip().isdigit()]
+
+
+def _runtime_fit(runtime: int, filters: dict) -> float:
+    """1.0 inside the requested runtime bounds, decaying to 0 an hour outside them."""
+    low = filters.get("with_runtime_gte")
+    high = filters.get("with_runtime_lte")
+    if not runtime or (low is None and high is None):
+        return 1.0
+    gap = max((low or 0) - runtime, runtime - (high or runtime), 0)
+    return max(0.0, 1.0 - gap / 60)
+
+
+def _score(movie: dict, mood_vec, wanted_genres: set, wanted_providers: set, filters: dict) -> tuple[float, dict]:
+    genres = set(movie.get("genres", []))
+    providers = {_provider_key(p["name"]): p["name"] for p in movie.get("providers", [])}
+    matched_providers = [name for key, name in providers.items() if key in wanted_providers]
+
+    parts = {
+        "genre": len(genres & wanted_genres) / len(wanted_genres) if wanted_genres else 1.0,
+        "rating": min(float(movie.get("rating") or 0), 10.0) / 10,
+        "text": max(0.0, float(embed(f"{movie.get('title', '')} {movie.get('overview', '')}") @ mood_vec)),
+        "runtime": _runtime_fit(movie.get("runtime") or 0, filters),
+        "provider": (1.0 if matched_providers else 0.0) if wanted_providers else 1.0,
+    }
+    score = sum(WEIGHTS[name] * value for name, value in parts.items())
+    return score, {"matched_providers": matched_providers}
+
+
+def _themes(mood: str, overview: str) -> list[str]:
+    """Mood words that also appear in the overview (longest first)."""
+    overview_words = set(re.findall(r"\w+", overview.lower()))
+    mood_words = [w for w in re.findall(r"\w+", mood.lower()) if len(w) > 3 and w in overview_words]
+    return sorted(dict.fromkeys(mood_words), key=len, reverse=True)[:2]
+
+
+def _why(mood: str, movie: dict, wanted_genres: set, matched_providers: list[str], lang: str) -> str:
+    t = _TEMPLATES[lang]
+    genres = [g for g in movie.get("genres", []) if g in wanted_genres] or movie.get("genres", [])[:2]
+    if lang == "fr":
+        genres_str = " et ".join(_GENRE_FR.get(g, g.lower()) for g in genres[:2])
+    else:
+        genres_str = "/".join(g.lower() for g in genres[:2])
+
+    details = [t["rating"].format(rating=movie.get("rating"))]
+    if movie.get("runtime"):
+        details.append(t["runtime"].format(runtime=movie["runtime"]))
+    if matched_providers:
+        details.append(t["provider"].format(provider=matched_providers[0]))
+
+    why = f"{t['genre'].format(genres=genres_str)} — {', '.join(details)}."
+    themes = _themes(mood, movie.get("overview", ""))
+    if themes:
+        why += " " + t["themes"].format(themes=" & ".join(themes))
+    return why
+
+
+@timed("rank_movies_local")
+def rank_movies_local(mood: str, candidates: list[dict], filters: dict) -> list[dict]:
+    """Rank candidate movies and pick the top 5 with templated explanations.
+
+    Args:
+        mood: Original user mood string.
+        candidates: List of enriched movie dicts (from enrich_movies).
+        filters: The parsed mood filters (from parse_mood).
+
+    Returns:
+        List of up to 5 movie dicts, each with an added "why" field.
+    """
+    wanted_genres = {GENRE_ID_TO_NAME[g] for g in _ids(filters.get("with_genres")) if g in GENRE_ID_TO_NAME}
+    wanted_providers = {_PROVIDER_ID_TO_KEY[p] for p in _ids(filters.get("with_watch_providers")) if p in _PROVIDER_ID_TO_KEY}
+    mood_vec = embed(mood)
+
+    # Step 1: score every candidate once (duplicate ids keep their first entry)
+    scored = {}
+    for movie in candidates:
+        if movie["id"] not in scored:
+            scored[movie["id"]] = (movie, *_score(movie, mood_vec, wanted_genres, wanted_providers, filters))
+
+    # Step 2: greedy picks with diversity penalties
+    picked = []
+    picked_genre_sets = []
+    animation_picked = False
+    while scored and len(picked) < TOP_N:
+        def adjusted(item):
+            movie, score, _ = item
+            genres = frozenset(movie.get("genres", []))
+            if genres in picked_genre_sets:
+                score -= SAME_GENRES_PENALTY
+            if animation_picked and "Animation" in genres and "Animation" not in wanted_genres:
+                score -= EXTRA_ANIMATION_PENALTY
+            return score
+
+        movie, _, extra = max(scored.values(), key=adjusted)
+        del scored[movie["id"]]
+        picked_genre_sets.append(frozenset(movie.get("genres", [])))
+        animation_picked = animation_picked or "Animation" in movie.get("genres", [])
+        picked.append((movie, extra))
+
+    # Step 3: templated explanations, in the mood's language
+    lang = _language(mood)
+    return [
+        {**movie, "why": _why(mood, movie, wanted_genres, extra["matched_providers"], lang)}
+        for movie, extra in picked
+    ]
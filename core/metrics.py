@@ -0,0 +1,160 @@
+"""Metrics — per-stage latency, upstream calls and cache hits, in Prometheus text format.
+
+A slow /recommend can be the OpenAI parse, TMDB Discover, enrichment or the
+GPT ranking. Each stage function is wrapped with @timed(stage), each upstream
+call is counted with count_upstream() and each cache lookup with count_cache().
+
+Two views of the same measurements:
+- process-wide: histograms + counters rendered by render() for GET /metrics
+  (no prometheus_client dependency; the text format is simple enough)
+- per request: start_timings() opens a breakdown in a ContextVar, which every
+  timer and counter running in that request's context (tasks included) fills;
+  /recommend returns it when asked for timings
+"""
+
+import re
+import time
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds — covers cache hits (ms) up to a slow LLM call (s)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_HELP = {
+    "watchnext_stage_seconds": ("histogram", "Time spent in one pipeline stage"),
+    "watchnext_request_seconds": ("histogram", "End-to-end request latency"),
+    "watchnext_upstream_calls_total": ("counter", "Calls made to upstream APIs"),
+    "watchnext_cache_lookups_total": ("counter", "Cache lookups by cache and result"),
+    "watchnext_degraded_total": ("counter", "Stages degraded to stay within the request budget"),
+}
+
+_request_timings = ContextVar("request_timings", default=None)
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+
+
+# ─── Per-request breakdown ───────────────────────────────────────────────────
+
+def start_timings() -> dict:
+    """Open a per-request breakdown; stages and upstream calls in this context are added to it."""
+    timings = {"stages_ms": {}, "upstream_calls": {}, "cache": {}}
+    _request_timings.set(timings)
+    return timings
+
+
+def _add_stage(stage: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        stages = timings["stages_ms"]
+        stages[stage] = round(stages.get(stage, 0) + seconds * 1000, 1)
+
+
+# ─── Instrumentation helpers ─────────────────────────────────────────────────
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a block as one pipeline stage."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        observe("watchnext_stage_seconds", elapsed, stage=stage)
+        _add_stage(stage, elapsed)
+
+
+def timed(stage: str):
+    """Decorator: time every call of a sync or async function as `stage`."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage_timer(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count_upstream(service: str, endpoint: str):
+    """Count one call to an upstream API (TMDB paths are templated: /movie/{id})."""
+    endpoint = re.sub(r"/\d+", "/{id}", endpoint)
+    inc("watchnext_upstream_calls_total", service=service, endpoint=endpoint)
+    timings = _request_timings.get()
+    if timings is not None:
+        calls = timings["upstream_calls"]
+        calls[service] = calls.get(service, 0) + 1
+
+
+def count_cache(cache: str, result: str):
+    """Count one cache lookup — result is "hit", "miss" or "stale"."""
+    inc("watchnext_cache_lookups_total", cache=cache, result=result)
+    timings = _request_timings.get()
+    if timings is not None:
+        results = timings["cache"].setdefault(cache, {})
+        results[result] = results.get(result, 0) + 1
+
+
+# ─── Exposition ──────────────────────────────────────────────────────────────
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = [f'{k}="{str(v)}"' for k, v in labels + extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(hist) for key, hist in _histograms.items()}
+
+    lines = []
+    for name, (kind, help_text) in _HELP.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        else:
+            for (metric, labels), hist in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(BUCKETS, hist):
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {hist[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {round(hist[-2], 6)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {hist[-1]}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,122 @@
+"""
+Model artifact format — plain .npy files + a versioned manifest, no pickle.
+
+Layout of models/:
+    manifest.json            {"format_version": 1, "arrays": {name: {dtype, shape}}, "csr": {name: {shape}}}
+    <name>.npy               one file per array
+    <name>_data/_indices/_indptr.npy   the 3 components of a sparse CSR matrix
+
+Why: np.load(mmap_mode="r") maps each file straight from the OS page cache.
+N uvicorn workers share the same physical pages instead of each unpickling a
+private copy, and loading is a few syscalls instead of a full parse.
+"""
+
+import json
+from pathlib import Path
+import numpy as np
+from scipy.sparse import csr_matrix
+from .idmap import IdMap
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def _read_manifest(models_dir):
+    path = Path(models_dir) / MANIFEST_FILE
+    if not path.exists():
+        return {"format_version": FORMAT_VERSION, "arrays": {}, "csr": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(models_dir, manifest):
+    with open(Path(models_dir) / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _check_version(models_dir):
+    path = Path(models_dir) / MANIFEST_FILE
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No {MANIFEST_FILE} in {models_dir} — run scripts/train_models.py "
+            "(or scripts/convert_models.py for old pickle models)"
+        )
+    manifest = _read_manifest(models_dir)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Model format version {manifest.get('format_version')} "
+            f"not supported (expected {FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def save_arrays(models_dir, arrays):
+    """Write each array to <name>.npy and register it in the manifest."""
+    models_dir = Path(models_dir)
+    models_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(models_dir)
+    manifest["format_version"] = FORMAT_VERSION
+
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        np.save(models_dir / f"{name}.npy", array)
+        manifest["arrays"][name] = {"dtype": str(array.dtype), "shape": list(array.shape)}
+
+    _write_manifest(models_dir, manifest)
+
+
+def save_csr(models_dir, name, matrix):
+    """Write a sparse CSR matrix as 3 arrays (data, indices, indptr)."""
+    matrix = csr_matrix(matrix)
+    save_arrays(models_dir, {
+        f"{name}_data": matrix.data,
+        f"{name}_indices": matrix.indices,
+        f"{name}_indptr": matrix.indptr,
+    })
+    manifest = _read_manifest(models_dir)
+    manifest["csr"][name] = {"shape": list(matrix.shape)}
+    _write_manifest(models_dir, manifest)
+
+
+def has_arrays(models_dir, *names):
+    """True if every named array is registered in the manifest."""
+    manifest = _read_manifest(models_dir)
+    return all(name in manifest["arrays"] for name in names)
+
+
+def load_arrays(models_dir, *names, mmap=True):
+    """Load named arrays, memory-mapped read-only by default. Returns a tuple in the given order."""
+    models_dir = Path(models_dir)
+    manifest = _check_version(models_dir)
+
+    arrays = []
+    for name in names:
+        if name not in manifest["arrays"]:
+            raise KeyError(f"Array '{name}' missing from {models_dir / MANIFEST_FILE}")
+        arrays.append(np.load(models_dir / f"{name}.npy", mmap_mode="r" if mmap else None))
+    return tuple(arrays)
+
+
+def load_csr(models_dir, name, mmap=True):
+    """Rebuild a CSR matrix on top of its (memory-mapped) components, without copying them."""
+    manifest = _check_version(models_dir)
+    if name not in manifest["csr"]:
+        raise KeyError(f"Sparse matrix '{name}' missing from {Path(models_dir) / MANIFEST_FILE}")
+
+    data, indices, indptr = load_arrays(
+        models_dir, f"{name}_data", f"{name}_indices", f"{name}_indptr", mmap=mmap
+    )
+    return csr_matrix((data, indices, indptr), shape=tuple(manifest["csr"][name]["shape"]), copy=False)
+
+
+def save_mapping(models_dir, name, mapping):
+    """Write an IdMap (or int -> int dict) as two arrays sorted by key (<name>_keys, <name>_values)."""
+    if not isinstance(mapping, IdMap):
+        mapping = IdMap.from_pairs(list(mapping.keys()), list(mapping.values()))
+    keys, values = mapping.to_arrays()
+    save_arrays(models_dir, {f"{name}_keys": keys, f"{name}_values": values})
+
+
+def load_mapping(models_dir, name, mmap=True):
+    """Load an IdMap written by save_mapping, backed by the (memory-mapped) arrays."""
+    return IdMap(*load_arrays(models_dir, f"{name}_keys", f"{name}_values", mmap=mmap))
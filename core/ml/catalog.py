@@ -0,0 +1,136 @@
+"""
+Movie catalogue — local metadata for the /similar rails, built at training time.
+
+The rails used to call TMDB /movie/{id} for every recommended movie on every
+request. scripts/train_models.py already fetches that data for the whole
+content-based corpus, so it also writes models/catalog.sqlite: one row per
+movie with the fields a rail entry needs (title, genres, rating, runtime,
+release date, overview, poster path) and the time it was fetched.
+
+Rows are trimmed TMDB /movie/{id} payloads, turned into entries by the same
+parse_movie as everything else, so a rail looks the same whether it came from
+the catalogue or from TMDB. SQLite (WAL) lets every uvicorn worker read the
+same file and see the rows the others wrote through.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from core.tmdb_client import parse_movie
+
+CATALOG_FILE = "catalog.sqlite"
+
+_COLUMNS = ("title", "genres", "vote_average", "runtime", "release_date", "overview", "poster_path")
+
+
+def _row(data):
+    """(id, *columns) from a /movie/{id} payload (genres as objects) or a training cache entry (names)."""
+    genres = [g["name"] if isinstance(g, dict) else g for g in data.get("genres", [])]
+    return (
+        data["id"],
+        data.get("title", ""),
+        json.dumps(genres),
+        data.get("vote_average", 0),
+        data.get("runtime", 0),
+        data.get("release_date") or "",
+        data.get("overview", ""),
+        data.get("poster_path"),
+    )
+
+
+def _payload(row):
+    tmdb_id, title, genres, vote_average, runtime, release_date, overview, poster_path = row
+    return {
+        "id": tmdb_id,
+        "title": title,
+        "genres": [{"name": g} for g in json.loads(genres)],
+        "vote_average": vote_average,
+        "runtime": runtime,
+        "release_date": release_date,
+        "overview": overview,
+        "poster_path": poster_path,
+    }
+
+
+class Catalog:
+    """TMDB ID → movie metadata, in one SQLite file."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS movies ("
+                " id INTEGER PRIMARY KEY,"
+                " title TEXT NOT NULL,"
+                " genres TEXT NOT NULL,"
+                " vote_average REAL,"
+                " runtime INTEGER,"
+                " release_date TEXT,"
+                " overview TEXT,"
+                " poster_path TEXT,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get_many(self, tmdb_ids, max_age):
+        """Entries for the known IDs + the IDs whose row is older than max_age seconds.
+
+        Returns ({tmdb_id: entry}, [stale tmdb_id, ...]). Stale rows are still
+        returned — the caller decides whether to refresh them.
+        """
+        tmdb_ids = list(tmdb_ids)
+        if not tmdb_ids:
+            return {}, []
+
+        placeholders = ",".join("?" * len(tmdb_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(_COLUMNS)}, updated_at FROM movies WHERE id IN ({placeholders})",
+                tmdb_ids,
+            ).fetchall()
+
+        cutoff = time.time() - max_age
+        entries = {row[0]: parse_movie(_payload(row[:-1])) for row in rows}
+        stale = [row[0] for row in rows if row[-1] < cutoff]
+        self.hits += len(entries)
+        self.misses += len(tmdb_ids) - len(entries)
+        self.stale += len(stale)
+        return entries, stale
+
+    def put_many(self, payloads, updated_at=None):
+        """Insert or replace one row per payload (updated_at=0 marks the rows stale)."""
+        updated_at = time.time() if updated_at is None else updated_at
+        rows = [(*_row(data), updated_at) for data in payloads]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO movies (id, {', '.join(_COLUMNS)}, updated_at)"
+                f" VALUES ({','.join('?' * (len(_COLUMNS) + 2))})",
+                rows,
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    def info(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
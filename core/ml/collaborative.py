@@ -15,35 +15,55 @@ Key difference from content-based:
 - Content-based says "these movies have similar synopses/genres/actors"
 - Collaborative says "the same type of people tend to like both these movies"
   (even if the movies look nothing alike on paper)
+
+Serving: item factors are L2-normalised once at training time, so cosine
+similarity is a single dot product. Batch queries score all seeds in one
+matrix product.
 """
 
-import pickle
 from pathlib import Path
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+from .artifacts import load_arrays, load_mapping
+from .idmap import IdMap
+from .topk import top_k
 
 MODELS_DIR = Path(__file__).parent.parent.parent / "models"
 
 
+def normalize_factors(item_factors):
+    """L2-normalise each movie's factor vector (all-zero rows stay zero, like sklearn)."""
+    norms = np.linalg.norm(item_factors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (item_factors / norms).astype(np.float32)
+
+
 class CollaborativeModel:
     def __init__(self):
-        self.item_factors = None
+        self.normed_factors = None  # unit-length rows: cosine = dot product
         self.movie_to_idx = None
-        self.idx_to_movie = None
+        self.idx_to_movie = None  # array: factor row -> MovieLens ID
         self.ml_to_tmdb = None
         self.tmdb_to_ml = None
 
     def load(self):
-        """Load pre-trained SVD item factors and ID mappings from disk."""
-        with open(MODELS_DIR / "cf_item_factors.pkl", "rb") as f:
-            self.item_factors = pickle.load(f)
-        with open(MODELS_DIR / "cf_movie_to_idx.pkl", "rb") as f:
-            self.movie_to_idx = pickle.load(f)
-        with open(MODELS_DIR / "cf_idx_to_movie.pkl", "rb") as f:
-            self.idx_to_movie = pickle.load(f)
-        with open(MODELS_DIR / "ml_to_tmdb.pkl", "rb") as f:
-            self.ml_to_tmdb = pickle.load(f)
-        with open(MODELS_DIR / "tmdb_to_ml.pkl", "rb") as f:
-            self.tmdb_to_ml = pickle.load(f)
+        """Memory-map pre-trained SVD item factors and ID mappings from disk."""
+        self.normed_factors, self.idx_to_movie = load_arrays(MODELS_DIR, "cf_normed_factors", "cf_movie_ids")
+        self.movie_to_idx = IdMap.from_pairs(self.idx_to_movie, np.arange(len(self.idx_to_movie)))
+        self.ml_to_tmdb = load_mapping(MODELS_DIR, "ml_to_tmdb")
+        self.tmdb_to_ml = load_mapping(MODELS_DIR, "tmdb_to_ml")
+
+    def _factor_rows(self, tmdb_ids):
+        """Rows of TMDB movies in the factor matrix (-1 if not in MovieLens), vectorised."""
+        ml_ids = self.tmdb_to_ml.translate(tmdb_ids)
+        return self.movie_to_idx.translate(ml_ids)
+
+    def _to_results(self, sims, top_indices):
+        rec_tmdb_ids = self.ml_to_tmdb.translate(self.idx_to_movie[top_indices])
+        return [
+            {"tmdb_id": int(rec_tmdb_id), "score": round(float(sims[i]), 4)}
+            for i, rec_tmdb_id in zip(top_indices, rec_tmdb_ids)
+            if rec_tmdb_id > 0
+        ]
 
     def get_also_liked(self, tmdb_id, n=5):
         """
@@ -52,29 +72,46 @@ class CollaborativeModel:
         Returns a list of dicts: [{"tmdb_id": int, "score": float}, ...]
         Returns empty list if the movie is not in MovieLens.
         """
-        if self.item_factors is None:
+        if self.normed_factors is None:
             return []
 
-        # Convert TMDB ID to MovieLens ID
+        # Convert TMDB ID to MovieLens ID, then to factor row
         ml_id = self.tmdb_to_ml.get(tmdb_id)
         if ml_id is None or ml_id not in self.movie_to_idx:
             return []
-
         idx = self.movie_to_idx[ml_id]
-        movie_vec = self.item_factors[idx].reshape(1, -1)
 
-        sims = cosine_similarity(movie_vec, self.item_factors)[0]
+        sims = self.normed_factors @ self.normed_factors[idx]
 
         # Top N, excluding the movie itself
-        top_indices = sims.argsort()[::-1][1 : n + 1]
+        top_indices = top_k(sims, n, exclude=idx)
+        return self._to_results(sims, top_indices)
+
+    def get_also_liked_batch(self, tmdb_ids, n=5):
+        """
+        Batch version of get_also_liked — all seeds scored in one matrix product.
+
+        Returns one result list per input ID, in input order
+        (empty list for movies not in MovieLens).
+        """
+        if self.normed_factors is None:
+            return [[] for _ in tmdb_ids]
+
+        idxs = self._factor_rows(tmdb_ids)
+        known = idxs[idxs >= 0]
+        if not len(known):
+            return [[] for _ in tmdb_ids]
+
+        # (n_seeds, k) @ (k, n_movies) -> one score row per seed
+        sims = self.normed_factors[known] @ self.normed_factors.T
+        top = top_k(sims, n, exclude=known)
 
+        rows = iter(range(len(known)))
         results = []
-        for i in top_indices:
-            rec_ml_id = self.idx_to_movie[i]
-            rec_tmdb_id = self.ml_to_tmdb.get(rec_ml_id)
-            if rec_tmdb_id:
-                results.append({
-                    "tmdb_id": rec_tmdb_id,
-                    "score": round(float(sims[i]), 4),
-                })
+        for idx in idxs:
+            if idx < 0:
+                results.append([])
+            else:
+                row = next(rows)
+                results.append(self._to_results(sims[row], top[row]))
         return results
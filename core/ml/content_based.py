@@ -12,11 +12,19 @@ How it works:
 
 Genres are repeated 3x so they weigh more than random word overlaps in the synopsis.
 This prevents a thriller from matching a comedy just because both mention "family".
+
+Serving: the training script precomputes each movie's top-K neighbours
+(cb_neighbor_*.npy), so a request is a row lookup instead of scoring the whole
+corpus. Live cosine scoring is only used when a caller asks for more than K,
+or when the neighbour file is missing.
 """
 
-import pickle
 from pathlib import Path
+import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
+from .artifacts import has_arrays, load_arrays, load_csr
+from .idmap import IdMap
+from .topk import top_k
 
 MODELS_DIR = Path(__file__).parent.parent.parent / "models"
 
@@ -26,15 +34,20 @@ class ContentBasedModel:
         self.tfidf_matrix = None
         self.tmdb_ids = None
         self.tmdb_id_to_idx = None
+        self.neighbor_indices = None  # (n_movies, K) corpus indices, best first
+        self.neighbor_scores = None   # (n_movies, K) matching cosine scores
 
     def load(self):
-        """Load pre-trained TF-IDF matrix and ID mappings from disk."""
-        with open(MODELS_DIR / "cb_tfidf_matrix.pkl", "rb") as f:
-            self.tfidf_matrix = pickle.load(f)
-        with open(MODELS_DIR / "cb_tmdb_ids.pkl", "rb") as f:
-            self.tmdb_ids = pickle.load(f)
+        """Memory-map the pre-trained TF-IDF matrix, IDs and neighbour table from disk."""
+        self.tfidf_matrix = load_csr(MODELS_DIR, "cb_tfidf")
+        (self.tmdb_ids,) = load_arrays(MODELS_DIR, "cb_tmdb_ids")
+
+        self.tmdb_id_to_idx = IdMap.from_pairs(self.tmdb_ids, np.arange(len(self.tmdb_ids)))
 
-        self.tmdb_id_to_idx = {tid: i for i, tid in enumerate(self.tmdb_ids)}
+        if has_arrays(MODELS_DIR, "cb_neighbor_indices", "cb_neighbor_scores"):
+            self.neighbor_indices, self.neighbor_scores = load_arrays(
+                MODELS_DIR, "cb_neighbor_indices", "cb_neighbor_scores"
+            )
 
     def get_similar(self, tmdb_id, n=5):
         """
@@ -50,14 +63,58 @@ class ContentBasedModel:
             return []
 
         idx = self.tmdb_id_to_idx[tmdb_id]
+
+        # Fast path: precomputed neighbours, O(K)
+        if self.neighbor_indices is not None and n <= self.neighbor_indices.shape[1]:
+            return [
+                {"tmdb_id": int(self.tmdb_ids[i]), "score": round(float(score), 4)}
+                for i, score in zip(self.neighbor_indices[idx, :n], self.neighbor_scores[idx, :n])
+            ]
+
         sim_scores = cosine_similarity(
             self.tfidf_matrix[idx : idx + 1], self.tfidf_matrix
         )[0]
 
         # Top N, excluding the movie itself
-        top_indices = sim_scores.argsort()[::-1][1 : n + 1]
+        top_indices = top_k(sim_scores, n, exclude=idx)
 
         return [
-            {"tmdb_id": self.tmdb_ids[i], "score": round(float(sim_scores[i]), 4)}
+            {"tmdb_id": int(self.tmdb_ids[i]), "score": round(float(sim_scores[i]), 4)}
             for i in top_indices
         ]
+
+    def get_similar_batch(self, tmdb_ids, n=5):
+        """
+        Batch version of get_similar — one result list per input ID, in input order.
+
+        Served from the neighbour table when possible; otherwise all seeds are
+        scored in a single sparse matrix-matrix product.
+        """
+        if self.tfidf_matrix is None:
+            return [[] for _ in tmdb_ids]
+
+        idxs = self.tmdb_id_to_idx.translate(tmdb_ids)
+        known = idxs[idxs >= 0]
+        if not len(known):
+            return [[] for _ in tmdb_ids]
+
+        if self.neighbor_indices is not None and n <= self.neighbor_indices.shape[1]:
+            top = self.neighbor_indices[known, :n]
+            scores = self.neighbor_scores[known, :n]
+        else:
+            sims = cosine_similarity(self.tfidf_matrix[known], self.tfidf_matrix)
+            top = top_k(sims, n, exclude=known)
+            scores = np.take_along_axis(sims, top, axis=1)
+
+        rows = iter(range(len(known)))
+        results = []
+        for idx in idxs:
+            if idx < 0:
+                results.append([])
+                continue
+            row = next(rows)
+            results.append([
+                {"tmdb_id": int(self.tmdb_ids[i]), "score": round(float(score), 4)}
+                for i, score in zip(top[row], scores[row])
+            ])
+        return results
@@ -9,6 +9,7 @@ MovieLens 25M provides:
 
 import pandas as pd
 from pathlib import Path
+from .idmap import IdMap
 
 DATA_DIR = Path(__file__).parent.parent.parent / "data" / "movielens" / "ml-25m"
 # Fallback for iCloud-synced environments where large files may not be locally available
@@ -49,11 +50,13 @@ def load_ratings(max_rows=None):
 
 
 def build_mapping(links_df=None):
-    """Build bidirectional mapping MovieLens ID <-> TMDB ID."""
+    """Build bidirectional mapping MovieLens ID <-> TMDB ID (array-backed IdMaps)."""
     if links_df is None:
         links_df = load_links()
 
-    ml_to_tmdb = dict(zip(links_df["movieId"], links_df["tmdbId"]))
-    tmdb_to_ml = dict(zip(links_df["tmdbId"], links_df["movieId"]))
+    ml_ids = links_df["movieId"].to_numpy()
+    tmdb_ids = links_df["tmdbId"].to_numpy()
+    ml_to_tmdb = IdMap.from_pairs(ml_ids, tmdb_ids)
+    tmdb_to_ml = IdMap.from_pairs(tmdb_ids, ml_ids)
 
     return ml_to_tmdb, tmdb_to_ml
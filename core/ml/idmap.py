@@ -0,0 +1,78 @@
+"""
+ID mapping — TMDB <-> MovieLens <-> matrix row, without Python dicts.
+
+A dict of 60K int -> int costs several MB of boxed Python ints per worker.
+IdMap keeps two parallel int32 arrays sorted by key and looks keys up with
+np.searchsorted (binary search). The arrays can be memory-mapped straight
+from the model artifacts, so every worker shares one copy.
+
+It behaves like a read-only dict for single lookups (get, [], in, len) and
+also translates whole arrays of IDs at once (translate).
+"""
+
+import numpy as np
+
+MISSING = -1
+_INT32 = np.iinfo(np.int32)
+
+
+class IdMap:
+    def __init__(self, keys, values):
+        """keys must be sorted ascending and unique; values[i] is the value of keys[i]."""
+        # Plain ndarray views of memory-mapped arrays: same shared pages, without
+        # the np.memmap subclass overhead on every small lookup
+        self._keys = np.asarray(keys)
+        self._values = np.asarray(values)
+        self._key_range = np.iinfo(self._keys.dtype) if self._keys.dtype.kind in "iu" else _INT32
+
+    @classmethod
+    def from_pairs(cls, keys, values):
+        """Build from unsorted pairs. Duplicate keys keep their last value, like dict(zip(...))."""
+        keys = np.asarray(keys, dtype=np.int64)
+        values = np.asarray(values, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        # Last occurrence of each key wins
+        last = np.append(sorted_keys[1:] != sorted_keys[:-1], True)
+        return cls(
+            sorted_keys[last].astype(np.int32),
+            values[order][last].astype(np.int32),
+        )
+
+    def to_arrays(self):
+        """(sorted keys, values) — the on-disk representation."""
+        return self._keys, self._values
+
+    def translate(self, keys, missing=MISSING):
+        """Vectorised lookup: array of keys -> array of values (missing keys -> `missing`)."""
+        keys = np.asarray(keys, dtype=np.int64)
+        if len(self._keys) == 0:
+            return np.full(keys.shape, missing, dtype=np.int64)
+        # Queries in the keys' own dtype: a mismatch would make searchsorted
+        # convert the whole (memory-mapped) key array on every call
+        in_range = (keys >= self._key_range.min) & (keys <= self._key_range.max)
+        queries = np.where(in_range, keys, 0).astype(self._keys.dtype)
+        pos = np.searchsorted(self._keys, queries)
+        pos_clipped = np.minimum(pos, len(self._keys) - 1)
+        found = in_range & (self._keys[pos_clipped] == queries)
+        return np.where(found, self._values[pos_clipped], missing).astype(np.int64)
+
+    def get(self, key, default=None):
+        if not self._key_range.min <= key <= self._key_range.max:
+            return default  # Can't be a stored key
+        pos = int(np.searchsorted(self._keys, self._keys.dtype.type(key)))
+        if pos < len(self._keys) and self._keys[pos] == key:
+            return int(self._values[pos])
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._keys)
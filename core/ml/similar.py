@@ -11,58 +11,133 @@ UX decision: 2 rails only (no hybrid rail). The hybrid blend exists as an intern
 evaluation tool but is not exposed to users. Each rail has its own value:
 - "Similar Movies" = same universe, same genre (content similarity)
 - "Viewers Also Liked" = same audience, same taste (behavioral similarity)
+
+Batch mode (get_recommendations_batch) scores many seeds in one matrix product
+per model and fetches the metadata of all recommended movies once.
+
+Metadata comes from the local catalogue (models/catalog.sqlite, built by
+scripts/train_models.py or scripts/convert_models.py --catalog) — no upstream
+call for known titles:
+- unknown titles (e.g. collaborative picks outside the content-based corpus)
+  are fetched from TMDB once and written through to the catalogue
+- rows older than CATALOG_MAX_AGE are still served, and refreshed from TMDB
+  in the background (at most one refresh per movie at a time)
 """
 
 import os
-import httpx
-from .content_based import ContentBasedModel
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.metrics import stage_timer, timed
+from core.tmdb_client import ENRICH_CONCURRENCY, get_movie_details, parse_movie
+from .catalog import CATALOG_FILE, Catalog
+from .content_based import MODELS_DIR, ContentBasedModel
 from .collaborative import CollaborativeModel
 
-_TMDB_BASE = "https://api.themoviedb.org/3"
-_IMG_BASE = "https://image.tmdb.org/t/p"
+logger = logging.getLogger(__name__)
 
 # Confidence thresholds — if the top score is below this, hide the rail
 # rather than show weak recommendations
 CB_MIN_SCORE = 0.10
 CF_MIN_SCORE = 0.15
 
-
-def _tmdb_headers():
-    api_key = os.environ.get("TMDB_API_KEY", "")
-    return {"Authorization": f"Bearer {api_key}", "accept": "application/json"}
-
-
-def _fetch_tmdb_metadata(tmdb_ids):
-    """Fetch TMDB metadata for a batch of movie IDs. Returns {tmdb_id: metadata_dict}."""
-    cache = {}
-    with httpx.Client(headers=_tmdb_headers(), timeout=5) as client:
-        for tmdb_id in tmdb_ids:
-            if tmdb_id in cache:
-                continue
-            try:
-                resp = client.get(
-                    f"{_TMDB_BASE}/movie/{tmdb_id}",
-                    params={"language": "en-US"},
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    cache[tmdb_id] = {
-                        "id": tmdb_id,
-                        "title": data.get("title", ""),
-                        "genres": [g["name"] for g in data.get("genres", [])],
-                        "rating": data.get("vote_average", 0),
-                        "runtime": data.get("runtime", 0),
-                        "release_year": (data.get("release_date") or "")[:4],
-                        "overview": data.get("overview", ""),
-                        "poster_url": (
-                            f"{_IMG_BASE}/w500{data['poster_path']}"
-                            if data.get("poster_path")
-                            else None
-                        ),
-                    }
-            except Exception:
-                continue
-    return cache
+# Catalogue rows older than this (seconds) are refreshed from TMDB in the background
+CATALOG_MAX_AGE = float(os.environ.get("CATALOG_MAX_AGE", 7 * 24 * 3600))
+
+_refresh_pool = ThreadPoolExecutor(max_workers=2)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _movie_details(tmdb_id, fresh=False):
+    try:
+        return get_movie_details(tmdb_id, fresh=fresh)
+    except Exception:
+        return None
+
+
+def _fetch_tmdb_details(tmdb_ids):
+    """TMDB details for movie IDs, fetched concurrently. Movies that fail are left out."""
+    if not tmdb_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(ENRICH_CONCURRENCY, len(tmdb_ids))) as pool:
+        fetched = pool.map(_movie_details, tmdb_ids)
+        return {tmdb_id: data for tmdb_id, data in zip(tmdb_ids, fetched) if data}
+
+
+def _refresh(catalog, tmdb_id):
+    try:
+        # Past the TMDB cache: its copy can be as old as the stale row
+        data = _movie_details(tmdb_id, fresh=True)
+        if data:
+            catalog.put_many([data])
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(tmdb_id)
+
+
+def _refresh_in_background(catalog, tmdb_ids):
+    """Refresh stale catalogue rows off the request path (skips movies already being refreshed)."""
+    with _refreshing_lock:
+        todo = [tmdb_id for tmdb_id in tmdb_ids if tmdb_id not in _refreshing]
+        _refreshing.update(todo)
+    for tmdb_id in todo:
+        _refresh_pool.submit(_refresh, catalog, tmdb_id)
+
+
+def _fetch_tmdb_metadata(tmdb_ids, catalog=None):
+    """Fetch TMDB metadata for a batch of movie IDs. Returns {tmdb_id: metadata_dict}.
+
+    Known titles come from the catalogue. The rest go through the shared TMDB
+    client (so popular titles are served from its cache) and are fetched
+    concurrently, then written through to the catalogue. Entries are built by
+    the same parse_movie as the /recommend candidates. Movies that fail are
+    left out.
+    """
+    unique_ids = list(dict.fromkeys(tmdb_ids))
+    if not unique_ids:
+        return {}
+
+    metadata, stale = catalog.get_many(unique_ids, CATALOG_MAX_AGE) if catalog is not None else ({}, [])
+    fetched = _fetch_tmdb_details([tmdb_id for tmdb_id in unique_ids if tmdb_id not in metadata])
+    if catalog is not None and fetched:
+        catalog.put_many(fetched.values())
+    if stale:
+        _refresh_in_background(catalog, stale)
+
+    metadata.update({tmdb_id: parse_movie(data) for tmdb_id, data in fetched.items()})
+    return metadata
+
+
+def _apply_thresholds(cb_raw, cf_raw):
+    """Hide a rail if its top score is too low."""
+    if cb_raw and cb_raw[0]["score"] < CB_MIN_SCORE:
+        cb_raw = []
+    if cf_raw and cf_raw[0]["score"] < CF_MIN_SCORE:
+        cf_raw = []
+    return cb_raw, cf_raw
+
+
+def _build_rails(tmdb_id, cb_raw, cf_raw, metadata):
+    """Join raw recommendations with their metadata into the response shape."""
+    similar_movies = []
+    for rec in cb_raw:
+        meta = metadata.get(rec["tmdb_id"])
+        if meta:
+            similar_movies.append({**meta, "score": rec["score"], "rec_type": "similar"})
+
+    viewers_also_liked = []
+    for rec in cf_raw:
+        meta = metadata.get(rec["tmdb_id"])
+        if meta:
+            viewers_also_liked.append({**meta, "score": rec["score"], "rec_type": "also_liked"})
+
+    return {
+        "movie_id": tmdb_id,
+        "similar_movies": similar_movies,
+        "viewers_also_liked": viewers_also_liked,
+    }
 
 
 class SimilarMovies:
@@ -71,14 +146,32 @@ class SimilarMovies:
     def __init__(self):
         self.cb_model = ContentBasedModel()
         self.cf_model = CollaborativeModel()
+        self.catalog = None
         self._loaded = False
 
     def load(self):
-        """Load both ML models from disk. Call once at API startup."""
+        """Load both ML models and open the movie catalogue. Call once at API startup."""
         self.cb_model.load()
         self.cf_model.load()
+        # The rails still work without it, one TMDB call per movie
+        path = MODELS_DIR / CATALOG_FILE
+        if not path.exists():
+            logger.warning(
+                f"Movie catalogue not built ({path}): /similar makes one TMDB call per title"
+                " — run scripts/convert_models.py --catalog"
+            )
+        else:
+            try:
+                self.catalog = Catalog(path)
+            except Exception as e:
+                logger.warning(f"Movie catalogue not available: {e}")
         self._loaded = True
 
+    def catalog_info(self):
+        """Hit/miss stats of the movie catalogue (reported on /health)."""
+        return self.catalog.info() if self.catalog is not None else None
+
+    @timed("similar")
     def get_recommendations(self, tmdb_id, n=5):
         """
         Get ML recommendations for a movie.
@@ -95,36 +188,53 @@ class SimilarMovies:
             return {"error": "Models not loaded"}
 
         # Get raw scores from both models
-        cb_raw = self.cb_model.get_similar(tmdb_id, n=n)
-        cf_raw = self.cf_model.get_also_liked(tmdb_id, n=n)
+        with stage_timer("similar_score"):
+            cb_raw = self.cb_model.get_similar(tmdb_id, n=n)
+            cf_raw = self.cf_model.get_also_liked(tmdb_id, n=n)
 
         # Apply confidence thresholds — hide rail if top score is too low
-        if cb_raw and cb_raw[0]["score"] < CB_MIN_SCORE:
-            cb_raw = []
-        if cf_raw and cf_raw[0]["score"] < CF_MIN_SCORE:
-            cf_raw = []
+        cb_raw, cf_raw = _apply_thresholds(cb_raw, cf_raw)
 
         # Collect all unique TMDB IDs, fetch metadata once
         all_ids = set()
         for rec in cb_raw + cf_raw:
             all_ids.add(rec["tmdb_id"])
-        metadata = _fetch_tmdb_metadata(all_ids)
+        with stage_timer("similar_metadata"):
+            metadata = _fetch_tmdb_metadata(all_ids, self.catalog)
+
+        return _build_rails(tmdb_id, cb_raw, cf_raw, metadata)
+
+    @timed("similar_batch")
+    def get_recommendations_batch(self, tmdb_ids, n=5):
+        """
+        Get ML recommendations for many seed movies at once.
+
+        Each model scores all seeds in one matrix product, and the metadata of
+        the union of recommended movies is fetched once.
+
+        Returns:
+        {
+            "results": [...],   # one get_recommendations()-shaped dict per seed, in input order
+        }
+        """
+        if not self._loaded:
+            return {"error": "Models not loaded"}
 
-        # Build enriched lists
-        similar_movies = []
-        for rec in cb_raw:
-            meta = metadata.get(rec["tmdb_id"])
-            if meta:
-                similar_movies.append({**meta, "score": rec["score"], "rec_type": "similar"})
+        with stage_timer("similar_batch_score"):
+            cb_batch = self.cb_model.get_similar_batch(tmdb_ids, n=n)
+            cf_batch = self.cf_model.get_also_liked_batch(tmdb_ids, n=n)
+        rails = [_apply_thresholds(cb_raw, cf_raw) for cb_raw, cf_raw in zip(cb_batch, cf_batch)]
 
-        viewers_also_liked = []
-        for rec in cf_raw:
-            meta = metadata.get(rec["tmdb_id"])
-            if meta:
-                viewers_also_liked.append({**meta, "score": rec["score"], "rec_type": "also_liked"})
+        all_ids = set()
+        for cb_raw, cf_raw in rails:
+            for rec in cb_raw + cf_raw:
+                all_ids.add(rec["tmdb_id"])
+        with stage_timer("similar_batch_metadata"):
+            metadata = _fetch_tmdb_metadata(all_ids, self.catalog)
 
         return {
-            "movie_id": tmdb_id,
-            "similar_movies": similar_movies,
-            "viewers_also_liked": viewers_also_liked,
+            "results": [
+                _build_rails(tmdb_id, cb_raw, cf_raw, metadata)
+                for tmdb_id, (cb_raw, cf_raw) in zip(tmdb_ids, rails)
+            ],
         }
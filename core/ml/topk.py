@@ -0,0 +1,44 @@
+"""
+Top-K selection — pick the K best scores without sorting everything.
+
+A full argsort of 10K scores is O(n log n) just to keep 5 of them.
+np.argpartition moves the K best to the front in O(n), then only those K
+are sorted. Works on a single score vector or row-wise on a score matrix.
+"""
+
+import numpy as np
+
+
+def top_k(scores, k, exclude=None):
+    """
+    Indices of the k highest scores, best first.
+
+    Args:
+        scores: 1-D array (one query) or 2-D array (one query per row)
+        k: how many indices to keep (capped at the number of candidates)
+        exclude: index to skip (1-D) or one index per row (2-D),
+                 typically the query movie itself
+
+    Returns:
+        int array of shape (k,) or (n_rows, k)
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n_candidates = scores.shape[-1]
+
+    if exclude is not None:
+        scores = scores.copy()
+        if scores.ndim == 1:
+            scores[exclude] = -np.inf
+        else:
+            scores[np.arange(scores.shape[0]), exclude] = -np.inf
+        n_candidates -= 1
+
+    k = min(k, n_candidates)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+
+    # O(n) partition: the k best end up (unordered) in the first k slots
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    part_scores = np.take_along_axis(scores, part, axis=-1)
+    order = np.argsort(-part_scores, axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
@@ -3,16 +3,49 @@
 GPT-4o-mini receives the user's mood description and returns structured JSON
 filters that map directly to TMDB Discover API parameters.
 Uses OpenAI function calling for reliable structured output.
+parse_mood_async is the non-blocking twin used by the async /recommend path;
+both share the same mood cache (read with aget/aset on the async path, so a
+shared backend doesn't block the event loop). Concurrent misses for the same
+mood share a single OpenAI call (singleflight), so a trending mood costs one call.
+
+The mood cache backend is configurable (see core.cache.make_cache):
+MOOD_CACHE_BACKEND=memory (default, per worker), sqlite or redis, with
+MOOD_CACHE_URL pointing at the file / server. The shared backends pool hit
+rates across workers, survive restarts, and report fleet-wide stats.
+
+Common moods ("comedy on netflix", "un polar des années 90") are answered by
+the rule-based parser (core/mood_rules.py) without any call; only moods it
+can't fully explain go through the caches and GPT-4o-mini.
+On an exact miss, the semantic cache (core/semantic_cache.py) is asked next:
+a reworded mood close enough to one already parsed reuses its filters, unless
+the two differ in a hard filter (provider, language, period, runtime, actors).
 """
 
+import os
 import json
 import logging
-from functools import lru_cache
-from openai import OpenAI
+import threading
+from openai import AsyncOpenAI, OpenAI
+
+from core.cache import make_cache
+from core.metrics import count_cache, count_upstream, timed
+from core.mood_rules import MoodRules
+from core.person_index import normalize_name
+from core.semantic_cache import semantic_cache_from_env
+from core.singleflight import AsyncSingleFlight, SingleFlight
 
 logger = logging.getLogger(__name__)
 
 _client = None
+_async_client = None
+
+# Same mood string = same OpenAI call saved (shared by sync + async paths)
+_mood_cache = None
+_mood_cache_lock = threading.Lock()
+# Near-duplicate moods ("cozy rainy sunday" ≈ "rainy sunday, cozy") — None if disabled
+_semantic_cache = semantic_cache_from_env()
+_flight = SingleFlight()
+_flight_async = AsyncSingleFlight()
 
 GENRE_MAP = {
     "Action": 28, "Adventure": 12, "Animation": 16, "Comedy": 35,
@@ -38,6 +71,13 @@ LANGUAGE_CODES = (
     "nl: Dutch, pl: Polish, tr: Turkish, ta: Tamil, te: Telugu"
 )
 
+# Used when the mood can't be parsed in time: popular, well-rated movies
+FALLBACK_FILTERS = {"vote_average_gte": 6.0, "sort_by": "popularity.desc"}
+
+_mood_rules = MoodRules(GENRE_MAP, PROVIDER_MAP, LANGUAGE_CODES)
+# Deterministic fast path (MOOD_RULES=0 sends every mood to the LLM)
+_rules = _mood_rules if os.environ.get("MOOD_RULES", "1") != "0" else None
+
 SYSTEM_PROMPT = f"""You are a movie recommendation filter generator. Given a user's mood description, extract structured filters for the TMDB Discover API.
 
 Available genre IDs:
@@ -129,29 +169,28 @@ def _get_client() -> OpenAI:
     return _client
 
 
-def parse_mood(mood: str) -> dict:
-    """Translate a mood description into TMDB Discover API filters.
-
-    Normalizes input and delegates to cached implementation.
-    """
-    normalized = mood.strip().lower()
-    return _parse_mood_cached(normalized)
+def _get_async_client() -> AsyncOpenAI:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI()
+    return _async_client
 
 
-@lru_cache(maxsize=512)
-def _parse_mood_cached(mood: str) -> dict:
-    """Cached mood parsing — same mood string = same OpenAI call saved."""
-    client = _get_client()
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+def _request_kwargs(mood: str) -> dict:
+    """Chat completion arguments for one mood (shared by sync + async calls)."""
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": mood},
         ],
-        functions=[FILTER_FUNCTION],
-        function_call={"name": "set_movie_filters"},
-    )
+        "functions": [FILTER_FUNCTION],
+        "function_call": {"name": "set_movie_filters"},
+    }
+
 
+def _extract_filters(mood: str, response) -> dict:
+    """Turn the function-call response into a clean filter dict."""
     fn_call = response.choices[0].message.function_call
     filters = json.loads(fn_call.arguments)
 
@@ -159,3 +198,138 @@ def _parse_mood_cached(mood: str) -> dict:
 
     # Clean up null/empty values (including string "null" from GPT)
     return {k: v for k, v in filters.items() if v is not None and v != "null" and v != ""}
+
+
+def _get_mood_cache():
+    """Mood cache — backend chosen by MOOD_CACHE_BACKEND / MOOD_CACHE_URL."""
+    global _mood_cache
+    if _mood_cache is None:
+        with _mood_cache_lock:
+            if _mood_cache is None:
+                _mood_cache = make_cache(
+                    os.environ.get("MOOD_CACHE_BACKEND", "memory"),
+                    url=os.environ.get("MOOD_CACHE_URL"),
+                    maxsize=int(os.environ.get("MOOD_CACHE_MAXSIZE", 512)),
+                    prefix="watchnext:mood:",
+                )
+    return _mood_cache
+
+
+def mood_cache_info() -> dict:
+    """Hit/miss stats of the mood cache (reported on /health; fleet-wide for shared backends)."""
+    cache = _get_mood_cache()
+    info = {**cache.info(), "backend": type(cache).__name__, "coalesced": _flight.shared + _flight_async.shared}
+    if _semantic_cache is not None:
+        info["semantic"] = _semantic_cache.info()
+    if _rules is not None:
+        info["rules"] = _rules.info()
+    return info
+
+
+def _rules_lookup(mood: str) -> dict | None:
+    """Filters from the rule-based parser, or None if the mood needs the LLM."""
+    if _rules is None:
+        return None
+    filters = _rules.parse(mood)
+    count_cache("mood_rules", "miss" if filters is None else "hit")
+    if filters is not None:
+        logger.info(f"Mood parsed (rules): '{mood[:50]}' → {filters}")
+    return filters
+
+
+def _same_hard_filters(mood: str, matched: str, filters: dict) -> bool:
+    """Whether a near-duplicate mood asks for the same providers, languages, period, runtime and actors."""
+    if _mood_rules.hard_filters(mood) != _mood_rules.hard_filters(matched):
+        return False
+    words = f" {normalize_name(mood)} "
+    names = str(filters.get("with_cast_names") or "").split(",")
+    return all(f" {normalize_name(name)} " in words for name in names if name.strip())
+
+
+def _semantic_lookup(mood: str) -> dict | None:
+    """Filters of the nearest already-parsed mood, if similar enough and with the same hard filters."""
+    if _semantic_cache is None:
+        return None
+    match = _semantic_cache.get(mood, accept=lambda matched, filters: _same_hard_filters(mood, matched, filters))
+    count_cache("mood_semantic", "miss" if match is None else "hit")
+    if match is None:
+        return None
+    filters, score, matched = match
+    logger.info(f"Mood parsed (semantic HIT {score:.2f}): '{mood[:50]}' ≈ '{matched[:50]}'")
+    return filters
+
+
+def _remember(mood: str, filters: dict):
+    _get_mood_cache().set(mood, filters)
+    if _semantic_cache is not None:
+        _semantic_cache.set(mood, filters)
+
+
+async def _remember_async(mood: str, filters: dict):
+    await _get_mood_cache().aset(mood, filters)
+    if _semantic_cache is not None:
+        _semantic_cache.set(mood, filters)
+
+
+def _exact_lookup(mood: str) -> dict | None:
+    filters = _get_mood_cache().get(mood)
+    count_cache("mood", "miss" if filters is None else "hit")
+    return filters
+
+
+async def _exact_lookup_async(mood: str) -> dict | None:
+    filters = await _get_mood_cache().aget(mood)
+    count_cache("mood", "miss" if filters is None else "hit")
+    return filters
+
+
+@timed("parse_mood")
+def parse_mood(mood: str) -> dict:
+    """Translate a mood description into TMDB Discover API filters.
+
+    Normalizes input, tries the rule-based parser, and delegates ambiguous
+    moods to the cached implementation.
+    """
+    normalized = mood.strip().lower()
+    filters = _rules_lookup(normalized)
+    if filters is not None:
+        return filters
+    return _parse_mood_cached(normalized)
+
+
+def _parse_mood_cached(mood: str) -> dict:
+    """Cached mood parsing — same mood string = same OpenAI call saved."""
+    filters = _exact_lookup(mood)
+    if filters is None:
+        filters = _semantic_lookup(mood)
+    if filters is None:
+        def fetch():
+            count_upstream("openai", "parse_mood")
+            response = _get_client().chat.completions.create(**_request_kwargs(mood))
+            result = _extract_filters(mood, response)
+            _remember(mood, result)
+            return result
+
+        filters = _flight.do(mood, fetch)
+    return filters
+
+
+@timed("parse_mood")
+async def parse_mood_async(mood: str) -> dict:
+    """Async variant of parse_mood — awaits OpenAI instead of blocking a worker thread."""
+    normalized = mood.strip().lower()
+    filters = _rules_lookup(normalized)
+    if filters is None:
+        filters = await _exact_lookup_async(normalized)
+    if filters is None:
+        filters = _semantic_lookup(normalized)
+    if filters is None:
+        async def fetch():
+            count_upstream("openai", "parse_mood")
+            response = await _get_async_client().chat.completions.create(**_request_kwargs(normalized))
+            result = _extract_filters(normalized, response)
+            await _remember_async(normalized, result)
+            return result
+
+        filters = await _flight_async.do(normalized, fetch)
+    return filters
@@ -0,0 +1,292 @@
+"""Rule-based mood parser — answers common moods without an LLM call.
+
+"comedy on netflix" or "un film d'horreur des années 80" don't need
+GPT-4o-mini: every word maps to a TMDB filter. MoodRules parses English and
+French keywords for genres, streaming providers, original languages, decades /
+years, runtime and sort order, and only answers when it is sure:
+
+- every content word of the mood must be explained by a rule — anything left
+  over ("cozy", "like Inception", "with Omar Sy") means the mood needs the LLM
+- a negation ("no horror", "pas de romance") always goes to the LLM
+- at least one genre must be found (with_genres is required downstream)
+
+Otherwise parse() returns None and the caller escalates to the LLM.
+The output has the same shape as the LLM's cleaned filter dict.
+
+hard_filters() runs the same keyword rules on any mood, skipping the words it
+doesn't know: the semantic cache uses it to refuse a near-duplicate mood that
+names another provider, language or period.
+"""
+
+import re
+import unicodedata
+from datetime import date
+
+DEFAULT_MIN_RATING = 6.0
+
+# Keyword (accents stripped, lowercase) -> genre names (as in GENRE_MAP)
+_GENRE_KEYWORDS = {
+    "comedy": ["Comedy"], "comedies": ["Comedy"], "funny": ["Comedy"], "comedie": ["Comedy"],
+    "drole": ["Comedy"], "droles": ["Comedy"],
+    "action": ["Action"],
+    "adventure": ["Adventure"], "adventures": ["Adventure"], "aventure": ["Adventure"], "aventures": ["Adventure"],
+    "animation": ["Animation"], "animated": ["Animation"], "cartoon": ["Animation"], "dessin anime": ["Animation"],
+    "crime": ["Crime"], "gangster": ["Crime"], "heist": ["Crime"], "policier": ["Crime"], "polar": ["Crime"],
+    "documentary": ["Documentary"], "documentaries": ["Documentary"], "documentaire": ["Documentary"],
+    "drama": ["Drama"], "dramas": ["Drama"], "drame": ["Drama"], "drames": ["Drama"],
+    "family": ["Family"], "kids": ["Family"], "famille": ["Family"], "enfants": ["Family"],
+    "fantasy": ["Fantasy"], "fantastique": ["Fantasy"],
+    "history": ["History"], "historical": ["History"], "historique": ["History"],
+    "horror": ["Horror"], "scary": ["Horror"], "horreur": ["Horror"], "epouvante": ["Horror"],
+    "music": ["Music"], "musical": ["Music"], "musique": ["Music"], "comedie musicale": ["Music"],
+    "mystery": ["Mystery"], "mysteries": ["Mystery"], "whodunit": ["Mystery"], "mystere": ["Mystery"],
+    "romance": ["Romance"], "romantic": ["Romance"], "romantique": ["Romance"], "love story": ["Romance"],
+    "romcom": ["Comedy", "Romance"], "rom com": ["Comedy", "Romance"], "comedie romantique": ["Comedy", "Romance"],
+    "sci fi": ["Science Fiction"], "scifi": ["Science Fiction"], "science fiction": ["Science Fiction"], "sf": ["Science Fiction"],
+    "thriller": ["Thriller"], "thrillers": ["Thriller"], "suspense": ["Thriller"],
+    "war": ["War"], "guerre": ["War"],
+    "western": ["Western"], "westerns": ["Western"],
+    "anime": ["Animation"],
+}
+
+# Keyword -> provider names (as in PROVIDER_MAP)
+_PROVIDER_KEYWORDS = {
+    "netflix": "Netflix",
+    "prime": "Amazon Prime Video", "prime video": "Amazon Prime Video",
+    "amazon prime": "Amazon Prime Video", "amazon prime video": "Amazon Prime Video", "amazon": "Amazon Prime Video",
+    "disney": "Disney+", "disney plus": "Disney+",
+    "hulu": "Hulu",
+    "max": "Max", "hbo": "Max", "hbo max": "Max",
+    "apple tv": "Apple TV+", "apple tv plus": "Apple TV+", "apple": "Apple TV+",
+    "paramount": "Paramount+", "paramount plus": "Paramount+",
+    "peacock": "Peacock",
+}
+
+# Nationality / language adjectives not derivable from LANGUAGE_CODES names
+_LANGUAGE_KEYWORDS = {
+    "francais": "fr", "francaise": "fr", "francaises": "fr", "coreen": "ko", "korea": "ko", "kdrama": "ko",
+    "japonais": "ja", "japan": "ja", "espagnol": "es", "spain": "es", "allemand": "de",
+    "italien": "it", "italy": "it", "bollywood": "hi", "indian": "hi", "chinois": "zh",
+    "portugais": "pt", "russe": "ru", "arabe": "ar", "thai": "th", "suedois": "sv",
+    "danois": "da", "neerlandais": "nl", "polonais": "pl", "turc": "tr",
+    "korean": "ko", "japanese": "ja", "spanish": "es", "german": "de", "italian": "it",
+    "chinese": "zh", "portuguese": "pt", "russian": "ru", "arabic": "ar", "swedish": "sv",
+    "danish": "da", "dutch": "nl", "polish": "pl", "turkish": "tr", "tamil": "ta", "telugu": "te",
+}
+
+_SORT_KEYWORDS = {
+    "highest rated": "vote_average.desc", "top rated": "vote_average.desc", "best rated": "vote_average.desc",
+    "best": "vote_average.desc", "acclaimed": "vote_average.desc",
+    "mieux notes": "vote_average.desc", "meilleurs": "vote_average.desc", "meilleur": "vote_average.desc",
+    "newest": "primary_release_date.desc", "latest": "primary_release_date.desc",
+    "plus recents": "primary_release_date.desc",
+    "popular": "popularity.desc", "populaire": "popularity.desc", "populaires": "popularity.desc",
+}
+
+_RUNTIME_KEYWORDS = {
+    "short": ("with_runtime_lte", 100), "court": ("with_runtime_lte", 100), "courts": ("with_runtime_lte", 100),
+    "long": ("with_runtime_gte", 150), "longs": ("with_runtime_gte", 150),
+}
+
+_DECADE_WORDS = {
+    "sixties": 1960, "seventies": 1970, "eighties": 1980, "nineties": 1990,
+}
+
+_RECENT_WORDS = {"recent", "recents", "recente", "recentes", "new"}
+
+# Words that carry no filter (EN + FR)
+_FILLER = {
+    "a", "an", "the", "some", "any", "movie", "movies", "film", "films", "flick", "flicks",
+    "on", "in", "from", "of", "and", "or", "for", "to", "with", "that", "is", "are",
+    "i", "m", "me", "want", "wanna", "watch", "show", "find", "give", "recommend",
+    "please", "tonight", "something", "good", "great", "available", "streaming", "stream",
+    "one", "s", "set", "made", "era", "years", "decade", "minutes", "mins", "min",
+    "un", "une", "des", "le", "la", "les", "de", "du", "d", "l", "en", "sur", "et", "ou",
+    "pour", "avec", "je", "veux", "voir", "regarder", "ce", "soir", "quelque", "chose",
+    "bon", "bons", "bonne", "disponible", "annees", "annee", "qui", "est", "sont",
+}
+_NEGATIONS = {"no", "not", "without", "non", "pas", "sans", "ni", "never", "jamais", "except", "sauf", "avoid"}
+
+_MAX_PHRASE = 4
+
+_DECADE_RE = re.compile(r"\b(?:annees\s+)?(19|20)?(\d)0\s*s?\b")
+_RUNTIME_RE = re.compile(
+    r"\b(under|less than|below|max|moins de|over|more than|at least|plus de)\s+(\d{2,3})\s*(?:minutes|mins|min|mn)\b"
+)
+_YEAR_RE = re.compile(r"\b(after|since|from|apres|depuis|before|until|avant|in|en|of|de)\s+((?:19|20)\d\d)\b")
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, strip accents, turn punctuation ("sci-fi", "disney+", "d'horreur") into spaces."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+class MoodRules:
+    def __init__(self, genre_map: dict, provider_map: dict, language_codes: str):
+        """
+        Args:
+            genre_map: genre name -> TMDB genre id (mood_parser.GENRE_MAP)
+            provider_map: provider name -> TMDB provider id (mood_parser.PROVIDER_MAP)
+            language_codes: "en: English, fr: French, ..." (mood_parser.LANGUAGE_CODES)
+        """
+        self.genre_map = genre_map
+        self.provider_map = provider_map
+        self.languages = dict(_LANGUAGE_KEYWORDS)
+        for pair in language_codes.split(","):
+            code, name = (part.strip() for part in pair.split(":"))
+            self.languages[name.lower()] = code
+        self.matched = 0
+        self.escalated = 0
+
+    def parse(self, mood: str) -> dict | None:
+        """TMDB filters for the mood, or None if it needs the LLM."""
+        filters = self._parse(_normalize(mood))
+        if filters is None:
+            self.escalated += 1
+        else:
+            self.matched += 1
+        return filters
+
+    def _parse(self, text: str) -> dict | None:
+        filters = {}
+
+        # Step 1: numeric patterns (decades, years, runtime) — consumed from the text
+        text = self._take_runtime(text, filters)
+        text = self._take_years(text, filters)
+        text = self._take_decades(text, filters)
+
+        words = text.split()
+        if any(w in _NEGATIONS for w in words):
+            return None
+
+        # Step 2: longest keyword phrase first; any unexplained content word → LLM
+        genres, providers = [], []
+        i = 0
+        while i < len(words):
+            for size in range(min(_MAX_PHRASE, len(words) - i), 0, -1):
+                phrase = " ".join(words[i:i + size])
+                if self._apply(phrase, filters, genres, providers):
+                    i += size
+                    break
+            else:
+                if words[i] not in _FILLER:
+                    return None
+                i += 1
+
+        if not genres:
+            return None
+
+        filters["with_genres"] = "|".join(str(self.genre_map[g]) for g in dict.fromkeys(genres))
+        if providers:
+            filters["with_watch_providers"] = "|".join(str(self.provider_map[p]) for p in dict.fromkeys(providers))
+        filters.setdefault("vote_average_gte", DEFAULT_MIN_RATING)
+        filters.setdefault("sort_by", "popularity.desc")
+        return filters
+
+    def _apply(self, phrase: str, filters: dict, genres: list, providers: list) -> bool:
+        """Apply the rule matching this phrase, if any."""
+        if phrase in _GENRE_KEYWORDS:
+            genres.extend(_GENRE_KEYWORDS[phrase])
+            if phrase == "anime":
+                filters.setdefault("with_original_language", "ja")
+        elif phrase in _PROVIDER_KEYWORDS:
+            providers.append(_PROVIDER_KEYWORDS[phrase])
+        elif phrase in self.languages:
+            language = self.languages[phrase]
+            if filters.get("with_original_language", language) != language:
+                return False  # Two languages: leave it to the LLM
+            filters["with_original_language"] = language
+        elif phrase in _SORT_KEYWORDS:
+            filters["sort_by"] = _SORT_KEYWORDS[phrase]
+        elif phrase in _RUNTIME_KEYWORDS:
+            key, minutes = _RUNTIME_KEYWORDS[phrase]
+            filters[key] = minutes
+        elif phrase in _DECADE_WORDS:
+            start = _DECADE_WORDS[phrase]
+            filters["release_date_gte"] = f"{start}-01-01"
+            filters["release_date_lte"] = f"{start + 9}-12-31"
+        elif phrase in _RECENT_WORDS:
+            today = date.today()
+            filters["release_date_gte"] = f"{today.year - 3}-{today.month:02d}-01"
+        else:
+            return False
+        return True
+
+    def hard_filters(self, mood: str) -> dict:
+        """Providers, languages, release dates and runtime a mood asks for (unknown words ignored)."""
+        filters = {}
+        text = _normalize(mood)
+        text = self._take_runtime(text, filters)
+        text = self._take_years(text, filters)
+        text = self._take_decades(text, filters)
+
+        words = text.split()
+        providers, languages = set(), set()
+        i = 0
+        while i < len(words):
+            for size in range(min(_MAX_PHRASE, len(words) - i), 0, -1):
+                phrase = " ".join(words[i:i + size])
+                if phrase in _PROVIDER_KEYWORDS:
+                    providers.add(_PROVIDER_KEYWORDS[phrase])
+                elif phrase in self.languages:
+                    languages.add(self.languages[phrase])
+                elif phrase in _DECADE_WORDS or phrase in _RECENT_WORDS or phrase in _RUNTIME_KEYWORDS:
+                    self._apply(phrase, filters, [], [])
+                else:
+                    continue
+                i += size
+                break
+            else:
+                i += 1
+
+        if providers:
+            filters["with_watch_providers"] = providers
+        if languages:
+            filters["with_original_language"] = languages
+        return filters
+
+    @staticmethod
+    def _take_runtime(text: str, filters: dict) -> str:
+        def repl(m):
+            under = m.group(1) in ("under", "less than", "below", "max", "moins de")
+            filters["with_runtime_lte" if under else "with_runtime_gte"] = int(m.group(2))
+            return " "
+        return _RUNTIME_RE.sub(repl, text)
+
+    @staticmethod
+    def _take_years(text: str, filters: dict) -> str:
+        def repl(m):
+            word, year = m.group(1), int(m.group(2))
+            if word in ("before", "until", "avant"):
+                filters["release_date_lte"] = f"{year - 1}-12-31"
+            elif word in ("after", "since", "from", "apres", "depuis"):
+                filters["release_date_gte"] = f"{year}-01-01"
+            else:
+                filters["release_date_gte"] = f"{year}-01-01"
+                filters["release_date_lte"] = f"{year}-12-31"
+            return " "
+        return _YEAR_RE.sub(repl, text)
+
+    @staticmethod
+    def _take_decades(text: str, filters: dict) -> str:
+        def repl(m):
+            century, digit = m.group(1), int(m.group(2))
+            if not m.group(0).rstrip().endswith("s") and "annees" not in m.group(0):
+                return m.group(0)  # A bare "80" or "1990" isn't a decade
+            if century is None:
+                century = "20" if digit <= 2 else "19"
+            start = int(century) * 100 + digit * 10
+            filters["release_date_gte"] = f"{start}-01-01"
+            filters["release_date_lte"] = f"{start + 9}-12-31"
+            return " "
+        return _DECADE_RE.sub(repl, text)
+
+    def info(self) -> dict:
+        total = self.matched + self.escalated
+        return {
+            "matched": self.matched,
+            "escalated": self.escalated,
+            "match_rate": round(self.matched / total, 3) if total else None,
+        }
@@ -0,0 +1,148 @@
+"""Person index — actor name → TMDB person ID, resolved locally.
+
+Cast-based moods ("a Tom Hanks comedy") used to cost one /search/person call
+per actor before Discover could even start, although a name always maps to
+the same person. The index answers most of them in memory.
+
+How it works:
+1. Names are normalised — case, accents, punctuation, spacing:
+   "Penélope  Cruz" → "penelope cruz", "Robert Downey Jr." → "robert downey jr"
+2. Exact lookup; a miss falls back to TMDB search (tmdb_client.resolve_person)
+   and the answer is remembered under the name as typed
+3. Only when TMDB finds nobody, a fuzzy match (difflib) against the known
+   names with the same initial rescues a misspelling ("tom hank") — fuzzy
+   first would map real actors to their neighbours ("dan stevens" ~ "dan
+   stevenson" = 0.92)
+4. Popular actors (/person/popular) are preloaded in bulk at startup — once
+   a week at most when the index is persisted (the last preload is recorded)
+
+Entries are persisted in SQLite when PERSON_INDEX_PATH is set, so every
+restart (and every worker) starts from the names already resolved.
+"""
+
+import os
+import re
+import time
+import difflib
+import sqlite3
+import threading
+import unicodedata
+
+# difflib ratio needed for a fuzzy match ("tom hank" ~ "tom hanks" = 0.94)
+FUZZY_CUTOFF = float(os.environ.get("PERSON_FUZZY_CUTOFF", 0.85))
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents, turn punctuation into spaces, collapse spacing."""
+    name = unicodedata.normalize("NFKD", name.lower())
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return re.sub(r"[\W_]+", " ", name).strip()
+
+
+class PersonIndex:
+    """Normalised name → (person ID, popularity), in memory, optionally persisted in SQLite."""
+
+    def __init__(self, path=None):
+        self.path = str(path) if path else None
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._people = {}  # normalised name -> (person_id, popularity)
+        self._by_initial = {}  # first letter -> normalised names (fuzzy match candidates)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._preload = (0, 0.0)  # (pages, time) of the last bulk preload
+        if self.path:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            with self._lock:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS people ("
+                    " name TEXT PRIMARY KEY,"
+                    " person_id INTEGER NOT NULL,"
+                    " popularity REAL NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS preload (id INTEGER PRIMARY KEY CHECK (id = 0),"
+                    " pages INTEGER NOT NULL, loaded_at REAL NOT NULL)"
+                )
+                self._conn.commit()
+                rows = self._conn.execute("SELECT name, person_id, popularity FROM people").fetchall()
+                preload = self._conn.execute("SELECT pages, loaded_at FROM preload").fetchone()
+            if preload:
+                self._preload = preload
+            for name, person_id, popularity in rows:
+                self._put(name, person_id, popularity)
+
+    def __len__(self):
+        return len(self._people)
+
+    def _put(self, key: str, person_id: int, popularity: float):
+        if key not in self._people:
+            self._by_initial.setdefault(key[0], []).append(key)
+        self._people[key] = (person_id, popularity)
+
+    def lookup(self, name: str) -> int | None:
+        """Person ID for a name (exact match after normalisation), or None if the index doesn't know it."""
+        key = normalize_name(name)
+        with self._lock:
+            entry = self._people.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def closest(self, name: str) -> int | None:
+        """Person ID of the most similar known name (fuzzy), or None — for names TMDB search can't find."""
+        key = normalize_name(name)
+        with self._lock:
+            candidates = self._by_initial.get(key[:1], [])
+            match = difflib.get_close_matches(key, candidates, n=1, cutoff=FUZZY_CUTOFF)
+            if not match:
+                return None
+            self.fuzzy_hits += 1
+            return self._people[match[0]][0]
+
+    def add_many(self, people):
+        """Remember (name, person_id, popularity) tuples; on a name clash the more popular person wins."""
+        rows = []
+        with self._lock:
+            for name, person_id, popularity in people:
+                key = normalize_name(name)
+                current = self._people.get(key)
+                if not key or (current is not None and current[1] > popularity):
+                    continue
+                self._put(key, person_id, popularity)
+                rows.append((key, person_id, popularity))
+            if self._conn is not None and rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO people (name, person_id, popularity) VALUES (?, ?, ?)", rows
+                )
+                self._conn.commit()
+
+    def add(self, name: str, person_id: int, popularity: float = 0.0):
+        self.add_many([(name, person_id, popularity)])
+
+    def preloaded(self, pages: int, max_age: float) -> bool:
+        """Whether a bulk preload of at least `pages` pages ran less than max_age seconds ago."""
+        loaded_pages, loaded_at = self._preload
+        return loaded_pages >= pages and time.time() - loaded_at < max_age
+
+    def mark_preloaded(self, pages: int):
+        """Record a bulk preload (persisted, so restarts and other workers skip it)."""
+        self._preload = (pages, time.time())
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO preload (id, pages, loaded_at) VALUES (0, ?, ?)", self._preload)
+                self._conn.commit()
+
+    def info(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fuzzy_hits": self.fuzzy_hits,  # Misses TMDB search couldn't resolve, matched fuzzily
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,224 @@
+"""Recommendation pipeline — mood → filters → candidates → enriched → top 5.
+
+run_recommendation chains the 4 async stages. recommend_cached puts a
+full-response cache in front of it, keyed on the normalised mood plus the
+request options, so a popular mood skips all 40+ HTTP calls and both LLM calls:
+
+- fresh entries (RECOMMEND_CACHE_TTL, default 10 min) are returned as-is
+- stale entries (up to RECOMMEND_CACHE_STALE_TTL more, default 1 h) are returned
+  immediately while a background task recomputes them
+- enrichment doesn't wait for the tail: ranking starts once ENRICH_MIN_READY
+  candidates are in and ENRICH_DEADLINE seconds have passed (stragglers are dropped)
+- every run has a latency budget (core/budget.py, RECOMMEND_BUDGET seconds or
+  the request's budget_ms): stages degrade instead of overrunning it, and
+  degraded responses are not cached
+- the parsed filters of every run are appended to the request log
+  (core/request_log.py, when REQUEST_LOG_PATH is set) to warm the Discover cache
+- ranking="local" swaps the GPT-4o-mini ranking call for the local ranker
+  (core/local_ranker.py) — the low-latency tier
+- stream_recommendation runs the same stages for the SSE endpoint, yielding
+  each result as soon as it exists (not cached)
+- L1 is an in-process LRU (RECOMMEND_CACHE_MAXSIZE entries); setting
+  RECOMMEND_CACHE_PATH adds an SQLite L2 shared by all workers
+"""
+
+import os
+import json
+import asyncio
+import threading
+
+from core.budget import Budget
+from core.cache import LRUCache, SQLiteCache, StaleWhileRevalidate, TieredCache
+from core.metrics import count_cache, stage_timer
+from core.mood_parser import FALLBACK_FILTERS, parse_mood_async
+from core.request_log import record
+from core.tmdb_client import basic_entry, discover_movies_async, iter_enriched_async
+from core.recommender import rank_movies_async, rank_movies_stream
+from core.local_ranker import rank_movies_local
+
+# Ranking needs "enough" candidates, not all 20: don't let the slowest TMDB call set the latency
+ENRICH_MIN_READY = int(os.environ.get("ENRICH_MIN_READY", 10))
+ENRICH_DEADLINE = float(os.environ.get("ENRICH_DEADLINE", 1.0))
+
+# Default per-request latency budget (seconds)
+RECOMMEND_BUDGET = float(os.environ.get("RECOMMEND_BUDGET", 4.0))
+
+# Time kept for the stages after a step (seconds)
+_RESERVE_AFTER_PARSE = 0.6  # Discover + a degraded enrichment / ranking
+_RESERVE_FOR_RANK = 0.8     # One GPT ranking call
+# Below this, a stage isn't started at all
+_MIN_FOR_PARSE = 0.3
+_MIN_FOR_PROVIDERS = 0.4
+# Degraded enrichment still gives the ranker this many candidates
+_MIN_CANDIDATES = 5
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def _get_response_cache() -> StaleWhileRevalidate:
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                l1 = LRUCache(maxsize=int(os.environ.get("RECOMMEND_CACHE_MAXSIZE", 1000)))
+                path = os.environ.get("RECOMMEND_CACHE_PATH")
+                l2 = SQLiteCache(path) if path else None
+                _response_cache = StaleWhileRevalidate(
+                    TieredCache(l1, l2),
+                    ttl=float(os.environ.get("RECOMMEND_CACHE_TTL", 600)),
+                    stale_ttl=float(os.environ.get("RECOMMEND_CACHE_STALE_TTL", 3600)),
+                    cacheable=lambda result: not result.get("degraded"),
+                )
+    return _response_cache
+
+
+def response_cache_info() -> dict:
+    """Hit/stale/miss stats of the /recommend response cache (reported on /health)."""
+    return _get_response_cache().info()
+
+
+def _cache_key(mood: str, options: dict) -> str:
+    """Normalised mood + every request option that changes the response."""
+    return "recommend:" + json.dumps({"mood": mood.strip().lower(), **options}, sort_keys=True)
+
+
+def _iter_enriched(raw_movies: list[dict]):
+    """Enrichment for the SSE stream (no budget: results are sent as they come)."""
+    return iter_enriched_async(
+        raw_movies, include_providers=True, min_ready=ENRICH_MIN_READY, deadline=ENRICH_DEADLINE
+    )
+
+
+async def run_recommendation(
+    mood: str, ranking: str = "llm", budget: Budget | None = None, exclude_ids=()
+) -> dict:
+    """Run the full pipeline (no response cache). Returns filters_applied + movies + degraded.
+
+    ranking: "llm" (GPT-4o-mini picks + explanations) or "local" (no LLM call).
+    budget: latency budget; each stage degrades rather than overrun it.
+    exclude_ids: movies never to recommend (e.g. already seen).
+    """
+    budget = budget or Budget(RECOMMEND_BUDGET)
+
+    # Step 1: GPT-4o-mini translates mood → TMDB filters
+    filters = await _parse_within(mood, budget)
+    record(filters)
+
+    # Step 2: TMDB Discover API returns 20 candidates (more pages if the first falls short)
+    try:
+        raw_movies = await budget.run(discover_movies_async(filters, limit=20, exclude_ids=exclude_ids))
+    except asyncio.TimeoutError:
+        budget.degrade("discover_movies", "timeout, no candidates")
+        return {"filters_applied": filters, "movies": [], "degraded": budget.degraded}
+
+    # Not enough time for both enrichment and a GPT call: enriched data + local ranking wins
+    if ranking == "llm" and budget.remaining() < _RESERVE_FOR_RANK + _MIN_FOR_PROVIDERS:
+        budget.degrade("rank_movies", "not enough time left, local ranking")
+        ranking = "local"
+
+    # Step 3: Enrich with full details + streaming providers (each movie starts at once)
+    with stage_timer("enrich_movies"):
+        candidates = await _enrich_within(raw_movies, budget, reserve=_RESERVE_FOR_RANK if ranking == "llm" else 0)
+
+    # Step 4: GPT-4o-mini (or the local ranker) ranks 20 → top 5 with explanations
+    if ranking == "local":
+        movies = rank_movies_local(mood, candidates, filters)
+    else:
+        movies = await _rank_within(mood, candidates, filters, budget)
+
+    return {"filters_applied": filters, "movies": movies, "degraded": budget.degraded}
+
+
+async def _parse_within(mood: str, budget: Budget) -> dict:
+    """parse_mood, or the fallback filters if it can't finish in time."""
+    if budget.remaining(_RESERVE_AFTER_PARSE) < _MIN_FOR_PARSE:
+        budget.degrade("parse_mood", "no time left, default filters")
+        return dict(FALLBACK_FILTERS)
+    try:
+        return await budget.run(parse_mood_async(mood), reserve=_RESERVE_AFTER_PARSE)
+    except asyncio.TimeoutError:
+        budget.degrade("parse_mood", "timeout, default filters")
+        return dict(FALLBACK_FILTERS)
+
+
+async def _enrich_within(raw_movies: list[dict], budget: Budget, reserve: float) -> list[dict]:
+    """Enriched candidates in Discover order, cut short (and padded with Discover-only data) by the budget."""
+    time_left = budget.remaining(reserve)
+    include_providers = time_left >= _MIN_FOR_PROVIDERS
+    if not include_providers:
+        budget.degrade("enrich_movies", "providers skipped")
+
+    candidates = [None] * len(raw_movies)
+
+    async def collect():
+        async for i, entry in iter_enriched_async(
+            raw_movies, include_providers, min_ready=ENRICH_MIN_READY, deadline=min(ENRICH_DEADLINE, time_left)
+        ):
+            candidates[i] = entry  # Keep Discover order for the ranking
+
+    try:
+        await asyncio.wait_for(collect(), timeout=time_left)
+    except asyncio.TimeoutError:
+        # Out of budget: rank what is enriched, plus Discover-only data if that's too few
+        missing = [i for i, c in enumerate(candidates) if c is None]
+        pad = missing[:max(_MIN_CANDIDATES - (len(raw_movies) - len(missing)), 0)]
+        for i in pad:
+            candidates[i] = basic_entry(raw_movies[i], include_providers)
+        budget.degrade("enrich_movies", f"timeout, {len(missing)} of {len(raw_movies)} not enriched")
+
+    return [c for c in candidates if c is not None]
+
+
+async def _rank_within(mood: str, candidates: list[dict], filters: dict, budget: Budget) -> list[dict]:
+    """rank_movies (GPT), or the local ranker if it can't finish in time."""
+    try:
+        return await budget.run(rank_movies_async(mood, candidates))
+    except asyncio.TimeoutError:
+        budget.degrade("rank_movies", "timeout, local ranking")
+        return rank_movies_local(mood, candidates, filters)
+
+
+async def recommend_cached(
+    mood: str, options: dict | None = None, budget_seconds: float | None = None
+) -> tuple[dict, str]:
+    """Cached run_recommendation. Returns (result, cache status: "hit" | "stale" | "miss").
+
+    The budget starts when the pipeline runs (also for a background refresh).
+    """
+    options = options or {}
+    result, status = await _get_response_cache().get_or_compute(
+        _cache_key(mood, options),
+        lambda: run_recommendation(
+            mood,
+            ranking=options.get("ranking", "llm"),
+            budget=Budget(budget_seconds or RECOMMEND_BUDGET),
+            exclude_ids=options.get("exclude_ids", ()),
+        ),
+    )
+    count_cache("response", status)
+    return result, status
+
+
+async def stream_recommendation(mood: str, ranking: str = "llm", exclude_ids=()):
+    """Same 4 steps as run_recommendation, as ("filters" | "candidate" | "pick", data) events."""
+    # Step 1: filters are sent before any TMDB call
+    filters = await parse_mood_async(mood)
+    record(filters)
+    yield "filters", filters
+
+    # Step 2 + 3: each candidate is sent as soon as its details + providers are in
+    raw_movies = await discover_movies_async(filters, limit=20, exclude_ids=exclude_ids)
+    candidates = [None] * len(raw_movies)
+    async for i, entry in _iter_enriched(raw_movies):
+        candidates[i] = entry  # Keep Discover order for the ranking prompt
+        yield "candidate", entry
+    candidates = [c for c in candidates if c is not None]
+
+    # Step 4: each pick is sent as soon as GPT has written it
+    if ranking == "local":
+        for movie in rank_movies_local(mood, candidates, filters):
+            yield "pick", movie
+    else:
+        async for movie in rank_movies_stream(mood, candidates):
+            yield "pick", movie
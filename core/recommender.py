@@ -2,12 +2,21 @@
 
 Takes enriched movie data + original mood, asks GPT to pick the best 5
 and explain WHY each matches the user's mood.
+rank_movies_async is the non-blocking twin used by the async /recommend path.
+Concurrent identical rankings (same mood, same candidates) share one GPT call.
+rank_movies_stream yields each pick as soon as GPT has written it (SSE endpoint).
 """
 
 import json
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from core.metrics import count_upstream, timed
+from core.singleflight import AsyncSingleFlight, SingleFlight
 
 _client = None
+_async_client = None
+_flight = SingleFlight()
+_flight_async = AsyncSingleFlight()
 
 SYSTEM_PROMPT = """You are a movie recommendation expert. Given a user's mood and a list of candidate movies, select the 5 BEST matches and explain why each one fits.
 
@@ -61,16 +70,15 @@ def _get_client() -> OpenAI:
     return _client
 
 
-def rank_movies(mood: str, candidates: list[dict]) -> list[dict]:
-    """Rank candidate movies and pick top 5 with explanations.
+def _get_async_client() -> AsyncOpenAI:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI()
+    return _async_client
 
-    Args:
-        mood: Original user mood string.
-        candidates: List of enriched movie dicts (from enrich_movies).
 
-    Returns:
-        List of 5 movie dicts, each with an added "why" field.
-    """
+def _request_kwargs(mood: str, candidates: list[dict]) -> dict:
+    """Chat completion arguments for one ranking call (shared by sync + async)."""
     # Build a concise summary of candidates for the prompt
     candidate_summaries = []
     for m in candidates:
@@ -93,38 +101,157 @@ Candidate movies:
 IMPORTANT: You MUST only use movie IDs from this list: {valid_ids}
 Do NOT invent or guess movie IDs. Pick exactly 5 from the candidates above."""
 
-    client = _get_client()
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": user_message},
         ],
-        functions=[RANK_FUNCTION],
-        function_call={"name": "rank_movies"},
-    )
+        "functions": [RANK_FUNCTION],
+        "function_call": {"name": "rank_movies"},
+    }
+
+
+def _flight_key(mood: str, candidates: list[dict]) -> tuple:
+    return (mood.strip().lower(), tuple(m["id"] for m in candidates))
+
 
+def _map_picks(response, candidates: list[dict]) -> list[dict]:
+    """Map GPT picks back to full movie data, with fallback for missing IDs."""
     fn_call = response.choices[0].message.function_call
     result = json.loads(fn_call.arguments)
 
-    # Map picks back to full movie data, with fallback for missing IDs
     candidates_by_id = {m["id"]: m for m in candidates}
     picked_ids = set()
     ranked = []
     for pick in result["picks"]:
-        if pick["movie_id"] in picked_ids:
-            continue  # Skip duplicates
-        movie = candidates_by_id.get(pick["movie_id"])
+        movie = _accept_pick(pick, candidates_by_id, picked_ids)
         if movie:
-            ranked.append({**movie, "why": pick["why"]})
-            picked_ids.add(pick["movie_id"])
-
-    # Fallback: if GPT returned fewer than 5 valid picks, fill with top candidates
-    if len(ranked) < 5:
-        for m in candidates:
-            if m["id"] not in picked_ids:
-                ranked.append({**m, "why": ""})
-                if len(ranked) >= 5:
-                    break
-
-    return ranked
+            ranked.append(movie)
+
+    return ranked + _fill_picks(candidates, picked_ids, 5 - len(ranked))
+
+
+def _accept_pick(pick: dict, candidates_by_id: dict, picked_ids: set) -> dict | None:
+    """Candidate + "why" for one GPT pick, or None for a duplicate / invented ID."""
+    movie_id = pick.get("movie_id")
+    if movie_id in picked_ids:
+        return None  # Skip duplicates
+    movie = candidates_by_id.get(movie_id)
+    if not movie:
+        return None
+    picked_ids.add(movie_id)
+    return {**movie, "why": pick.get("why", "")}
+
+
+def _fill_picks(candidates: list[dict], picked_ids: set, missing: int) -> list[dict]:
+    """Fallback: if GPT returned fewer than 5 valid picks, fill with top candidates."""
+    fill = []
+    for m in candidates:
+        if len(fill) >= missing:
+            break
+        if m["id"] not in picked_ids:
+            fill.append({**m, "why": ""})
+    return fill
+
+
+class _PickStream:
+    """Pulls each complete pick object out of the streamed function-call arguments.
+
+    The arguments arrive as JSON fragments ('{"picks": [{"movie_id": 5, "wh' ...).
+    Tracking brace depth (outside strings) finds where each pick object ends.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._start = None
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, fragment: str) -> list[dict]:
+        self._buffer += fragment
+        picks = []
+        while self._pos < len(self._buffer):
+            c = self._buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c == "{":
+                self._depth += 1
+                if self._depth == 2:  # {"picks": [ {  <- a pick starts
+                    self._start = self._pos
+            elif c == "}":
+                if self._depth == 2:
+                    try:
+                        picks.append(json.loads(self._buffer[self._start:self._pos + 1]))
+                    except ValueError:
+                        pass
+                self._depth -= 1
+            self._pos += 1
+        return picks
+
+
+def _create(**kwargs):
+    count_upstream("openai", "rank_movies")
+    return _get_client().chat.completions.create(**kwargs)
+
+
+async def _create_async(**kwargs):
+    count_upstream("openai", "rank_movies")
+    return await _get_async_client().chat.completions.create(**kwargs)
+
+
+@timed("rank_movies")
+def rank_movies(mood: str, candidates: list[dict]) -> list[dict]:
+    """Rank candidate movies and pick top 5 with explanations.
+
+    Args:
+        mood: Original user mood string.
+        candidates: List of enriched movie dicts (from enrich_movies).
+
+    Returns:
+        List of 5 movie dicts, each with an added "why" field.
+    """
+    response = _flight.do(
+        _flight_key(mood, candidates),
+        lambda: _create(**_request_kwargs(mood, candidates)),
+    )
+    return _map_picks(response, candidates)
+
+
+@timed("rank_movies")
+async def rank_movies_async(mood: str, candidates: list[dict]) -> list[dict]:
+    """Async variant of rank_movies — awaits OpenAI instead of blocking a worker thread."""
+    response = await _flight_async.do(
+        _flight_key(mood, candidates),
+        lambda: _create_async(**_request_kwargs(mood, candidates)),
+    )
+    return _map_picks(response, candidates)
+
+
+async def rank_movies_stream(mood: str, candidates: list[dict]):
+    """Streaming variant of rank_movies_async — yields each ranked movie as soon as GPT has written it."""
+    stream = await _create_async(**_request_kwargs(mood, candidates), stream=True)
+    candidates_by_id = {m["id"]: m for m in candidates}
+    picked_ids = set()
+    parser = _PickStream()
+    count = 0
+    async for chunk in stream:
+        if not chunk.choices or not chunk.choices[0].delta.function_call:
+            continue
+        for pick in parser.feed(chunk.choices[0].delta.function_call.arguments or ""):
+            movie = _accept_pick(pick, candidates_by_id, picked_ids)
+            if movie and count < 5:
+                count += 1
+                yield movie
+
+    for movie in _fill_picks(candidates, picked_ids, 5 - count):
+        yield movie
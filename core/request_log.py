@@ -0,0 +1,94 @@
+"""Request log — the filter dicts /recommend has asked Discover for, one JSON line each.
+
+Many moods collapse to the same filters ("funny movie", "a comedy",
+"something to laugh at" → {"with_genres": "35", ...}), so a handful of
+signatures covers most of the traffic. The log exists to find them: the
+Discover cache warm-up (tmdb_client.warm_discover_cache_async, at startup or
+via scripts/warm_discover_cache.py) pre-fetches the most common ones.
+
+Enabled by REQUEST_LOG_PATH. record() only appends the line to an in-memory
+buffer, so the request path does no file IO; flush_periodically(), a task the
+app starts, appends the buffer in one write every few seconds from a worker
+thread (and the app flushes once more at shutdown).
+Past REQUEST_LOG_MAX_BYTES the log is rotated to <path>.1, replacing the
+previous one, so it holds the recent traffic and never grows unbounded.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import threading
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LOG_PATH = os.environ.get("REQUEST_LOG_PATH")
+REQUEST_LOG_MAX_BYTES = int(os.environ.get("REQUEST_LOG_MAX_BYTES", 10 * 1024 * 1024))
+
+# Seconds between two writes of the buffered lines
+_FLUSH_EVERY = 5.0
+
+_lock = threading.Lock()
+_buffer = defaultdict(list)  # path -> lines not written yet
+
+
+def signature(filters: dict) -> str:
+    """Canonical form of a filter dict: sorted keys, no empty values."""
+    return json.dumps({k: v for k, v in filters.items() if v not in (None, "")}, sort_keys=True)
+
+
+def record(filters: dict, path: str | None = REQUEST_LOG_PATH):
+    """Buffer one filter signature for the log (no-op when the log is disabled)."""
+    if not path:
+        return
+    with _lock:
+        _buffer[path].append(signature(filters))
+
+
+def flush():
+    """Append the buffered lines to their logs, rotating a log that has outgrown REQUEST_LOG_MAX_BYTES.
+
+    Blocking file IO — call it from a worker thread on the async path.
+    """
+    with _lock:
+        pending = {path: lines for path, lines in _buffer.items() if lines}
+        _buffer.clear()
+    for path, lines in pending.items():
+        try:
+            if os.path.exists(path) and os.path.getsize(path) >= REQUEST_LOG_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a") as f:
+                f.write("".join(line + "\n" for line in lines))
+        except OSError as e:
+            logger.warning(f"Request log not writable: {e}")
+
+
+async def flush_periodically(every: float = _FLUSH_EVERY):
+    """Flush the buffer every `every` seconds, off the event loop, until cancelled."""
+    while True:
+        await asyncio.sleep(every)
+        await asyncio.to_thread(flush)
+
+
+def top_signatures(n: int, path: str | None = REQUEST_LOG_PATH) -> list[dict]:
+    """The n most frequent filter dicts in the log (and its rotated predecessor), most frequent first."""
+    if not path:
+        return []
+    counts = Counter()
+    for log in (path + ".1", path):
+        if not os.path.exists(log):
+            continue
+        with open(log) as f:
+            for line in f:
+                counts[line.strip()] += 1
+
+    top = []
+    for line, _ in counts.most_common():
+        try:
+            top.append(json.loads(line))
+        except ValueError:
+            continue  # Empty or torn line
+        if len(top) == n:
+            break
+    return top
@@ -0,0 +1,182 @@
+"""Semantic mood cache — near-duplicate moods reuse the same filters.
+
+The exact mood cache only matches after strip().lower(), so
+"a cozy rainy sunday movie" and "cozy movie for a rainy sunday" each cost an
+OpenAI call. Here every parsed mood is embedded with a hashed n-gram
+vectoriser (no model to download, ~0.1 ms per mood) and a lookup returns the
+filters of the nearest stored mood when its cosine similarity reaches
+MOOD_SEMANTIC_THRESHOLD.
+
+How it works:
+- features: content words, word bigrams and character trigrams (typos,
+  plurals), hashed into a fixed-size signed vector, L2-normalised
+- filler words ("a", "movie", "for", "un", "film"...) are dropped, negations
+  stick to the next word ("not scary" → "not_scary"), so "not scary" is far
+  from "scary"
+- stored moods live in one preallocated matrix: a lookup is one mat-vec
+- a close match can still differ in a hard filter ("... on netflix" vs
+  "... on hulu" scores 0.88): the caller passes an `accept` check, and only
+  matches it accepts are served (the best accepted one above the threshold)
+- info() reports the hit rate plus a histogram of best-match similarities,
+  which shows where to put the threshold
+"""
+
+import os
+import re
+import zlib
+import threading
+import numpy as np
+
+DIM = 2 ** 12
+
+_STOP_WORDS = {
+    # English
+    "a", "an", "the", "for", "of", "to", "on", "in", "and", "or", "with", "some",
+    "something", "me", "i", "im", "want", "watch", "watching", "show",
+    "movie", "movies", "film", "films", "please", "like", "that", "is", "it",
+    "this", "tonight", "give", "recommend", "looking", "good",
+    # French
+    "un", "une", "des", "le", "la", "les", "de", "du", "pour", "et", "ou", "avec",
+    "je", "veux", "voir", "regarder", "ce", "soir", "quelque",
+    "chose", "qui", "est", "bon",
+}
+_NEGATIONS = {"no", "not", "without", "non", "pas", "sans", "ni", "never", "jamais"}
+
+# Best-match similarity buckets reported by info() for threshold tuning
+_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0)
+
+_WEIGHTS = {"word": 1.0, "bigram": 0.7, "char": 0.25}
+
+
+def _tokens(text: str) -> list[str]:
+    """Content words, with negations attached to the word that follows."""
+    tokens = []
+    negate = False
+    for word in re.findall(r"\w+", text.lower()):
+        if word in _NEGATIONS:
+            negate = True
+            continue
+        if word in _STOP_WORDS:
+            continue
+        tokens.append(f"not_{word}" if negate else word)
+        negate = False
+    return tokens
+
+
+def _features(text: str):
+    tokens = _tokens(text)
+    for token in tokens:
+        yield token, _WEIGHTS["word"]
+        padded = f"<{token}>"
+        for i in range(len(padded) - 2):
+            yield "#" + padded[i:i + 3], _WEIGHTS["char"]
+    for left, right in zip(tokens, tokens[1:]):
+        yield f"{left} {right}", _WEIGHTS["bigram"]
+
+
+def embed(text: str, dim: int = DIM) -> np.ndarray:
+    """Hashed n-gram embedding (signed feature hashing), L2-normalised float32."""
+    vec = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(text):
+        h = zlib.crc32(feature.encode("utf-8"))  # Stable across processes, unlike hash()
+        vec[h % dim] += weight if h & 0x80000000 else -weight
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+class SemanticCache:
+    """Nearest-neighbour cache over mood embeddings (in-process, ring buffer of maxsize entries)."""
+
+    def __init__(self, threshold: float = 0.85, maxsize: int = 1024, dim: int = DIM):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0  # Lookups whose matches above the threshold were all refused by `accept`
+        self._vectors = np.zeros((maxsize, dim), dtype=np.float32)
+        self._moods = [None] * maxsize
+        self._values = [None] * maxsize
+        self._size = 0
+        self._next = 0  # Slot overwritten by the next add (oldest entry once full)
+        self._index = {}  # mood -> slot, so re-adding a mood updates it in place
+        self._best_scores = [0] * (len(_BUCKETS) + 1)
+        self._lock = threading.Lock()
+
+    def get(self, mood: str, accept=None):
+        """Return (value, similarity, matched mood) for the nearest stored mood, or None below threshold.
+
+        accept(matched_mood, value) -> bool, if given, can refuse a match; the
+        next nearest one above the threshold is tried instead.
+        """
+        vec = embed(mood, self._vectors.shape[1])
+        with self._lock:
+            if self._size == 0 or not vec.any():
+                self.misses += 1
+                return None
+            scores = self._vectors[:self._size] @ vec
+            best = int(np.argmax(scores))
+            self._best_scores[int(np.searchsorted(_BUCKETS, float(scores[best]), side="right"))] += 1
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for slot in candidates[np.argsort(-scores[candidates], kind="stable")]:
+                if accept is None or accept(self._moods[slot], self._values[slot]):
+                    self.hits += 1
+                    return self._values[slot], float(scores[slot]), self._moods[slot]
+            self.misses += 1
+            if len(candidates):
+                self.rejected += 1
+            return None
+
+    def set(self, mood: str, value):
+        vec = embed(mood, self._vectors.shape[1])
+        if not vec.any():
+            return  # Nothing but filler words: never match on it
+        with self._lock:
+            slot = self._index.get(mood)
+            if slot is None:
+                slot = self._next
+                if self._moods[slot] is not None:
+                    del self._index[self._moods[slot]]
+                self._next = (self._next + 1) % self.maxsize
+                self._size = min(self._size + 1, self.maxsize)
+                self._index[mood] = slot
+            self._vectors[slot] = vec
+            self._moods[slot] = mood
+            self._values[slot] = value
+
+    def clear(self):
+        with self._lock:
+            self._vectors[:] = 0
+            self._moods = [None] * self.maxsize
+            self._values = [None] * self.maxsize
+            self._size = self._next = 0
+            self._index.clear()
+            self.hits = self.misses = self.rejected = 0
+            self._best_scores = [0] * (len(_BUCKETS) + 1)
+
+    def info(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            labels = [f"<{_BUCKETS[0]}"] + [
+                f"{lo}-{hi}" for lo, hi in zip(_BUCKETS, _BUCKETS[1:])
+            ] + [f">={_BUCKETS[-1]}"]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "size": self._size,
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "best_similarity": dict(zip(labels, self._best_scores)),
+            }
+
+
+def semantic_cache_from_env() -> SemanticCache | None:
+    """SemanticCache configured by MOOD_SEMANTIC_THRESHOLD / MOOD_SEMANTIC_MAXSIZE (threshold "off" disables it)."""
+    threshold = os.environ.get("MOOD_SEMANTIC_THRESHOLD", "0.85")
+    if threshold.lower() in ("off", "0", "false", "no"):
+        return None
+    return SemanticCache(
+        threshold=float(threshold),
+        maxsize=int(os.environ.get("MOOD_SEMANTIC_MAXSIZE", 1024)),
+    )
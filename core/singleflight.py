@@ -0,0 +1,84 @@
+"""Singleflight — concurrent identical calls share one upstream request.
+
+A cache only helps once the first call has finished. When the same trending
+mood arrives 200 times in the same second, all 200 miss the cache together.
+A flight group makes the first caller for a key run the call while the others
+wait for its result (or its exception) instead of calling upstream themselves.
+
+SingleFlight is for sync code (threads), AsyncSingleFlight for coroutines.
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-based flight group."""
+
+    def __init__(self):
+        self.shared = 0  # Calls that joined an in-flight call instead of running their own
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Run fn() once per key at a time; concurrent callers with the same key get its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "shared": self.shared}
+
+
+class AsyncSingleFlight:
+    """asyncio flight group — the shared call runs as a task of the current event loop."""
+
+    def __init__(self):
+        self.shared = 0
+        self._tasks = {}
+
+    async def do(self, key, coro_fn):
+        """Await coro_fn() once per key at a time; concurrent awaiters with the same key get its result."""
+        task = self._tasks.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(coro_fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _t: self._tasks.pop(key, None))
+
+        # shield: one caller giving up (client disconnect) must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def info(self) -> dict:
+        return {"in_flight": len(self._tasks), "shared": self.shared}
@@ -1,15 +1,92 @@
 """TMDB API client — wraps Discover, Movie Details, and Watch Providers endpoints.
 
-All calls go through httpx (sync). TMDB API key is read from environment.
+All calls go through one pooled httpx client per app (opened and closed by
+api.py); every endpoint has a sync function and an async twin (suffix _async).
+Responses are cached per endpoint (in memory, or SQLite with TMDB_CACHE_PATH)
+and identical in-flight calls are coalesced (core.singleflight).
+
+- Movies: one /movie/{id} call with append_to_response, parsed by parse_movie;
+  enrichment fans out concurrently.
+- Discover: page 1, then the pages the candidate target still needs; answered
+  from the local index first when CATALOG_INDEX_PATH is set (core.catalog_index).
+- People: local index (core.person_index) first, then /search/person, then a
+  fuzzy match.
+
+TMDB API key is read from environment.
 Attribution required: "This product uses the TMDB API but is not endorsed or certified by TMDB."
 """
 
 import os
+import json
+import asyncio
+import hashlib
+import logging
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import httpx
 
+from core.cache import LRUCache, SQLiteCache
+from core.catalog_index import CatalogIndex
+from core.metrics import count_cache, count_upstream, timed
+from core.person_index import PersonIndex
+from core.singleflight import AsyncSingleFlight, SingleFlight
+
+logger = logging.getLogger(__name__)
+
 _BASE = "https://api.themoviedb.org/3"
 _IMG_BASE = "https://image.tmdb.org/t/p"
 
+# Max TMDB calls in flight during enrichment (one call per movie, providers appended)
+ENRICH_CONCURRENCY = 20
+
+_client = None
+_client_lock = threading.Lock()
+_async_client = None
+_cache = None
+_cache_lock = threading.Lock()
+_flight = SingleFlight()
+_flight_async = AsyncSingleFlight()
+_people = PersonIndex(os.environ.get("PERSON_INDEX_PATH"))
+
+# Discover pages (20 results each) fetched at most to fill the candidate pool
+DISCOVER_MAX_PAGES = int(os.environ.get("DISCOVER_MAX_PAGES", 5))
+_DISCOVER_PAGE_SIZE = 20
+# Most common filter signatures of the request log warmed into the Discover cache at startup
+DISCOVER_WARMUP_TOP = int(os.environ.get("DISCOVER_WARMUP_TOP", 50))
+
+# Local Discover index (mirror file written by scripts/sync_catalog_index.py); TMDB is
+# still asked when the index finds fewer than CATALOG_INDEX_MIN_RESULTS movies
+CATALOG_INDEX_PATH = os.environ.get("CATALOG_INDEX_PATH")
+CATALOG_INDEX_MIN_RESULTS = int(os.environ.get("CATALOG_INDEX_MIN_RESULTS", 10))
+_catalog_index = None
+_catalog_index_mtime = None
+_catalog_index_lock = threading.Lock()
+
+# Pages of /person/popular (20 people each) loaded into the person index at startup,
+# again at most once a week when the index is persisted
+PERSON_PRELOAD_PAGES = int(os.environ.get("PERSON_PRELOAD_PAGES", 25))
+_PERSON_PRELOAD_MAX_AGE = 7 * 24 * 3600
+
+# Cache TTL per endpoint (seconds) — details rarely change, providers change daily,
+# Discover's popularity order drifts within the day
+CACHE_TTL = {
+    "details": 7 * 24 * 3600,
+    "providers": 24 * 3600,
+    "person": 30 * 24 * 3600,
+    "discover": float(os.environ.get("DISCOVER_CACHE_TTL", 6 * 3600)),
+}
+
+# Sub-resources requested with append_to_response on /movie/{id}: cache key prefix + TTL.
+# Each part is cached on its own, so a movie only costs a call when one part is missing.
+_APPENDABLE = {
+    "watch/providers": ("providers", CACHE_TTL["providers"]),
+    "credits": ("credits", CACHE_TTL["details"]),
+}
+
+_MISSING = object()
+
 GENRE_ID_TO_NAME = {
     28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy",
     80: "Crime", 99: "Documentary", 18: "Drama", 10751: "Family",
@@ -18,6 +95,19 @@ GENRE_ID_TO_NAME = {
     53: "Thriller", 10752: "War", 37: "Western",
 }
 
+# Map our filter keys to TMDB parameter names
+_PARAM_MAPPING = {
+    "with_genres": "with_genres",
+    "vote_average_gte": "vote_average.gte",
+    "with_runtime_gte": "with_runtime.gte",
+    "with_runtime_lte": "with_runtime.lte",
+    "sort_by": "sort_by",
+    "release_date_gte": "primary_release_date.gte",
+    "release_date_lte": "primary_release_date.lte",
+    "with_watch_providers": "with_watch_providers",
+    "with_original_language": "with_original_language",
+}
+
 
 def _headers() -> dict:
     api_key = os.environ.get("TMDB_API_KEY", "")
@@ -27,30 +117,216 @@ def _headers() -> dict:
     }
 
 
-def search_person(name: str) -> int | None:
-    """Search TMDB for a person by name, return their ID or None."""
-    resp = httpx.get(
-        f"{_BASE}/search/person",
-        params={"query": name, "language": "en-US"},
-        headers=_headers(),
-    )
-    resp.raise_for_status()
-    results = resp.json().get("results", [])
-    if results:
-        return results[0]["id"]
-    return None
+def _http2_enabled() -> bool:
+    """HTTP/2 multiplexes all calls over a few connections — needs the optional h2 package."""
+    if os.environ.get("TMDB_HTTP2", "1") == "0":
+        return False
+    return importlib.util.find_spec("h2") is not None
 
 
-def discover_movies(filters: dict, limit: int = 5) -> list[dict]:
-    """Call TMDB Discover endpoint with parsed filters.
+def _client_kwargs() -> dict:
+    """Pool + timeout settings shared by the sync and async clients."""
+    return {
+        "http2": _http2_enabled(),
+        "timeout": httpx.Timeout(
+            float(os.environ.get("TMDB_TIMEOUT", 10)),
+            connect=float(os.environ.get("TMDB_CONNECT_TIMEOUT", 5)),
+        ),
+        "limits": httpx.Limits(
+            max_connections=int(os.environ.get("TMDB_MAX_CONNECTIONS", ENRICH_CONCURRENCY * 2)),
+            max_keepalive_connections=int(os.environ.get("TMDB_MAX_KEEPALIVE", ENRICH_CONCURRENCY)),
+            keepalive_expiry=float(os.environ.get("TMDB_KEEPALIVE_EXPIRY", 60)),
+        ),
+    }
 
-    Args:
-        filters: Dict from mood_parser.parse_mood() — keys map to TMDB params.
-        limit: Number of movies to return (default 5 for Walking Skeleton).
 
-    Returns:
-        List of movie dicts with basic metadata from Discover.
+def _get_client() -> httpx.Client:
+    """Shared client — reuses TCP+TLS connections across calls and threads."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(**_client_kwargs())
+    return _client
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Shared async client for the async request path (one per event loop)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(**_client_kwargs())
+    return _async_client
+
+
+def open_clients():
+    """Create the shared TMDB clients. Call once at app startup, inside the event loop.
+
+    Scripts can skip this: the clients are also created lazily on first use.
     """
+    _get_client()
+    _get_async_client()
+    logger.info(f"TMDB clients ready (http2={_http2_enabled()})")
+
+
+async def close_clients():
+    """Close the shared TMDB clients and their pooled connections. Call at app shutdown."""
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def _get_cache():
+    """TMDB response cache — SQLite file if TMDB_CACHE_PATH is set, else in-process LRU."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                path = os.environ.get("TMDB_CACHE_PATH")
+                maxsize = int(os.environ.get("TMDB_CACHE_MAXSIZE", 5000))
+                _cache = SQLiteCache(path, maxsize=maxsize) if path else LRUCache(maxsize=maxsize)
+    return _cache
+
+
+def tmdb_cache_info() -> dict:
+    """Hit/miss stats of the TMDB response cache (reported on /health)."""
+    return {
+        **_get_cache().info(),
+        "coalesced": _flight.shared + _flight_async.shared,
+        "people": _people.info(),
+        "catalog_index": _catalog_index.info() if _catalog_index is not None else None,
+    }
+
+
+def load_catalog_index():
+    """Build the local Discover index from CATALOG_INDEX_PATH (at startup, then whenever the file changes)."""
+    global _catalog_index, _catalog_index_mtime
+    try:
+        # Recorded first: a broken file is retried when it is replaced, not on every request
+        _catalog_index_mtime = os.stat(CATALOG_INDEX_PATH).st_mtime
+        index = CatalogIndex.load(CATALOG_INDEX_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Catalogue index not loaded: {type(e).__name__}: {e}")
+        return
+    _catalog_index = index
+    logger.info(f"Catalogue index: {len(index)} movies from {CATALOG_INDEX_PATH}")
+
+
+def _reload_catalog_index():
+    try:
+        load_catalog_index()
+    finally:
+        _catalog_index_lock.release()
+
+
+def _get_catalog_index() -> CatalogIndex | None:
+    """Current index; a replaced mirror file is reloaded in a background thread while the old index serves."""
+    if not CATALOG_INDEX_PATH:
+        return None
+    try:
+        mtime = os.stat(CATALOG_INDEX_PATH).st_mtime
+    except OSError:
+        return _catalog_index
+    if mtime != _catalog_index_mtime and _catalog_index_lock.acquire(blocking=False):
+        threading.Thread(target=_reload_catalog_index, daemon=True).start()
+    return _catalog_index
+
+
+def _discover_local(filters: dict, limit: int, exclude_ids: set) -> list[dict] | None:
+    """Discover results from the local index, or None when TMDB has to be asked."""
+    index = _get_catalog_index()
+    if index is None:
+        return None
+    results = index.search(filters, limit, exclude_ids)
+    if results is None or len(results) < min(limit, CATALOG_INDEX_MIN_RESULTS):
+        index.misses += 1
+        count_cache("catalog_index", "miss")
+        return None
+    index.hits += 1
+    count_cache("catalog_index", "hit")
+    return results
+
+
+def _get_json(path: str, params: dict | None = None) -> dict:
+    count_upstream("tmdb", path)
+    resp = _get_client().get(f"{_BASE}{path}", params=params, headers=_headers())
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def _get_json_async(path: str, params: dict | None = None) -> dict:
+    count_upstream("tmdb", path)
+    resp = await _get_async_client().get(f"{_BASE}{path}", params=params, headers=_headers())
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _cached_json(key: str, ttl: float, path: str, params: dict | None = None, parse=None):
+    """Cache lookup; on a miss, one coalesced upstream call whose (parsed) result is cached."""
+    value = _get_cache().get(key, _MISSING)
+    count_cache("tmdb", "miss" if value is _MISSING else "hit")
+    if value is _MISSING:
+        def fetch():
+            data = _get_json(path, params)
+            result = parse(data) if parse else data
+            _get_cache().set(key, result, ttl=ttl)
+            return result
+
+        value = _flight.do(key, fetch)
+    return value
+
+
+async def _cached_json_async(key: str, ttl: float, path: str, params: dict | None = None, parse=None):
+    """Async variant of _cached_json (the SQLite cache is read and written off the event loop)."""
+    value = await _get_cache().aget(key, _MISSING)
+    count_cache("tmdb", "miss" if value is _MISSING else "hit")
+    if value is _MISSING:
+        async def fetch():
+            data = await _get_json_async(path, params)
+            result = parse(data) if parse else data
+            await _get_cache().aset(key, result, ttl=ttl)
+            return result
+
+        value = await _flight_async.do(key, fetch)
+    return value
+
+
+def _canonical(value) -> str:
+    """6, 6.0 and "6.0" are the same query value; so are "35|10749" and "10749|35"."""
+    if isinstance(value, str):
+        if "|" in value or "," in value:
+            # "a|b" = either, "a,b" = both: the order doesn't matter at either level
+            groups = [sorted(_canonical(part.strip()) for part in group.split(",")) for group in value.split("|")]
+            return "|".join(sorted(",".join(group) for group in groups))
+        try:
+            value = float(value)
+        except ValueError:
+            return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _discover_key(params: dict) -> str:
+    """Cache key of one Discover page: a hash of the canonical params (sorted, stringified)."""
+    canonical = json.dumps({k: _canonical(v) for k, v in params.items() if v is not None}, sort_keys=True)
+    return "discover:" + hashlib.sha1(canonical.encode()).hexdigest()
+
+
+# ─── Shared request building / response parsing ───
+
+def _cast_names(filters: dict) -> list[str]:
+    if "with_cast_names" in filters and filters["with_cast_names"]:
+        return [n.strip() for n in filters["with_cast_names"].split(",")]
+    return []
+
+
+def _discover_params(filters: dict, cast_ids: list[int | None]) -> dict:
+    """Build Discover query params from our filter dict + resolved cast IDs."""
     params = {
         "include_adult": "false",
         "include_video": "false",
@@ -58,71 +334,59 @@ def discover_movies(filters: dict, limit: int = 5) -> list[dict]:
         "page": 1,
     }
 
-    # Map our filter keys to TMDB parameter names
-    param_mapping = {
-        "with_genres": "with_genres",
-        "vote_average_gte": "vote_average.gte",
-        "with_runtime_gte": "with_runtime.gte",
-        "with_runtime_lte": "with_runtime.lte",
-        "sort_by": "sort_by",
-        "release_date_gte": "primary_release_date.gte",
-        "release_date_lte": "primary_release_date.lte",
-        "with_watch_providers": "with_watch_providers",
-        "with_original_language": "with_original_language",
-    }
-
     # If filtering by provider, must specify watch region
     if "with_watch_providers" in filters and filters["with_watch_providers"]:
         params["watch_region"] = "US"
 
-    # Resolve cast names to TMDB person IDs
-    if "with_cast_names" in filters and filters["with_cast_names"]:
-        cast_names = [n.strip() for n in filters["with_cast_names"].split(",")]
-        cast_ids = []
-        for name in cast_names:
-            pid = search_person(name)
-            if pid:
-                cast_ids.append(str(pid))
-        if cast_ids:
-            params["with_cast"] = "|".join(cast_ids)
-
-    for our_key, tmdb_key in param_mapping.items():
+    resolved = [str(pid) for pid in cast_ids if pid]
+    if resolved:
+        params["with_cast"] = "|".join(resolved)
+
+    for our_key, tmdb_key in _PARAM_MAPPING.items():
         if our_key in filters and filters[our_key] is not None:
             params[tmdb_key] = filters[our_key]
 
     # Ensure minimum vote count to avoid obscure movies with few ratings
     params["vote_count.gte"] = 50
+    return params
 
-    resp = httpx.get(f"{_BASE}/discover/movie", params=params, headers=_headers())
-    resp.raise_for_status()
-    results = resp.json().get("results", [])
 
-    return results[:limit]
+def _page_params(params: dict, page: int) -> dict:
+    return {**params, "page": page}
 
 
-def get_movie_details(movie_id: int) -> dict:
-    """Fetch full details for a single movie (includes runtime)."""
-    resp = httpx.get(
-        f"{_BASE}/movie/{movie_id}",
-        params={"language": "en-US"},
-        headers=_headers(),
-    )
-    resp.raise_for_status()
-    return resp.json()
+def _next_pages(fetched: int, total_pages: int, missing: int) -> list[int]:
+    """Pages still worth fetching for `missing` candidates (after pages 1..fetched)."""
+    last = min(total_pages, DISCOVER_MAX_PAGES, fetched + -(-missing // _DISCOVER_PAGE_SIZE))
+    return list(range(fetched + 1, last + 1))
 
 
-def get_watch_providers(movie_id: int, region: str = "US") -> list[dict]:
-    """Fetch streaming providers for a movie in a given region.
+def _add_results(pool: dict, data: dict, exclude_ids: set):
+    """Local prefilters: duplicates across pages and already-seen movies are dropped."""
+    for movie in data.get("results", []):
+        if movie["id"] not in exclude_ids and movie["id"] not in pool:
+            pool[movie["id"]] = movie
 
-    Returns list of dicts: [{"name": "Netflix", "logo_url": "..."}]
-    Only returns 'flatrate' (subscription) providers, not rent/buy.
-    """
-    resp = httpx.get(
-        f"{_BASE}/movie/{movie_id}/watch/providers",
-        headers=_headers(),
-    )
-    resp.raise_for_status()
-    results = resp.json().get("results", {})
+
+def _first_person_id(data: dict) -> int | None:
+    results = data.get("results", [])
+    if results:
+        return results[0]["id"]
+    return None
+
+
+def _popular_actors(data: dict) -> list[tuple[str, int, float]]:
+    """(name, person_id, popularity) of the actors on one /person/popular page."""
+    return [
+        (person["name"], person["id"], person.get("popularity", 0.0))
+        for person in data.get("results", [])
+        if person.get("known_for_department", "Acting") == "Acting"
+    ]
+
+
+def _parse_providers(data: dict, region: str) -> list[dict]:
+    """Keep only 'flatrate' (subscription) providers for one region."""
+    results = data.get("results", {})
     country_data = results.get(region, {})
     flatrate = country_data.get("flatrate", [])
 
@@ -135,31 +399,408 @@ def get_watch_providers(movie_id: int, region: str = "US") -> list[dict]:
     ]
 
 
+def parse_movie(data: dict) -> dict:
+    """Movie entry from a /movie/{id} payload or a Discover result (genre objects or genre IDs)."""
+    if "genres" in data:
+        genre_names = [g["name"] for g in data["genres"]]
+    else:
+        genre_names = [GENRE_ID_TO_NAME.get(gid, "Unknown") for gid in data.get("genre_ids", [])]
+
+    return {
+        "id": data["id"],
+        "title": data.get("title", ""),
+        "genres": genre_names,
+        "rating": data.get("vote_average", 0),
+        "runtime": data.get("runtime", 0),
+        "release_year": (data.get("release_date") or "")[:4],
+        "overview": data.get("overview", ""),
+        "poster_url": f"{_IMG_BASE}/w500{data['poster_path']}" if data.get("poster_path") else None,
+    }
+
+
+def _movie_params(append: tuple[str, ...]) -> dict:
+    params = {"language": "en-US"}
+    if append:
+        params["append_to_response"] = ",".join(append)
+    return params
+
+
+def _movie_keys(movie_id: int, append: tuple[str, ...]) -> dict:
+    """Cache key of each part of a movie: details + every appended sub-resource."""
+    return {"details": f"details:{movie_id}", **{name: f"{_APPENDABLE[name][0]}:{movie_id}" for name in append}}
+
+
+def _movie_from_cache(keys: dict, cached: dict) -> dict | None:
+    """The movie from its cached parts, or None if any part is missing."""
+    hit = all(key in cached for key in keys.values())
+    count_cache("tmdb", "hit" if hit else "miss")
+    return {part: cached[key] for part, key in keys.items()} if hit else None
+
+
+def _cached_movie(movie_id: int, append: tuple[str, ...]) -> dict | None:
+    """Details + every appended sub-resource from the cache (one lookup), or None if any part is missing."""
+    keys = _movie_keys(movie_id, append)
+    return _movie_from_cache(keys, _get_cache().get_many(keys.values()))
+
+
+async def _cached_movie_async(movie_id: int, append: tuple[str, ...]) -> dict | None:
+    keys = _movie_keys(movie_id, append)
+    return _movie_from_cache(keys, await _get_cache().aget_many(keys.values()))
+
+
+def _split_movie(movie_id: int, data: dict, append: tuple[str, ...]) -> tuple[dict, list]:
+    """Split one /movie/{id} payload into details + sub-resources, and their cache entries (key, value, ttl)."""
+    keys = _movie_keys(movie_id, append)
+    movie = {"details": {k: v for k, v in data.items() if k not in _APPENDABLE}}
+    entries = [(keys["details"], movie["details"], CACHE_TTL["details"])]
+    for name in append:
+        movie[name] = data.get(name) or {}
+        entries.append((keys[name], movie[name], _APPENDABLE[name][1]))
+    return movie, entries
+
+
+def _enrich_append(include_providers: bool) -> tuple[str, ...]:
+    return ("watch/providers",) if include_providers else ()
+
+
+def _build_entry(movie: dict, fetched: dict | None, include_providers: bool) -> dict:
+    """Merge a Discover result with its get_movie() result (None if that call failed) into one candidate."""
+    # Discover already has title, rating, overview, poster — only runtime is lost
+    entry = parse_movie({**movie, **fetched["details"]} if fetched else movie)
+
+    if include_providers:
+        providers = _parse_providers(fetched["watch/providers"], "US") if fetched else []
+        entry["providers"] = providers
+
+    return entry
+
+
+def basic_entry(movie: dict, include_providers: bool = False) -> dict:
+    """Candidate from the Discover result alone (no runtime, no providers) — for degraded responses."""
+    return _build_entry(movie, None, include_providers)
+
+
+# ─── Sync API ───
+
+def search_person(name: str) -> int | None:
+    """Search TMDB for a person by name, return their ID or None."""
+    return _cached_json(
+        f"person:{name.strip().lower()}",
+        CACHE_TTL["person"],
+        "/search/person",
+        params={"query": name, "language": "en-US"},
+        parse=_first_person_id,
+    )
+
+
+def resolve_person(name: str) -> int | None:
+    """Person ID for an actor name — person index first, /search/person on a miss, fuzzy match last."""
+    person_id = _people.lookup(name)
+    if person_id is None:
+        person_id = search_person(name)
+        if person_id:
+            _people.add(name, person_id)
+        else:
+            person_id = _people.closest(name)
+    return person_id
+
+
+def _resolve_cast(names: list[str]) -> list[int | None]:
+    """Resolve every actor of a mood concurrently (only misses cost a call)."""
+    if len(names) <= 1:
+        return [resolve_person(name) for name in names]
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        return list(pool.map(resolve_person, names))
+
+
+def _discover_page(params: dict, page: int) -> dict:
+    page_params = _page_params(params, page)
+    return _cached_json(_discover_key(page_params), CACHE_TTL["discover"], "/discover/movie", page_params)
+
+
+@timed("discover_movies")
+def discover_movies(filters: dict, limit: int = 5, exclude_ids=()) -> list[dict]:
+    """Call TMDB Discover endpoint with parsed filters.
+
+    The local catalogue index answers first when it is configured and finds
+    enough movies. Otherwise page 1 comes first; if it doesn't yield `limit`
+    movies (after dropping exclude_ids and duplicates), the pages still
+    needed are fetched concurrently, up to DISCOVER_MAX_PAGES. Runtime,
+    rating, date, language and provider filters are applied by TMDB itself.
+
+    Args:
+        filters: Dict from mood_parser.parse_mood() — keys map to TMDB params.
+        limit: Number of movies to return (default 5 for Walking Skeleton).
+        exclude_ids: Movie IDs to leave out (e.g. already seen).
+
+    Returns:
+        List of movie dicts with basic metadata from Discover, in page order.
+    """
+    exclude_ids = set(exclude_ids)
+    local = _discover_local(filters, limit, exclude_ids)
+    if local is not None:
+        return local
+
+    # Resolve cast names to TMDB person IDs
+    cast_ids = _resolve_cast(_cast_names(filters))
+    params = _discover_params(filters, cast_ids)
+
+    pool = {}
+    data = _discover_page(params, 1)
+    _add_results(pool, data, exclude_ids)
+    fetched = 1
+    while pages := _next_pages(fetched, data.get("total_pages", 1), limit - len(pool)):
+        with ThreadPoolExecutor(max_workers=len(pages)) as executor:
+            for data in executor.map(lambda page: _discover_page(params, page), pages):
+                _add_results(pool, data, exclude_ids)
+        fetched = pages[-1]
+
+    return list(pool.values())[:limit]
+
+
+def get_movie(movie_id: int, append: tuple[str, ...] = ("watch/providers",), fresh: bool = False) -> dict:
+    """Fetch a movie's details and sub-resources in one call (append_to_response).
+
+    Returns {"details": {...}, "watch/providers": {...}, ...} — one key per
+    appended sub-resource, raw TMDB payloads. Each part is cached on its own
+    key and TTL (shared with get_movie_details / get_watch_providers); the
+    call is only made when one of them is missing or expired, or when
+    fresh=True (the answer still replaces the cached parts).
+    """
+    movie = None if fresh else _cached_movie(movie_id, append)
+    if movie is None:
+        def fetch():
+            movie, entries = _split_movie(movie_id, _get_json(f"/movie/{movie_id}", _movie_params(append)), append)
+            _get_cache().set_many(entries)
+            return movie
+
+        movie = _flight.do(f"movie:{movie_id}:{','.join(append)}", fetch)
+    return movie
+
+
+def get_movie_details(movie_id: int, fresh: bool = False) -> dict:
+    """Fetch full details for a single movie (includes runtime); fresh=True skips the cache."""
+    return get_movie(movie_id, append=(), fresh=fresh)["details"]
+
+
+def get_watch_providers(movie_id: int, region: str = "US") -> list[dict]:
+    """Fetch streaming providers for a movie in a given region.
+
+    Returns list of dicts: [{"name": "Netflix", "logo_url": "..."}]
+    Only returns 'flatrate' (subscription) providers, not rent/buy.
+    """
+    data = _cached_json(f"providers:{movie_id}", CACHE_TTL["providers"], f"/movie/{movie_id}/watch/providers")
+    return _parse_providers(data, region)
+
+
+def _fetch_or_none(fn, movie_id: int, *args):
+    """Run one TMDB call for one movie. A failure is logged and isolated to that movie."""
+    try:
+        return fn(movie_id, *args)
+    except httpx.HTTPError as e:
+        logger.warning(f"{fn.__name__} failed for movie {movie_id}: {type(e).__name__}")
+        return None
+
+
+@timed("enrich_movies")
 def enrich_movies(discover_results: list[dict], include_providers: bool = False) -> list[dict]:
     """Enrich Discover results with full details (runtime, providers, etc.).
 
-    For each movie, fetches /movie/{id} for runtime and optionally
-    /movie/{id}/watch/providers for streaming platforms.
+    For each movie, fetches /movie/{id} for runtime, with the streaming
+    platforms appended to the same call (append_to_response=watch/providers)
+    when include_providers is set. All calls fan out concurrently (at most
+    ENRICH_CONCURRENCY in flight), so the batch takes about as long as the
+    slowest call. Results keep Discover order.
+
+    A failed call only degrades its own movie: it falls back to the Discover
+    data, with an empty providers list.
     """
-    enriched = []
-    for movie in discover_results:
-        details = get_movie_details(movie["id"])
-        genre_names = [GENRE_ID_TO_NAME.get(gid, "Unknown") for gid in movie.get("genre_ids", [])]
-
-        entry = {
-            "id": movie["id"],
-            "title": details.get("title", movie.get("title", "")),
-            "genres": genre_names,
-            "rating": details.get("vote_average", 0),
-            "runtime": details.get("runtime", 0),
-            "release_year": (details.get("release_date") or "")[:4],
-            "overview": details.get("overview", ""),
-            "poster_url": f"{_IMG_BASE}/w500{details['poster_path']}" if details.get("poster_path") else None,
-        }
+    if not discover_results:
+        return []
+
+    append = _enrich_append(include_providers)
+    with ThreadPoolExecutor(max_workers=min(ENRICH_CONCURRENCY, len(discover_results))) as pool:
+        futures = [pool.submit(_fetch_or_none, get_movie, m["id"], append) for m in discover_results]
+        return [
+            _build_entry(movie, future.result(), include_providers)
+            for movie, future in zip(discover_results, futures)
+        ]
+
+
+# ─── Async API ───
+
+async def search_person_async(name: str) -> int | None:
+    """Async variant of search_person."""
+    return await _cached_json_async(
+        f"person:{name.strip().lower()}",
+        CACHE_TTL["person"],
+        "/search/person",
+        params={"query": name, "language": "en-US"},
+        parse=_first_person_id,
+    )
+
+
+async def resolve_person_async(name: str) -> int | None:
+    """Async variant of resolve_person."""
+    person_id = _people.lookup(name)
+    if person_id is None:
+        person_id = await search_person_async(name)
+        if person_id:
+            await asyncio.to_thread(_people.add, name, person_id)  # SQLite write + commit
+        else:
+            person_id = _people.closest(name)
+    return person_id
 
-        if include_providers:
-            entry["providers"] = get_watch_providers(movie["id"])
 
-        enriched.append(entry)
+async def preload_people_async(pages: int = PERSON_PRELOAD_PAGES) -> int:
+    """Load the most popular actors into the person index; returns how many were added.
 
-    return enriched
+    Skipped when a persisted index was preloaded with as many pages in the
+    last week (by a previous run or another worker). Pages are fetched
+    concurrently; a failed page is skipped.
+    """
+    if pages <= 0 or _people.preloaded(pages, _PERSON_PRELOAD_MAX_AGE):
+        return 0
+    before = len(_people)
+    responses = await asyncio.gather(
+        *(_get_json_async("/person/popular", {"language": "en-US", "page": page}) for page in range(1, pages + 1)),
+        return_exceptions=True,
+    )
+    failed = [data for data in responses if isinstance(data, Exception)]
+    actors = [actor for data in responses if not isinstance(data, Exception) for actor in _popular_actors(data)]
+    await asyncio.to_thread(_people.add_many, actors)
+    if failed:
+        logger.warning(f"Person preload: {len(failed)}/{pages} pages failed ({type(failed[0]).__name__})")
+    else:
+        await asyncio.to_thread(_people.mark_preloaded, pages)
+    logger.info(f"Person preload: {len(_people) - before} actors added, {len(_people)} known")
+    return len(_people) - before
+
+
+async def _discover_page_async(params: dict, page: int) -> dict:
+    page_params = _page_params(params, page)
+    return await _cached_json_async(
+        _discover_key(page_params), CACHE_TTL["discover"], "/discover/movie", page_params
+    )
+
+
+@timed("discover_movies")
+async def discover_movies_async(filters: dict, limit: int = 5, exclude_ids=()) -> list[dict]:
+    """Async variant of discover_movies — cast names and extra pages are fetched concurrently."""
+    exclude_ids = set(exclude_ids)
+    local = _discover_local(filters, limit, exclude_ids)
+    if local is not None:
+        return local
+
+    cast_ids = await asyncio.gather(*(resolve_person_async(name) for name in _cast_names(filters)))
+    params = _discover_params(filters, list(cast_ids))
+
+    pool = {}
+    data = await _discover_page_async(params, 1)
+    _add_results(pool, data, exclude_ids)
+    fetched = 1
+    while pages := _next_pages(fetched, data.get("total_pages", 1), limit - len(pool)):
+        for data in await asyncio.gather(*(_discover_page_async(params, page) for page in pages)):
+            _add_results(pool, data, exclude_ids)
+        fetched = pages[-1]
+
+    return list(pool.values())[:limit]
+
+
+async def warm_discover_cache_async(signatures: list[dict], limit: int = 20) -> int:
+    """Pre-fetch the Discover pages of these filter dicts (e.g. request_log.top_signatures).
+
+    Runs them one after another so the warm-up never competes with live
+    traffic for the TMDB rate limit; a failed signature is skipped. Returns
+    how many were warmed.
+    """
+    warmed = 0
+    for filters in signatures:
+        try:
+            await discover_movies_async(filters, limit=limit)
+            warmed += 1
+        except httpx.HTTPError as e:
+            logger.warning(f"Discover warm-up failed for {filters}: {type(e).__name__}")
+    logger.info(f"Discover warm-up: {warmed}/{len(signatures)} filter signatures cached")
+    return warmed
+
+
+async def get_movie_async(movie_id: int, append: tuple[str, ...] = ("watch/providers",)) -> dict:
+    """Async variant of get_movie."""
+    movie = await _cached_movie_async(movie_id, append)
+    if movie is None:
+        async def fetch():
+            data = await _get_json_async(f"/movie/{movie_id}", _movie_params(append))
+            movie, entries = _split_movie(movie_id, data, append)
+            await _get_cache().aset_many(entries)
+            return movie
+
+        movie = await _flight_async.do(f"movie:{movie_id}:{','.join(append)}", fetch)
+    return movie
+
+
+async def _fetch_or_none_async(fn, movie_id: int, semaphore: asyncio.Semaphore, *args):
+    async with semaphore:
+        try:
+            return await fn(movie_id, *args)
+        except httpx.HTTPError as e:
+            logger.warning(f"{fn.__name__} failed for movie {movie_id}: {type(e).__name__}")
+            return None
+
+
+@timed("enrich_movies")
+async def enrich_movies_async(discover_results: list[dict], include_providers: bool = False) -> list[dict]:
+    """Async variant of enrich_movies — same fan-out bound, same failure isolation."""
+    semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+    append = _enrich_append(include_providers)
+    fetched = await asyncio.gather(
+        *(_fetch_or_none_async(get_movie_async, m["id"], semaphore, append) for m in discover_results)
+    )
+    return [_build_entry(movie, f, include_providers) for movie, f in zip(discover_results, fetched)]
+
+
+async def enrich_movie_async(movie: dict, include_providers: bool, semaphore: asyncio.Semaphore) -> dict:
+    """Enrich one Discover result (details + optional providers, in one call)."""
+    fetched = await _fetch_or_none_async(get_movie_async, movie["id"], semaphore, _enrich_append(include_providers))
+    return _build_entry(movie, fetched, include_providers)
+
+
+async def iter_enriched_async(
+    discover_results: list[dict],
+    include_providers: bool = False,
+    min_ready: int | None = None,
+    deadline: float | None = None,
+):
+    """Like enrich_movies_async, but yields (index, entry) as each movie completes.
+
+    With a deadline (seconds), the tail stragglers are dropped: once `deadline`
+    has passed and at least `min_ready` movies are in, iteration stops and the
+    remaining fetches are cancelled (their cached calls still finish and fill
+    the cache for the next request).
+    """
+    semaphore = asyncio.Semaphore(ENRICH_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline if deadline is not None else None
+    min_ready = min(min_ready or len(discover_results), len(discover_results))
+
+    tasks = {
+        asyncio.ensure_future(enrich_movie_async(movie, include_providers, semaphore)): i
+        for i, movie in enumerate(discover_results)
+    }
+    pending = set(tasks)
+    ready = 0
+    try:
+        while pending:
+            timeout = None
+            if give_up_at is not None and ready >= min_ready:
+                timeout = max(give_up_at - loop.time(), 0)
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info(f"Enrichment deadline: going on without {len(pending)} straggler(s)")
+                break
+            for task in sorted(done, key=tasks.get):
+                ready += 1
+                yield tasks[task], task.result()
+    finally:
+        for task in pending:
+            task.cancel()  # Stragglers, or the client went away mid-stream
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+WatchNext V2 — Convert legacy pickle models to the .npy artifact format
+
+Models trained before the artifact format (see core/ml/artifacts.py) were saved
+as pickles. This rewrites them as memory-mappable .npy files + manifest.json,
+without retraining (no MovieLens download or TMDB calls needed).
+
+--catalog also builds the /similar movie catalogue (models/catalog.sqlite, see
+core/ml/catalog.py) for every movie the models can recommend, so models that
+were trained before the catalogue existed don't cost one TMDB call per rail
+entry. Metadata comes from the training cache (data/tmdb_cache.json) where
+possible, the rest is fetched from TMDB once. It also works on models that are
+already converted.
+
+Usage: python scripts/convert_models.py [--delete-pickles] [--catalog]
+"""
+
+import sys
+import json
+import pickle
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+
+PROJECT_ROOT = Path(__file__).parent.parent
+MODELS_DIR = PROJECT_ROOT / "models"
+CACHE_FILE = PROJECT_ROOT / "data" / "tmdb_cache.json"
+
+LEGACY_FILES = [
+    "cb_tfidf_matrix.pkl",
+    "cb_tmdb_ids.pkl",
+    "cf_item_factors.pkl",
+    "cf_movie_to_idx.pkl",
+    "cf_idx_to_movie.pkl",
+    "ml_to_tmdb.pkl",
+    "tmdb_to_ml.pkl",
+]
+
+
+def load_pickle(filename):
+    with open(MODELS_DIR / filename, "rb") as f:
+        return pickle.load(f)
+
+
+def convert():
+    from core.ml.artifacts import save_arrays, save_csr, save_mapping
+    from core.ml.collaborative import normalize_factors
+
+    # Content-based
+    tfidf_matrix = load_pickle("cb_tfidf_matrix.pkl")
+    tmdb_ids = load_pickle("cb_tmdb_ids.pkl")
+    save_csr(MODELS_DIR, "cb_tfidf", tfidf_matrix)
+    save_arrays(MODELS_DIR, {"cb_tmdb_ids": np.array(tmdb_ids, dtype=np.int32)})
+    print(f"  Content-based: {tfidf_matrix.shape[0]} movies x {tfidf_matrix.shape[1]} features")
+
+    # Neighbour table from an older run (cb_neighbors.npz), if present
+    neighbors_path = MODELS_DIR / "cb_neighbors.npz"
+    if neighbors_path.exists():
+        with np.load(neighbors_path) as neighbors:
+            save_arrays(MODELS_DIR, {
+                "cb_neighbor_indices": neighbors["indices"],
+                "cb_neighbor_scores": neighbors["scores"],
+            })
+        print("  Neighbour table converted")
+
+    # Collaborative
+    item_factors = np.asarray(load_pickle("cf_item_factors.pkl"), dtype=np.float32)
+    idx_to_movie = load_pickle("cf_idx_to_movie.pkl")
+    movie_ids = np.array([idx_to_movie[i] for i in range(len(idx_to_movie))], dtype=np.int32)
+    save_arrays(MODELS_DIR, {
+        "cf_normed_factors": normalize_factors(item_factors),
+        "cf_movie_ids": movie_ids,
+    })
+    save_mapping(MODELS_DIR, "ml_to_tmdb", load_pickle("ml_to_tmdb.pkl"))
+    save_mapping(MODELS_DIR, "tmdb_to_ml", load_pickle("tmdb_to_ml.pkl"))
+    print(f"  Collaborative: {item_factors.shape[0]} movies x {item_factors.shape[1]} factors")
+
+    if "--delete-pickles" in sys.argv:
+        for name in LEGACY_FILES + ["cb_neighbors.npz"]:
+            (MODELS_DIR / name).unlink(missing_ok=True)
+        print("  Legacy files deleted")
+
+
+def _recommendable_ids():
+    """TMDB IDs either model can put on a rail: the content-based corpus + the collaborative items."""
+    from core.ml.artifacts import load_arrays, load_mapping
+
+    cb_tmdb_ids, cf_movie_ids = load_arrays(MODELS_DIR, "cb_tmdb_ids", "cf_movie_ids")
+    ml_to_tmdb = load_mapping(MODELS_DIR, "ml_to_tmdb")
+    tmdb_ids = [int(tid) for tid in cb_tmdb_ids]
+    tmdb_ids += [ml_to_tmdb.get(int(mid)) for mid in cf_movie_ids]
+    return list(dict.fromkeys(int(tid) for tid in tmdb_ids if tid is not None))
+
+
+def build_catalog():
+    """Write models/catalog.sqlite from the training cache, fetching the movies it lacks from TMDB."""
+    load_dotenv(PROJECT_ROOT / ".env")
+    from core.ml.catalog import CATALOG_FILE, Catalog
+    from core.tmdb_client import ENRICH_CONCURRENCY, get_movie_details
+
+    print("\n--- Building movie catalogue ---")
+    tmdb_ids = _recommendable_ids()
+    cache = {}
+    if CACHE_FILE.exists():
+        with open(CACHE_FILE) as f:
+            cache = {int(k): v for k, v in json.load(f).items()}
+
+    # Training cache entries written before the catalogue fields were fetched lack runtime
+    cached = [{"id": tid, **cache[tid]} for tid in tmdb_ids if "runtime" in cache.get(tid, {})]
+    to_fetch = [tid for tid in tmdb_ids if "runtime" not in cache.get(tid, {})]
+    print(f"  {len(tmdb_ids)} recommendable movies: {len(cached)} in the training cache, {len(to_fetch)} to fetch")
+
+    def fetch(tmdb_id):
+        try:
+            return get_movie_details(tmdb_id)
+        except Exception as e:
+            print(f"    error fetching {tmdb_id}: {type(e).__name__}")
+            return None
+
+    catalog = Catalog(MODELS_DIR / CATALOG_FILE)
+    catalog.put_many(cached)
+    with ThreadPoolExecutor(max_workers=ENRICH_CONCURRENCY) as pool:
+        fetched = [data for data in pool.map(fetch, to_fetch) if data]
+    catalog.put_many(fetched)
+    print(f"  Catalogue: {len(catalog)} movies -> models/{CATALOG_FILE}")
+
+
+def main():
+    print("=" * 60)
+    print("WatchNext V2 — Convert pickle models to .npy artifacts")
+    print("=" * 60)
+
+    missing = [name for name in LEGACY_FILES if not (MODELS_DIR / name).exists()]
+    if not missing:
+        convert()
+    elif "--catalog" in sys.argv and (MODELS_DIR / "manifest.json").exists():
+        print("  No legacy files, models already converted")
+    else:
+        print(f"  Missing legacy files: {', '.join(missing)}")
+        sys.exit(1)
+
+    if "--catalog" in sys.argv:
+        build_catalog()
+
+    print("\nDone. Models saved to models/ (manifest.json)")
+
+
+if __name__ == "__main__":
+    # Add project root to path so we can import core.ml
+    sys.path.insert(0, str(PROJECT_ROOT))
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+WatchNext — Sync the local catalogue index (Discover without TMDB)
+
+Writes the mirror file the API builds its in-process Discover index from
+(CATALOG_INDEX_PATH, see core/catalog_index.py): one JSON line per movie
+with genres, rating, vote count, popularity, release date, runtime, original
+language and US streaming providers. Two sources:
+
+--mirror PATH   a local mirror of TMDB /movie/{id} payloads (JSON lines,
+                .gz accepted; Discover results work too)
+--export [N]    TMDB's daily ID export (files.tmdb.org), the N most popular
+                movies (default 20000), each fetched once with watch
+                providers appended
+
+The file is replaced atomically; running API workers pick it up on their next
+Discover query (the index is rebuilt in the background). Run --export nightly:
+ratings, popularity and providers drift daily.
+
+Usage: python scripts/sync_catalog_index.py --mirror PATH | --export [N]
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from dotenv import load_dotenv
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_OUTPUT = PROJECT_ROOT / "data" / "catalog_index.jsonl.gz"
+EXPORT_URL = "https://files.tmdb.org/p/exports/movie_ids_{:%m_%d_%Y}.json.gz"
+DEFAULT_EXPORT_SIZE = 20000
+
+
+def _open(path, mode="rt"):
+    return gzip.open(path, mode) if str(path).endswith(".gz") else open(path, mode)
+
+
+def read_mirror(path):
+    """Movie payloads from a local mirror file."""
+    with _open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_export(n):
+    """The n most popular movies of TMDB's latest daily ID export, fetched with providers appended."""
+    from core.tmdb_client import ENRICH_CONCURRENCY, get_movie
+
+    # Today's export is published during the day — yesterday's always exists
+    url = EXPORT_URL.format(date.today() - timedelta(days=1))
+    print(f"  Downloading {url}")
+    resp = httpx.get(url, timeout=60)
+    resp.raise_for_status()
+    entries = [json.loads(line) for line in gzip.decompress(resp.content).splitlines() if line.strip()]
+    entries = [e for e in entries if not e.get("adult") and not e.get("video")]
+    entries.sort(key=lambda e: e.get("popularity", 0), reverse=True)
+    tmdb_ids = [e["id"] for e in entries[:n]]
+    print(f"  {len(entries)} movies in the export, fetching the top {len(tmdb_ids)}")
+
+    def fetch(tmdb_id):
+        try:
+            movie = get_movie(tmdb_id, ("watch/providers",))
+        except httpx.HTTPError as e:
+            print(f"    error fetching {tmdb_id}: {type(e).__name__}")
+            return None
+        return {**movie["details"], "watch/providers": movie["watch/providers"]}
+
+    with ThreadPoolExecutor(max_workers=ENRICH_CONCURRENCY) as pool:
+        for i, movie in enumerate(pool.map(fetch, tmdb_ids)):
+            if movie:
+                yield movie
+            if (i + 1) % 1000 == 0:
+                print(f"    fetched {i + 1}/{len(tmdb_ids)}...")
+
+
+def write_index(movies, output):
+    """Write the mirror file atomically (a temporary file renamed over the old one)."""
+    from core.catalog_index import index_record
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + ".tmp")
+    count = 0
+    with gzip.open(tmp, "wt") if output.suffix == ".gz" else open(tmp, "w") as f:
+        for movie in movies:
+            f.write(json.dumps(index_record(movie)) + "\n")
+            count += 1
+    os.replace(tmp, output)
+    return count
+
+
+def main():
+    load_dotenv(PROJECT_ROOT / ".env")
+
+    args = sys.argv[1:]
+    if args[:1] == ["--mirror"] and len(args) == 2:
+        source = read_mirror(args[1])
+    elif args[:1] == ["--export"]:
+        source = read_export(int(args[1]) if len(args) > 1 else DEFAULT_EXPORT_SIZE)
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+    output = os.environ.get("CATALOG_INDEX_PATH") or DEFAULT_OUTPUT
+    print(f"Syncing the catalogue index -> {output}")
+    t0 = time.time()
+    count = write_index(source, output)
+
+    from core.catalog_index import CatalogIndex
+
+    index = CatalogIndex.load(output)
+    print(f"  {count} movies written, index built in-process: {len(index)} movies ({time.time() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    # Add project root to path so we can import core
+    sys.path.insert(0, str(PROJECT_ROOT))
+    main()
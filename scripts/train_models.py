@@ -3,10 +3,14 @@
 WatchNext V2 — Offline Model Training
 
 Trains both ML models and saves them to models/ for the API to load at startup.
+Artifacts are plain .npy arrays + a versioned manifest (see core/ml/artifacts.py),
+which the API memory-maps instead of unpickling.
 
 1. Content-Based: fetches TMDB data (synopsis + genres + cast) for top N movies,
    builds TF-IDF matrix, saves to disk.
 2. Collaborative: loads MovieLens ratings, trains SVD (scipy), saves item factors.
+3. Catalogue: writes the fetched TMDB metadata to models/catalog.sqlite, so the
+   /similar rails are served without an upstream call for known titles.
 
 Run this ONCE before starting the API, or whenever you want to retrain.
 
@@ -17,13 +21,13 @@ import os
 import sys
 import json
 import time
-import pickle
 import numpy as np
 import pandas as pd
 import httpx
 from pathlib import Path
 from dotenv import load_dotenv
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
 from scipy.sparse import csr_matrix
 from scipy.sparse.linalg import svds
 
@@ -46,6 +50,8 @@ TMDB_HEADERS = {
 N_CB_MOVIES = 3000
 # Content-based: how many times to repeat genre words (gives genres more weight)
 GENRE_REPEAT = 3
+# Content-based: neighbours precomputed per movie (requests for more fall back to live scoring)
+N_NEIGHBORS = 50
 # Collaborative: minimum ratings per movie (filters noisy/obscure films)
 MIN_RATINGS = 50
 # Collaborative: number of latent factors for SVD
@@ -74,7 +80,8 @@ def save_tmdb_cache(cache):
 
 def fetch_tmdb_data(tmdb_ids, cache):
     """
-    Fetch movie data from TMDB: overview, genres, top 5 cast members.
+    Fetch movie data from TMDB: overview, genres, top 5 cast members, plus the
+    fields the movie catalogue serves (rating, runtime, release date, poster).
     Uses append_to_response=credits to get cast in a single API call.
     Skips movies already in cache.
     """
@@ -104,6 +111,10 @@ def fetch_tmdb_data(tmdb_ids, cache):
                         "genres": genres,
                         "cast": cast,
                         "title": data.get("title", ""),
+                        "vote_average": data.get("vote_average", 0),
+                        "runtime": data.get("runtime", 0),
+                        "release_date": data.get("release_date", ""),
+                        "poster_path": data.get("poster_path"),
                     }
                 time.sleep(0.03)
 
@@ -168,16 +179,43 @@ def train_content_based(tmdb_ids, cache):
     print(f"  TF-IDF matrix: {tfidf_matrix.shape[0]} movies x {tfidf_matrix.shape[1]} features")
 
     # Save
-    MODELS_DIR.mkdir(parents=True, exist_ok=True)
-    with open(MODELS_DIR / "cb_tfidf_matrix.pkl", "wb") as f:
-        pickle.dump(tfidf_matrix, f)
-    with open(MODELS_DIR / "cb_tmdb_ids.pkl", "wb") as f:
-        pickle.dump(valid_ids, f)
+    from core.ml.artifacts import save_arrays, save_csr
 
-    print("  Saved to models/cb_tfidf_matrix.pkl + cb_tmdb_ids.pkl")
+    save_csr(MODELS_DIR, "cb_tfidf", tfidf_matrix)
+    save_arrays(MODELS_DIR, {"cb_tmdb_ids": np.array(valid_ids, dtype=np.int32)})
+
+    print("  Saved to models/cb_tfidf_*.npy + cb_tmdb_ids.npy")
+
+    save_cb_neighbors(tfidf_matrix)
     return tfidf_matrix, valid_ids
 
 
+def save_cb_neighbors(tfidf_matrix, k=N_NEIGHBORS, chunk_size=500):
+    """
+    Precompute the top-K most similar movies for every movie in the corpus.
+
+    The API then serves "Similar Movies" with a row lookup instead of scoring
+    the whole corpus per request. Rows are scored in chunks to bound memory.
+    """
+    from core.ml.artifacts import save_arrays
+    from core.ml.topk import top_k
+
+    n_movies = tfidf_matrix.shape[0]
+    k = min(k, n_movies - 1)
+    indices = np.empty((n_movies, k), dtype=np.int32)
+    scores = np.empty((n_movies, k), dtype=np.float32)
+
+    for start in range(0, n_movies, chunk_size):
+        stop = min(start + chunk_size, n_movies)
+        block = cosine_similarity(tfidf_matrix[start:stop], tfidf_matrix)
+        top = top_k(block, k, exclude=np.arange(start, stop))
+        indices[start:stop] = top
+        scores[start:stop] = np.take_along_axis(block, top, axis=1)
+
+    save_arrays(MODELS_DIR, {"cb_neighbor_indices": indices, "cb_neighbor_scores": scores})
+    print(f"  Saved top-{k} neighbours to models/cb_neighbor_*.npy")
+
+
 # ─── Collaborative Filtering Training ────────────────────────────────────────
 
 def train_collaborative(ratings, ml_to_tmdb, tmdb_to_ml):
@@ -222,23 +260,44 @@ def train_collaborative(ratings, ml_to_tmdb, tmdb_to_ml):
     elapsed = time.time() - t0
     print(f"  SVD trained in {elapsed:.1f}s — {n_users:,} users x {n_movies:,} movies -> {k} factors")
 
-    # Save
-    MODELS_DIR.mkdir(parents=True, exist_ok=True)
-    with open(MODELS_DIR / "cf_item_factors.pkl", "wb") as f:
-        pickle.dump(item_factors, f)
-    with open(MODELS_DIR / "cf_movie_to_idx.pkl", "wb") as f:
-        pickle.dump(movie_to_idx, f)
-    with open(MODELS_DIR / "cf_idx_to_movie.pkl", "wb") as f:
-        pickle.dump(idx_to_movie, f)
-    with open(MODELS_DIR / "ml_to_tmdb.pkl", "wb") as f:
-        pickle.dump(ml_to_tmdb, f)
-    with open(MODELS_DIR / "tmdb_to_ml.pkl", "wb") as f:
-        pickle.dump(tmdb_to_ml, f)
-
-    print("  Saved to models/cf_*.pkl + ml_to_tmdb.pkl + tmdb_to_ml.pkl")
+    # Save (factors are stored L2-normalised: serving is a plain dot product)
+    from core.ml.artifacts import save_arrays, save_mapping
+    from core.ml.collaborative import normalize_factors
+
+    item_factors = item_factors.astype(np.float32)
+    save_arrays(MODELS_DIR, {
+        "cf_normed_factors": normalize_factors(item_factors),
+        "cf_movie_ids": np.asarray(movie_ids, dtype=np.int32),  # factor row -> MovieLens ID
+    })
+    save_mapping(MODELS_DIR, "ml_to_tmdb", ml_to_tmdb)
+    save_mapping(MODELS_DIR, "tmdb_to_ml", tmdb_to_ml)
+
+    print("  Saved to models/cf_*.npy + ml_to_tmdb_*.npy + tmdb_to_ml_*.npy")
     return item_factors, movie_to_idx, idx_to_movie
 
 
+# ─── Movie Catalogue ─────────────────────────────────────────────────────────
+
+def build_catalog(cache):
+    """
+    Write every fetched movie to models/catalog.sqlite (see core/ml/catalog.py).
+
+    Entries cached before the catalogue fields were fetched are written with
+    updated_at=0: the API serves them and refreshes them from TMDB in the
+    background on first use.
+    """
+    print("\n--- Building movie catalogue ---")
+    from core.ml.catalog import CATALOG_FILE, Catalog
+
+    catalog = Catalog(MODELS_DIR / CATALOG_FILE)
+    complete = [{"id": tid, **data} for tid, data in cache.items() if "runtime" in data]
+    partial = [{"id": tid, **data} for tid, data in cache.items() if "runtime" not in data]
+    catalog.put_many(complete)
+    catalog.put_many(partial, updated_at=0)
+
+    print(f"  Catalogue: {len(complete)} movies ({len(partial)} to refresh) -> models/{CATALOG_FILE}")
+
+
 # ─── Main ────────────────────────────────────────────────────────────────────
 
 def main():
@@ -276,6 +335,9 @@ def main():
     # Train collaborative
     train_collaborative(ratings, ml_to_tmdb, tmdb_to_ml)
 
+    # Movie catalogue for the /similar rails
+    build_catalog(cache)
+
     print("\n" + "=" * 60)
     print("Training complete. Models saved to models/")
     print("=" * 60)
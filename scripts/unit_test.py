@@ -0,0 +1,1151 @@
+#!/usr/bin/env python3
+"""
+Unit micro-tests — caches, indexes and pipeline stages, no API server needed.
+
+TMDB and OpenAI are never called: each test swaps a fake in for the network
+layer (tmdb_client._get_json / _get_json_async) and starts from empty caches.
+
+Run: python scripts/unit_test.py  (or: python -m pytest -q scripts/unit_test.py)
+
+Tests:
+  U-01: Enrichment fans out concurrently, keeps Discover order, isolates a failure
+  U-02: Concurrent /recommend pipelines share the event loop instead of queueing
+  U-03: SQLite TMDB cache — TTL, batched reads/writes, eviction, buffered stats, async path off the loop
+  U-04: Precomputed content neighbours answer like live cosine scoring (single + batch)
+  U-05: argpartition top-k == full sort; prenormalised CF factors give cosine scores
+  U-06: Batch /similar == one call per seed, metadata fetched once, n and seed count bounded (422)
+  U-07: Model artifacts round-trip memory-mapped; manifest and models/ agree
+  U-08: IdMap behaves like a dict, also for duplicates, out-of-range and wrapped int32 keys
+  U-09: One pooled TMDB client per process, configured from TMDB_*, reopened after close
+  U-10: Identical in-flight calls share one upstream call (threads, coroutines, moods)
+  U-11: /recommend response cache — normalised key, stale-while-revalidate, degraded results not stored
+  U-12: Redis mood cache shared by workers — fleet-wide stats, size without expired keys, outage = miss
+  U-13: Semantic mood cache — reworded moods hit, negations and hard-filter differences don't
+  U-14: Rule-based mood parser answers only when every word is explained
+  U-15: Local ranker — filter matches first, runtime fit, no duplicates, French "why" for French moods
+  U-16: /recommend/stream sends filters before any TMDB call, then candidates, picks, done (or error)
+  U-17: Stage timings per request and in /metrics (Prometheus text format)
+  U-18: Enrichment yields movies as they complete and drops stragglers past the deadline
+  U-19: A request budget degrades slow stages instead of overrunning, and says which
+  U-20: One /movie/{id} call per movie (append_to_response), each part cached on its own key
+  U-21: /similar metadata from the local catalogue — write-through for unknown titles, stale rows refreshed
+  U-22: Person IDs — index, then /search/person, then a fuzzy match; preload once, off the event loop
+  U-23: Discover fetches only the pages still needed, concurrently, minus excluded and duplicate movies
+  U-24: Discover cache keyed on canonical filters; request log buffered, rotated, used for the warm-up
+  U-25: Catalogue index matches a brute-force scan; TMDB is asked when it can't answer
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import core.mood_parser as mood_parser
+import core.pipeline as pipeline
+import core.request_log as request_log
+from core.catalog_index import CatalogIndex, index_record
+import core.tmdb_client as tmdb
+from core.budget import Budget
+from core.cache import LRUCache, RedisCache, SQLiteCache, StaleWhileRevalidate, make_cache
+from core.ml.artifacts import (
+    FORMAT_VERSION, load_arrays, load_csr, load_mapping, save_arrays, save_csr, save_mapping,
+)
+from core.ml.collaborative import MODELS_DIR, CollaborativeModel, normalize_factors
+from core.ml.content_based import ContentBasedModel
+from core.ml.idmap import IdMap
+import core.ml.similar as similar
+from core.ml.catalog import CATALOG_FILE, Catalog
+from core.ml.similar import SimilarMovies
+from core.ml.topk import top_k
+from core.local_ranker import rank_movies_local
+from core.metrics import count_upstream, observe, render, start_timings, stage_timer
+from core.mood_rules import MoodRules
+from core.person_index import PersonIndex
+from core.semantic_cache import SemanticCache
+from core.singleflight import AsyncSingleFlight, SingleFlight
+
+results = {}
+
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+
+def movie_payload(movie_id: int) -> dict:
+    """A /movie/{id}?append_to_response=watch/providers answer."""
+    return {
+        "id": movie_id,
+        "title": f"Movie {movie_id}",
+        "runtime": 100 + movie_id,
+        "genres": [{"id": 35, "name": "Comedy"}],
+        "vote_average": 7.0,
+        "release_date": "2010-01-01",
+        "watch/providers": {"results": {"US": {"flatrate": [{"provider_name": "Netflix", "logo_path": "/n.png"}]}}},
+    }
+
+
+def discover_result(movie_id: int) -> dict:
+    return {"id": movie_id, "title": f"Movie {movie_id}", "genre_ids": [35], "vote_average": 7.0}
+
+
+@contextmanager
+def fake_tmdb(answer, delay: float = 0.0):
+    """Route every TMDB call to answer(path, params) (still counted), with empty caches; yields the calls made."""
+    calls = []
+
+    def get_json(path, params=None):
+        tmdb.count_upstream("tmdb", path)
+        calls.append((path, params))
+        time.sleep(delay)
+        return answer(path, params)
+
+    async def get_json_async(path, params=None):
+        tmdb.count_upstream("tmdb", path)
+        calls.append((path, params))
+        await asyncio.sleep(delay)
+        return answer(path, params)
+
+    saved = tmdb._get_json, tmdb._get_json_async, tmdb._cache, tmdb._people
+    tmdb._get_json, tmdb._get_json_async = get_json, get_json_async
+    tmdb._cache, tmdb._people = LRUCache(maxsize=1000), PersonIndex()
+    try:
+        yield calls
+    finally:
+        tmdb._get_json, tmdb._get_json_async, tmdb._cache, tmdb._people = saved
+
+
+PEOPLE = {"Tom Hanks": 31, "Omar Sy": 78423, "Dan Stevens": 121, "Dan Stevenson": 122}
+
+
+def tmdb_answer(path, params):
+    """TMDB stand-in: Discover page p holds movies p*100 .. p*100+19 (3 pages); movie 13 is a failing call."""
+    if path == "/discover/movie":
+        page = params["page"]
+        return {"results": [discover_result(page * 100 + i) for i in range(20)], "total_pages": 3}
+    if path == "/search/person":
+        person_id = PEOPLE.get(params["query"])
+        return {"results": [{"id": person_id}] if person_id else []}
+    if path == "/person/popular":
+        people = [{"name": name, "id": person_id, "popularity": 10.0} for name, person_id in PEOPLE.items()]
+        return {"results": people + [{"name": "Some Director", "id": 9, "known_for_department": "Directing"}]}
+    movie_id = int(path.split("/")[2])
+    if movie_id == 13:
+        raise httpx.ConnectError("down")
+    return movie_payload(movie_id)
+
+
+@contextmanager
+def fake_parse(filters: dict, delay: float = 0.0):
+    """Replace the GPT mood parsing of the pipeline with a fixed answer."""
+    async def parse_mood_async(mood):
+        await asyncio.sleep(delay)
+        return dict(filters)
+
+    saved = pipeline.parse_mood_async
+    pipeline.parse_mood_async = parse_mood_async
+    try:
+        yield
+    finally:
+        pipeline.parse_mood_async = saved
+
+
+def content_model(k: int | None = None) -> ContentBasedModel:
+    """A ContentBasedModel on 8 toy profiles, with a top-k neighbour table built by full sort."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    profiles = [
+        "space war alien fleet", "alien invasion space marines", "romance paris love letters",
+        "love story wedding paris", "heist bank robbery crew", "bank robbery gone wrong crew",
+        "haunted house ghost", "ghost story haunted school",
+    ]
+    model = ContentBasedModel()
+    model.tfidf_matrix = TfidfVectorizer().fit_transform(profiles)
+    model.tmdb_ids = np.array([101, 102, 201, 202, 301, 302, 401, 402], dtype=np.int32)
+    model.tmdb_id_to_idx = IdMap.from_pairs(model.tmdb_ids, np.arange(len(model.tmdb_ids)))
+    if k:
+        sims = cosine_similarity(model.tfidf_matrix)
+        np.fill_diagonal(sims, -np.inf)
+        model.neighbor_indices = np.argsort(-sims, axis=1, kind="stable")[:, :k]
+        model.neighbor_scores = np.take_along_axis(sims, model.neighbor_indices, axis=1)
+    return model
+
+
+def cf_model(factors) -> CollaborativeModel:
+    """A CollaborativeModel on these item factors: MovieLens IDs 11.., TMDB IDs 101.."""
+    model = CollaborativeModel()
+    model.normed_factors = normalize_factors(factors)
+    model.idx_to_movie = np.arange(11, 11 + len(factors), dtype=np.int32)
+    model.movie_to_idx = IdMap.from_pairs(model.idx_to_movie, np.arange(len(factors)))
+    model.tmdb_to_ml = IdMap.from_pairs(model.idx_to_movie + 90, model.idx_to_movie)
+    model.ml_to_tmdb = IdMap.from_pairs(model.idx_to_movie, model.idx_to_movie + 90)
+    return model
+
+
+def toy_recommender() -> SimilarMovies:
+    """SimilarMovies on the toy content + collaborative models (no catalogue: metadata from TMDB)."""
+    recommender = SimilarMovies()
+    recommender.cb_model = content_model(k=3)
+    recommender.cf_model = cf_model(np.random.default_rng(1).normal(size=(6, 4)))
+    recommender._loaded = True
+    return recommender
+
+
+@contextmanager
+def fake_openai(filters: dict, delay: float = 0.0, semantic_cache=None):
+    """Answer every mood-parsing OpenAI call with these filters, with an empty mood cache; yields the calls."""
+    calls = []
+
+    def response():
+        call = SimpleNamespace(arguments=json.dumps(filters))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(function_call=call))])
+
+    def create(**kwargs):
+        calls.append(kwargs["messages"][-1]["content"])
+        time.sleep(delay)
+        return response()
+
+    async def acreate(**kwargs):
+        calls.append(kwargs["messages"][-1]["content"])
+        await asyncio.sleep(delay)
+        return response()
+
+    saved = mood_parser._client, mood_parser._async_client, mood_parser._mood_cache, mood_parser._semantic_cache
+    mood_parser._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    mood_parser._async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=acreate)))
+    mood_parser._mood_cache, mood_parser._semantic_cache = LRUCache(), semantic_cache
+    try:
+        yield calls
+    finally:
+        mood_parser._client, mood_parser._async_client, mood_parser._mood_cache, mood_parser._semantic_cache = saved
+
+
+# ─── Micro-Tests ──────────────────────────────────────────────────────────────
+
+def test_u01():
+    """U-01: 10 movies at 0.1 s each take ~0.1 s; order kept; a failed call falls back to Discover data."""
+    movies = [discover_result(i) for i in range(10, 20)]
+    with fake_tmdb(tmdb_answer, delay=0.1) as calls:
+        t0 = time.time()
+        enriched = tmdb.enrich_movies(movies, include_providers=True)
+        elapsed = time.time() - t0
+
+    print(f"  {len(calls)} calls in {elapsed:.2f}s")
+    assert elapsed < 0.5
+    assert [m["id"] for m in enriched] == list(range(10, 20))
+    assert enriched[0]["runtime"] == 110 and enriched[0]["providers"][0]["name"] == "Netflix"
+    assert enriched[3]["runtime"] == 0 and enriched[3]["providers"] == []  # Movie 13 failed
+
+
+def test_u02():
+    """U-02: 5 pipelines (0.1 s parse, 0.05 s per TMDB call) run side by side in about one pipeline's time."""
+    async def run_all():
+        return await asyncio.gather(
+            *(pipeline.run_recommendation(f"mood {i}", ranking="local") for i in range(5))
+        )
+
+    with fake_tmdb(tmdb_answer, delay=0.05), fake_parse({"with_genres": "35"}, delay=0.1):
+        t0 = time.time()
+        runs = asyncio.run(run_all())
+        elapsed = time.time() - t0
+
+    print(f"  5 pipelines in {elapsed:.2f}s")
+    assert elapsed < 0.6
+    for result in runs:
+        assert result["filters_applied"] == {"with_genres": "35"}
+        assert len(result["movies"]) == 5 and result["degraded"] == []
+
+
+def test_u03():
+    """U-03: expired rows miss, get_many/set_many batch, eviction bounds the size, stats are shared on flush."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "tmdb.sqlite"
+        cache = SQLiteCache(path, maxsize=50)
+        cache.set("a", {"x": 1}, ttl=60)
+        cache.set("gone", 1, ttl=-1)
+        assert cache.get("a") == {"x": 1} and cache.get("gone", "miss") == "miss"
+        assert cache.get_many(["a", "b", "gone"]) == {"a": {"x": 1}}
+        assert cache.get_many([]) == {}
+
+        # Lookups are plain reads: no transaction left open, counters buffered until the next flush
+        assert not cache._conn.in_transaction
+        other = SQLiteCache(path, maxsize=50)  # Another worker on the same file
+        assert other.info()["hits"] == 0
+        assert cache.info()["hits"] == 2 and other.info()["hits"] == 2
+
+        cache.set_many([(f"k{i}", i, None) for i in range(150)])
+        assert cache.info()["size"] == 50
+        print(f"  info: {cache.info()}")
+
+        # Async enrichment reads and writes the SQLite cache from worker threads only
+        class ThreadCheckedCache(SQLiteCache):
+            threads = set()
+
+            def get_many(self, keys):
+                self.threads.add(threading.current_thread())
+                return super().get_many(keys)
+
+            def set_many(self, entries):
+                self.threads.add(threading.current_thread())
+                super().set_many(entries)
+
+        with fake_tmdb(tmdb_answer) as calls:
+            tmdb._cache = ThreadCheckedCache(Path(tmp) / "movies.sqlite")
+            for _ in range(2):  # Second round: all hits
+                asyncio.run(tmdb.enrich_movies_async([discover_result(1), discover_result(2)], include_providers=True))
+            assert ThreadCheckedCache.threads and threading.main_thread() not in ThreadCheckedCache.threads
+            assert tmdb.get_movie_details(1)["runtime"] == 101  # Details part cached on its own
+            assert len(calls) == 2
+
+
+def test_u04():
+    """U-04: table lookups == live scoring for n <= K; n > K and unknown seeds still work."""
+    table, live = content_model(k=3), content_model()
+
+    for tmdb_id in (101, 202, 402):
+        assert table.get_similar(tmdb_id, n=1) == live.get_similar(tmdb_id, n=1)
+        # Zero-score ties may come in any order: compare the scores
+        scores = [[m["score"] for m in model.get_similar(tmdb_id, n=3)] for model in (table, live)]
+        assert scores[0] == scores[1]
+    assert table.get_similar(101, n=1)[0]["tmdb_id"] == 102
+    assert len(table.get_similar(101, n=5)) == 5  # Beyond K: live scoring
+    assert table.get_similar(999) == [] and table.get_similar(-1) == []
+
+    seeds = [301, 999, 201]
+    batch = table.get_similar_batch(seeds, n=1)
+    assert batch == [table.get_similar(301, n=1), [], table.get_similar(201, n=1)]
+    assert live.get_similar_batch(seeds, n=1) == batch
+    print(f"  101 → {table.get_similar(101, n=3)}")
+
+
+def test_u05():
+    """U-05: top_k matches argsort (1-D, 2-D, exclude, k capped); CF scores are cosines, zero rows stay zero."""
+    rng = np.random.default_rng(0)
+    scores = rng.random((4, 50))
+    assert list(top_k(scores[0], 5)) == list(np.argsort(-scores[0])[:5])
+    assert (top_k(scores, 5) == np.argsort(-scores, axis=1)[:, :5]).all()
+    assert 7 not in top_k(scores[0], 49, exclude=7) and len(top_k(scores[0], 100, exclude=7)) == 49
+    assert (top_k(scores, 3, exclude=[0, 1, 2, 3]) != np.arange(4)[:, None]).all()
+    assert top_k(scores[0][:1], 5, exclude=0).shape == (0,)
+
+    factors = rng.normal(size=(6, 4))
+    factors[5] = 0  # A movie nobody rated
+    model = cf_model(factors)
+
+    assert np.allclose(np.linalg.norm(model.normed_factors[:5], axis=1), 1) and not model.normed_factors[5].any()
+    liked = model.get_also_liked(101, n=3)
+    cosine = factors[1] @ factors[0] / (np.linalg.norm(factors[1]) * np.linalg.norm(factors[0]))
+    scores_by_id = {m["tmdb_id"]: m["score"] for m in model.get_also_liked(101, n=5)}
+    assert abs(scores_by_id[102] - round(float(cosine), 4)) < 1e-4 and scores_by_id[106] == 0.0
+    assert 101 not in scores_by_id and model.get_also_liked(999) == []
+    assert model.get_also_liked_batch([101, 999, 104], n=3) == [liked, [], model.get_also_liked(104, n=3)]
+    print(f"  101 → {liked}")
+
+
+def test_u06():
+    """U-06: each batch result == its single call; one metadata fetch per unique movie; bounds → 422."""
+    from fastapi.testclient import TestClient
+    import api
+
+    recommender = toy_recommender()
+    seeds = [101, 202, 999]
+
+    with fake_tmdb(tmdb_answer) as calls:
+        batch = recommender.get_recommendations_batch(seeds, n=3)["results"]
+        batch_calls = len(calls)
+        singles = [recommender.get_recommendations(tmdb_id, n=3) for tmdb_id in seeds]
+    assert batch == singles
+    recommended = {m["id"] for r in batch for m in r["similar_movies"] + r["viewers_also_liked"]}
+    assert batch_calls == len(recommended) and batch[2]["similar_movies"] == []
+    print(f"  {len(seeds)} seeds, {batch_calls} metadata calls")
+
+    saved = api._ml_recommender
+    api._ml_recommender = recommender
+    try:
+        with fake_tmdb(tmdb_answer):
+            client = TestClient(api.app)
+            assert client.post("/movies/similar:batch", json={"tmdb_ids": seeds, "n": 20}).json()["count"] == 3
+            for body in ({"tmdb_ids": seeds, "n": 0}, {"tmdb_ids": seeds, "n": 21},
+                         {"tmdb_ids": []}, {"tmdb_ids": list(range(51))}):
+                assert client.post("/movies/similar:batch", json=body).status_code == 422
+            assert client.get("/movie/101/similar", params={"n": 21}).status_code == 422
+    finally:
+        api._ml_recommender = saved
+
+
+def test_u07():
+    """U-07: arrays, CSR and mappings round-trip as memmaps; bad manifests fail loudly; models/ has no stray artifact."""
+    from scipy.sparse import csr_matrix
+
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            load_arrays(tmp, "x")
+            raise AssertionError("no manifest must fail")
+        except FileNotFoundError:
+            pass
+
+        factors = np.random.default_rng(2).random((5, 3)).astype(np.float32)
+        save_arrays(tmp, {"factors": factors})
+        save_csr(tmp, "tfidf", csr_matrix(np.eye(4)))
+        save_mapping(tmp, "ids", {603: 2571, 155: 58559})
+
+        (loaded,) = load_arrays(tmp, "factors")
+        assert isinstance(loaded, np.memmap) and (loaded == factors).all()
+        assert (load_csr(tmp, "tfidf").toarray() == np.eye(4)).all()
+        ids = load_mapping(tmp, "ids")
+        assert ids[603] == 2571 and ids.get(550) is None
+        try:
+            load_arrays(tmp, "missing")
+            raise AssertionError("unknown array must fail")
+        except KeyError:
+            pass
+
+        manifest_path = Path(tmp) / "manifest.json"
+        manifest = json.loads(manifest_path.read_text())
+        manifest_path.write_text(json.dumps({**manifest, "format_version": FORMAT_VERSION + 1}))
+        try:
+            load_arrays(tmp, "factors")
+            raise AssertionError("newer format must fail")
+        except ValueError:
+            pass
+
+    # Every shipped .npy is in the manifest and vice versa (no orphaned artifact)
+    manifest = json.loads((MODELS_DIR / "manifest.json").read_text())
+    assert {p.stem for p in MODELS_DIR.glob("*.npy")} == set(manifest["arrays"])
+    model = CollaborativeModel()
+    model.load()
+    assert isinstance(model.normed_factors, np.memmap)
+    print(f"  {len(manifest['arrays'])} arrays in models/manifest.json")
+
+
+def test_u08():
+    """U-08: last duplicate wins; keys outside int32 never alias a stored key; translate == get."""
+    pairs = {862: 1, 155: 58559, 603: 2571, 2**31 - 1: 7}
+    ids = IdMap.from_pairs([862, 155, 603, 862, 2**31 - 1], [99, 58559, 2571, 1, 7])  # 862 twice
+    assert len(ids) == 4 and ids[862] == 1 and 155 in ids and 550 not in ids
+
+    queries = [155, 550, 862, -1, 2**32 + 155, 2**31, -(2**31) - 1, 2**31 - 1, 2**40]
+    expected = [pairs.get(q, -1) for q in queries]
+    assert list(ids.translate(queries)) == expected
+    assert [ids.get(q, -1) for q in queries] == expected
+    assert list(ids.translate(np.array(queries, dtype=np.int64), missing=0)) == [max(v, 0) for v in expected]
+    assert ids.translate([]).shape == (0,)
+    try:
+        ids[2**32 + 155]
+        raise AssertionError("out-of-range key must raise KeyError")
+    except KeyError:
+        pass
+
+    empty = IdMap(np.array([], dtype=np.int32), np.array([], dtype=np.int32))
+    assert list(empty.translate([1, 2])) == [-1, -1] and empty.get(1) is None
+    print(f"  {queries} → {list(ids.translate(queries))}")
+
+
+def test_u09():
+    """U-09: every call goes through the same client; pool limits from env; close_clients() resets both clients."""
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers["authorization"])
+        return httpx.Response(200 if request.url.path.endswith("/ok") else 500, json={})
+
+    saved_env = dict(os.environ)
+    os.environ.update({"TMDB_API_KEY": "k", "TMDB_MAX_CONNECTIONS": "7", "TMDB_HTTP2": "0"})
+    try:
+        kwargs = tmdb._client_kwargs()
+        assert kwargs["http2"] is False and kwargs["limits"].max_connections == 7
+
+        asyncio.run(tmdb.close_clients())
+        client = tmdb._get_client()
+        assert tmdb._get_client() is client
+        client._transport = httpx.MockTransport(handler)  # Same pooled client, no network
+        assert tmdb._get_json("/ok") == {} and tmdb._get_json("/ok") == {}
+        assert seen == ["Bearer k", "Bearer k"]
+        try:
+            tmdb._get_json("/fail")
+            raise AssertionError("an HTTP 500 must raise")
+        except httpx.HTTPStatusError:
+            pass
+
+        asyncio.run(tmdb.close_clients())
+        assert tmdb._client is None and tmdb._async_client is None and client.is_closed
+        assert tmdb._get_client() is not client
+    finally:
+        asyncio.run(tmdb.close_clients())
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+
+def test_u10():
+    """U-10: one call per key in flight; errors reach every waiter; a cancelled waiter doesn't cancel it."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    flight, runs = SingleFlight(), []
+
+    def slow():
+        runs.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        assert list(pool.map(lambda _: flight.do("k", slow), range(10))) == ["result"] * 10
+    assert len(runs) == 1 and flight.shared == 9 and flight.info()["in_flight"] == 0
+    assert flight.do("k", slow) == "result" and len(runs) == 2  # Finished calls aren't reused
+
+    async def scenario():
+        aflight, aruns = AsyncSingleFlight(), []
+
+        async def call():
+            aruns.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        assert await asyncio.gather(*(aflight.do("k", call) for _ in range(50))) == ["result"] * 50
+        assert len(aruns) == 1 and aflight.shared == 49
+
+        errors = await asyncio.gather(*(aflight.do("e", boom) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(e, ValueError) for e in errors)
+
+        first = asyncio.ensure_future(aflight.do("c", call))
+        second = asyncio.ensure_future(aflight.do("c", call))
+        await asyncio.sleep(0.01)
+        first.cancel()  # Client disconnect
+        assert await second == "result"
+
+    asyncio.run(scenario())
+
+    async def same_mood():
+        mood = "Something cozy for a rainy sunday"
+        return await asyncio.gather(*(mood_parser.parse_mood_async(mood) for _ in range(20)))
+
+    with fake_openai({"with_genres": "35"}, delay=0.05) as calls:
+        assert asyncio.run(same_mood()) == [{"with_genres": "35"}] * 20
+    assert len(calls) == 1
+    print(f"  20 identical moods → {len(calls)} OpenAI call")
+
+
+def test_u11():
+    """U-11: hit → stale (served, refreshed behind) → hit; same mood in other case shares; degraded isn't cached."""
+    async def swr_scenario():
+        versions = []
+
+        async def compute():
+            versions.append(len(versions) + 1)
+            return {"version": versions[-1]}
+
+        swr = StaleWhileRevalidate(LRUCache(), ttl=0.05, stale_ttl=10)
+        assert await swr.get_or_compute("k", compute) == ({"version": 1}, "miss")
+        assert await swr.get_or_compute("k", compute) == ({"version": 1}, "hit")
+        await asyncio.sleep(0.06)
+        assert await swr.get_or_compute("k", compute) == ({"version": 1}, "stale")
+        await asyncio.sleep(0.01)  # Background refresh
+        assert await swr.get_or_compute("k", compute) == ({"version": 2}, "hit")
+
+        async def failing():
+            raise httpx.ConnectError("down")
+
+        await asyncio.sleep(0.06)
+        assert (await swr.get_or_compute("k", failing))[1] == "stale"
+        await asyncio.sleep(0.01)  # Failed refresh: the stale entry stays
+        assert await swr.get_or_compute("k", compute) == ({"version": 2}, "stale")
+
+    asyncio.run(swr_scenario())
+
+    async def requests():
+        statuses = []
+        for mood, options, budget in [
+            ("Funny movie", {"ranking": "local"}, None),
+            ("  funny MOVIE ", {"ranking": "local"}, None),
+            ("funny movie", {"ranking": "local", "exclude_ids": [100]}, None),
+            ("sad movie", {"ranking": "local"}, 0.001),  # Out of budget: degraded
+            ("sad movie", {"ranking": "local"}, None),
+        ]:
+            result, status = await pipeline.recommend_cached(mood, options, budget_seconds=budget)
+            statuses.append((status, bool(result["degraded"])))
+        return statuses
+
+    saved = pipeline._response_cache
+    pipeline._response_cache = None
+    try:
+        with fake_tmdb(tmdb_answer), fake_parse({"with_genres": "35"}):
+            statuses = asyncio.run(requests())
+    finally:
+        pipeline._response_cache = saved
+    print(f"  {statuses}")
+    assert statuses == [("miss", False), ("hit", False), ("miss", False), ("miss", True), ("miss", False)]
+
+
+def test_u12():
+    """U-12: a value set by one worker is read by another (sync and async); stats are summed; down server = miss."""
+    try:
+        import fakeredis
+    except ImportError:
+        print("  skipped: fakeredis not installed")
+        return
+
+    server = fakeredis.FakeServer()
+    workers = [make_cache("redis", prefix="test:mood:") for _ in range(2)]
+    for worker in workers:
+        assert isinstance(worker, RedisCache)
+        worker._redis = fakeredis.FakeRedis(server=server)
+
+    workers[0].set("funny movie", {"with_genres": "35"}, ttl=60)
+    workers[0].set("short-lived", 1, ttl=0.01)
+    assert workers[1].get("funny movie") == {"with_genres": "35"} and workers[1].get("nope") is None
+
+    async def async_worker():
+        for worker in workers:  # Async clients belong to the running event loop
+            worker._async_redis = fakeredis.FakeAsyncRedis(server=server)
+        await workers[1].aset("sad movie", {"with_genres": "18"})
+        return await workers[0].aget("funny movie"), await workers[0].aget("nope", "miss")
+
+    assert asyncio.run(async_worker()) == ({"with_genres": "35"}, "miss")
+    assert workers[0].get("sad movie") == {"with_genres": "18"}
+
+    time.sleep(0.02)
+    workers[0].info()  # Sends its buffered counts
+    info = workers[1].info()
+    print(f"  info: {info}")
+    assert info["hits"] == 3 and info["misses"] == 2 and info["size"] == 2  # short-lived expired
+
+    down = RedisCache("redis://127.0.0.1:1/0")
+    assert down.get("funny movie", "miss") == "miss" and down.info()["hits"] is None
+    down.set("funny movie", {})  # Logged, not raised
+    try:
+        make_cache("memcached")
+        raise AssertionError("unknown backend must fail")
+    except ValueError:
+        pass
+
+
+def test_u13():
+    """U-13: reworded mood → same filters; "not scary" ≠ "scary"; a refused match falls through; ring buffer."""
+    cache = SemanticCache(threshold=0.85, maxsize=2)
+    cache.set("cozy movie for a rainy sunday", {"with_genres": "35"})
+    value, score, matched = cache.get("a cozy rainy sunday movie")
+    assert value == {"with_genres": "35"} and score > 0.99 and matched == "cozy movie for a rainy sunday"
+
+    cache.set("something scary", {"with_genres": "27"})
+    assert cache.get("something not scary") is None
+    cache.set("a movie for tonight", {"with_genres": "18"})  # Filler words only: not stored
+    assert cache.get("movie tonight") is None and cache.info()["size"] == 2
+
+    assert cache.get("rainy sunday, cozy", accept=lambda mood, filters: False) is None
+    assert cache.info()["rejected"] == 1
+    cache.set("cozy movie for a rainy sunday", {"with_genres": "10751"})  # Updated in place
+    cache.set("heist with a twist", {"with_genres": "80"})  # Evicts the oldest ("cozy ...")
+    assert cache.get("cozy rainy sunday") is None and cache.info()["size"] == 2
+
+    # Through the mood parser: close enough, but other providers / actors → a new OpenAI call
+    moods = ["cozy movie for a rainy sunday on netflix", "a cozy rainy sunday movie on netflix",
+             "cozy movie for a rainy sunday on hulu"]
+    with fake_openai({"with_genres": "35", "with_watch_providers": "8"}, semantic_cache=SemanticCache(0.7)) as calls:
+        for mood in moods:
+            mood_parser.parse_mood(mood)
+    assert calls == [moods[0], moods[2]]
+
+    moods = ["a cozy rainy sunday movie with tom hanks", "a cozy rainy sunday movie with tom cruise"]
+    with fake_openai({"with_cast_names": "Tom Hanks"}, semantic_cache=SemanticCache(0.7)) as calls:
+        for mood in moods:
+            mood_parser.parse_mood(mood)
+    assert calls == moods
+    print(f"  info: {cache.info()}")
+
+
+def test_u14():
+    """U-14: genres/providers/decades/runtime parsed EN + FR; unknown words, negations, no genre → None (LLM)."""
+    rules = MoodRules(mood_parser.GENRE_MAP, mood_parser.PROVIDER_MAP, mood_parser.LANGUAGE_CODES)
+    defaults = {"vote_average_gte": 6.0, "sort_by": "popularity.desc"}
+
+    assert rules.parse("Comedy on Netflix") == {"with_genres": "35", "with_watch_providers": "8", **defaults}
+    assert rules.parse("Un film d'horreur des années 80") == {
+        "with_genres": "27", "release_date_gte": "1980-01-01", "release_date_lte": "1989-12-31", **defaults,
+    }
+    assert rules.parse("short korean thriller") == {
+        "with_genres": "53", "with_runtime_lte": 100, "with_original_language": "ko", **defaults,
+    }
+    assert rules.parse("comedy under 90 minutes")["with_runtime_lte"] == 90
+    assert rules.parse("romcom after 2015")["with_genres"] == "35|10749"
+    assert rules.parse("best sci-fi of the 90s")["sort_by"] == "vote_average.desc"
+    assert rules.parse("anime")["with_original_language"] == "ja"
+    for mood in ("cozy comedy", "no horror", "pas de romance", "movie on netflix", "french korean drama"):
+        assert rules.parse(mood) is None, mood
+    assert rules.info()["matched"] == 7 and rules.info()["escalated"] == 5
+
+    assert rules.hard_filters("something cozy on Netflix from the 90s") == {
+        "with_watch_providers": {"Netflix"}, "release_date_gte": "1990-01-01", "release_date_lte": "1999-12-31",
+    }
+    with fake_openai({"with_genres": "18"}) as calls:
+        assert mood_parser.parse_mood("comedy on netflix")["with_genres"] == "35"
+        assert mood_parser.parse_mood("cozy comedy") == {"with_genres": "18"}
+    assert calls == ["cozy comedy"]
+
+
+def test_u15():
+    """U-15: the comedy on Netflix wins over better-rated off-filter movies; duplicates dropped; templated why."""
+    def candidate(movie_id, genres, rating, runtime=100, providers=()):
+        return {"id": movie_id, "title": f"Movie {movie_id}", "genres": genres, "rating": rating, "runtime": runtime,
+                "overview": "", "providers": [{"name": name, "logo_url": None} for name in providers]}
+
+    candidates = [
+        candidate(1, ["Drama"], 9.0, providers=["Hulu"]),
+        candidate(2, ["Comedy"], 7.0, providers=["Netflix"]),
+        candidate(3, ["Comedy"], 7.0, runtime=200, providers=["Netflix"]),
+        candidate(2, ["Comedy"], 7.0, providers=["Netflix"]),  # Duplicate
+        candidate(4, ["Comedy"], 7.5),
+    ]
+    filters = {"with_genres": "35", "with_watch_providers": "8", "with_runtime_lte": 120}
+    picks = rank_movies_local("a funny movie on netflix", candidates, filters)
+
+    # 3 loses its tie with 2 on runtime (200 > 120) and trails 4 (no provider, better rating)
+    assert [m["id"] for m in picks] == [2, 4, 3, 1]
+    assert "streaming on Netflix" in picks[0]["why"] and picks[0]["why"].startswith("A comedy pick")
+    assert rank_movies_local("une comédie sur netflix", candidates, filters)[0]["why"].startswith("Un film comique")
+    assert rank_movies_local("anything", [], filters) == []
+    print(f"  #1: {picks[0]['why']}")
+
+
+def test_u16():
+    """U-16: event order filters → candidate* → pick* → done; a failing stage ends the stream with an error event."""
+    from fastapi.testclient import TestClient
+    import api
+
+    async def first_event(calls):
+        stream = pipeline.stream_recommendation("funny", ranking="local")
+        event = await anext(stream)
+        made = len(calls)
+        await stream.aclose()
+        return event, made
+
+    def events(body):
+        with TestClient(api.app).stream("POST", "/recommend/stream", json=body) as resp:
+            assert resp.headers["content-type"].startswith("text/event-stream")
+            text = "".join(resp.iter_text())
+        return [
+            (block.split("\n")[0].removeprefix("event: "), json.loads(block.split("\n")[1].removeprefix("data: ")))
+            for block in text.strip().split("\n\n")
+        ]
+
+    with fake_tmdb(tmdb_answer) as calls, fake_parse({"with_genres": "35"}):
+        assert asyncio.run(first_event(calls)) == (("filters", {"with_genres": "35"}), 0)
+        stream = events({"mood": "funny", "ranking": "local"})
+    names = [name for name, _ in stream]
+    assert names == ["filters"] + ["candidate"] * 20 + ["pick"] * 5 + ["done"]
+    assert stream[-1][1]["count"] == 5
+
+    def down(path, params):
+        raise httpx.ConnectError("down")
+
+    with fake_tmdb(down), fake_parse({"with_genres": "35"}):
+        stream = events({"mood": "funny", "ranking": "local"})
+    assert [name for name, _ in stream] == ["filters", "error"]
+    print(f"  error event: {stream[-1][1]}")
+
+
+def test_u17():
+    """U-17: cumulative buckets, +Inf == count; /movie/{id} templated; breakdowns per request, /similar included."""
+    observe("watchnext_stage_seconds", 0.02, stage="unit_test")
+    observe("watchnext_stage_seconds", 3.0, stage="unit_test")
+    count_upstream("tmdb", "/movie/603/watch/providers")
+    text = render()
+    assert 'watchnext_stage_seconds_bucket{stage="unit_test",le="0.01"} 0' in text
+    assert 'watchnext_stage_seconds_bucket{stage="unit_test",le="0.025"} 1' in text
+    assert 'watchnext_stage_seconds_bucket{stage="unit_test",le="5.0"} 2' in text
+    assert 'watchnext_stage_seconds_bucket{stage="unit_test",le="+Inf"} 2' in text
+    assert 'endpoint="/movie/{id}/watch/providers"' in text and "/movie/603" not in text
+
+    async def request():
+        timings = start_timings()
+        with stage_timer("outer"):
+            await pipeline.run_recommendation("funny", ranking="local")
+        return timings
+
+    with fake_tmdb(tmdb_answer), fake_parse({"with_genres": "35"}):
+        timings = asyncio.run(request())
+        similar_timings = start_timings()  # This thread's context: a /similar request
+        toy_recommender().get_recommendations(101, n=3)
+    assert {"outer", "discover_movies", "enrich_movies", "rank_movies_local"} <= set(timings["stages_ms"])
+    assert timings["upstream_calls"] == {"tmdb": 21}  # Discover page 1 + 20 movies, from tasks too
+    assert {"similar", "similar_score", "similar_metadata"} <= set(similar_timings["stages_ms"])
+    print(f"  stages: {timings['stages_ms']}")
+
+
+def test_u18():
+    """U-18: a 0.4 s straggler among 0.01 s calls is dropped at the 0.1 s deadline, yet still fills the cache."""
+    movies = [discover_result(i) for i in range(20, 30)]
+
+    async def get_json_async(path, params=None):
+        await asyncio.sleep(0.4 if path == "/movie/29" else 0.01)
+        return movie_payload(int(path.split("/")[2]))
+
+    async def collect(**kwargs):
+        t0 = time.time()
+        order = [i async for i, _ in tmdb.iter_enriched_async(movies, include_providers=True, **kwargs)]
+        elapsed = time.time() - t0
+        await asyncio.sleep(0.4)  # Let the straggler's call finish
+        return order, elapsed
+
+    with fake_tmdb(tmdb_answer):
+        tmdb._get_json_async = get_json_async
+        order, elapsed = asyncio.run(collect(min_ready=5, deadline=0.1))
+        straggler_cached = tmdb._get_cache().get("details:29") is not None
+        all_order, _ = asyncio.run(collect())
+    print(f"  {len(order)}/10 movies in {elapsed:.2f}s")
+    assert sorted(order) == list(range(9)) and elapsed < 0.3
+    assert straggler_cached
+    assert sorted(all_order) == list(range(10))
+
+
+def test_u19():
+    """U-19: slow parse → default filters; slow enrichment → Discover data; slow Discover → empty; all within budget."""
+    budget = Budget(0.05)
+    assert budget.remaining(reserve=1.0) == 0.0
+
+    async def too_slow():
+        try:
+            await budget.run(asyncio.sleep(1))
+            raise AssertionError("must time out")
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(too_slow())
+
+    def slow(prefix):
+        async def get_json_async(path, params=None):
+            await asyncio.sleep(5 if path.startswith(prefix) else 0.01)
+            return tmdb_answer(path, params)
+        return get_json_async
+
+    def run(parse_delay, slow_prefix):
+        with fake_tmdb(tmdb_answer), fake_parse({"with_genres": "35"}, delay=parse_delay):
+            tmdb._get_json_async = slow(slow_prefix)
+            t0 = time.time()
+            result = asyncio.run(pipeline.run_recommendation("funny", budget=Budget(1.0)))
+            return result, time.time() - t0
+
+    result, elapsed = run(parse_delay=5, slow_prefix="/none")
+    assert result["filters_applied"] == pipeline.FALLBACK_FILTERS and len(result["movies"]) == 5
+    assert [d["stage"] for d in result["degraded"]] == ["parse_mood", "rank_movies"] and elapsed < 1.2
+
+    result, elapsed = run(parse_delay=0, slow_prefix="/movie/")
+    stages = [d["stage"] for d in result["degraded"]]
+    assert "enrich_movies" in stages and len(result["movies"]) == 5 and elapsed < 1.2
+    assert all(movie["runtime"] == 0 for movie in result["movies"])  # Discover-only data
+
+    result, elapsed = run(parse_delay=0, slow_prefix="/discover/")
+    assert result["movies"] == [] and [d["stage"] for d in result["degraded"]] == ["discover_movies"]
+    assert elapsed < 1.2
+    print(f"  degraded: {result['degraded']}")
+
+
+def test_u20():
+    """U-20: details + providers in one call; parts served separately; a missing part or fresh=True refetches."""
+    with fake_tmdb(tmdb_answer) as calls:
+        movie = tmdb.get_movie(603)
+        assert calls == [("/movie/603", {"language": "en-US", "append_to_response": "watch/providers"})]
+        assert movie["details"]["runtime"] == 703 and "watch/providers" not in movie["details"]
+        assert tmdb.get_movie_details(603)["runtime"] == 703
+        assert tmdb.get_watch_providers(603)[0]["name"] == "Netflix"
+        assert asyncio.run(tmdb.get_movie_async(603)) == movie
+        assert len(calls) == 1
+
+        tmdb._get_cache().set("providers:604", {"results": {}})  # Providers known, details not
+        tmdb.get_movie(604)
+        tmdb.get_movie_details(603, fresh=True)
+        assert [path for path, _ in calls[1:]] == ["/movie/604", "/movie/603"]
+        assert "append_to_response" not in calls[-1][1]
+    assert not hasattr(tmdb, "get_movie_details_async") and not hasattr(tmdb, "get_watch_providers_async")
+
+
+def test_u21():
+    """U-21: known titles cost no call; unknown ones are fetched once and written through; stale ones refreshed."""
+    with tempfile.TemporaryDirectory() as tmp, fake_tmdb(tmdb_answer) as calls:
+        recommender = toy_recommender()
+        recommender.catalog = Catalog(Path(tmp) / CATALOG_FILE)
+        rails = recommender.get_recommendations(101, n=3)
+        ids = {m["id"] for m in rails["similar_movies"] + rails["viewers_also_liked"]}
+        assert len(calls) == len(ids) and len(recommender.catalog) == len(ids)  # Written through
+
+        # From the catalogue now: same entries as parsed from the TMDB answers
+        assert recommender.get_recommendations(101, n=3) == rails and len(calls) == len(ids)
+
+        stale_id = rails["similar_movies"][0]["id"]
+        recommender.catalog.put_many([{**movie_payload(stale_id), "title": "Old title"}], updated_at=0)
+        assert recommender.get_recommendations(101, n=3)["similar_movies"][0]["title"] == "Old title"
+        for _ in range(100):  # Background refresh (fresh=True: past the TMDB cache)
+            if not similar._refreshing:
+                break
+            time.sleep(0.01)
+        assert recommender.get_recommendations(101, n=3)["similar_movies"][0]["title"] == f"Movie {stale_id}"
+        assert len(calls) == len(ids) + 1
+        print(f"  catalogue: {recommender.catalog.info()}")
+
+    # No catalogue file: load() warns and leaves the rails on TMDB, without creating one
+    recommender = SimilarMovies()
+    recommender.load()
+    assert recommender.catalog is None and not (similar.MODELS_DIR / CATALOG_FILE).exists()
+    assert "convert_models.py --catalog" in (PROJECT_ROOT / "render.yaml").read_text()
+
+
+def test_u22():
+    """U-22: exact hit costs nothing; a search hit is remembered; misspellings match fuzzily, neighbours don't."""
+    async def resolve(*names):
+        return [await tmdb.resolve_person_async(name) for name in names]
+
+    with fake_tmdb(tmdb_answer) as calls:
+        assert asyncio.run(resolve("Tom Hanks", "  tom HANKS", "Tom Hank", "Nobody Known")) == [31, 31, 31, None]
+        assert [params["query"] for _, params in calls] == ["Tom Hanks", "Tom Hank", "Nobody Known"]
+        tmdb._people.add("Dan Stevenson", 122)
+        assert tmdb.resolve_person("Dan Stevens") == 121  # Search before fuzzy: 0.92 similar, another person
+        assert tmdb.resolve_person("Omar Sy") == 78423
+
+    with tempfile.TemporaryDirectory() as tmp, fake_tmdb(tmdb_answer) as calls:
+        writers = []
+        tmdb._people = PersonIndex(Path(tmp) / "people.sqlite")
+        add_many = tmdb._people.add_many
+        tmdb._people.add_many = lambda people: writers.append(threading.current_thread()) or add_many(people)
+
+        assert asyncio.run(tmdb.preload_people_async(2)) == 4  # Actors only
+        assert asyncio.run(tmdb.preload_people_async(2)) == 0 and len(calls) == 2  # Marker: skipped
+        assert writers and threading.main_thread() not in writers  # SQLite writes off the event loop
+
+        tmdb._people = PersonIndex(Path(tmp) / "people.sqlite")  # Restart / another worker
+        assert len(tmdb._people) == 4 and asyncio.run(tmdb.preload_people_async(2)) == 0
+        assert tmdb._people.lookup("omar sy") == 78423
+        asyncio.run(tmdb.preload_people_async(3))  # More pages than recorded: preloaded again
+        assert len(calls) == 5
+
+    def flaky(path, params):
+        if params.get("page") == 2:
+            raise httpx.ConnectError("down")
+        return tmdb_answer(path, params)
+
+    with fake_tmdb(flaky) as calls:
+        asyncio.run(tmdb.preload_people_async(2))
+        asyncio.run(tmdb.preload_people_async(2))  # Incomplete preload isn't recorded
+        assert len(calls) == 4
+    print(f"  people: {tmdb._people.info()}")
+
+
+def test_u23():
+    """U-23: page 1 first, then the missing pages together; exclude_ids and total_pages respected; sync == async."""
+    def pages(calls):
+        return [params["page"] for path, params in calls if path == "/discover/movie"]
+
+    with fake_tmdb(tmdb_answer, delay=0.05) as calls:
+        movies = asyncio.run(tmdb.discover_movies_async({"with_genres": "35"}, limit=20))
+        assert [m["id"] for m in movies] == list(range(100, 120)) and pages(calls) == [1]
+
+        t0 = time.time()
+        excluded = {100, 101, 102, 203}
+        movies = asyncio.run(tmdb.discover_movies_async({"with_genres": "18"}, limit=50, exclude_ids=excluded))
+        elapsed = time.time() - t0
+        assert pages(calls)[1:] == [1, 2, 3] and elapsed < 0.15  # Pages 2 and 3 together
+        ids = [m["id"] for m in movies]
+        assert len(ids) == len(set(ids)) == 50 and not excluded & set(ids)
+
+        everything = asyncio.run(tmdb.discover_movies_async({"with_genres": "27"}, limit=100))
+        assert len(everything) == 60 and pages(calls)[4:] == [1, 2, 3]  # total_pages is 3
+
+        del calls[:]
+        assert tmdb.discover_movies({"with_genres": "18"}, limit=50, exclude_ids=excluded) == movies
+        assert calls == []  # Same pages, from the Discover cache
+
+        asyncio.run(tmdb.discover_movies_async({"with_genres": "53", "with_cast_names": "Tom Hanks, Omar Sy"}))
+        assert calls[-1][1]["with_cast"] == "31|78423"
+    print(f"  50 movies over 3 pages in {elapsed:.2f}s")
+
+
+def test_u24():
+    """U-24: 6 == 6.0 == "6.0" and "35|10749" == "10749|35" share a key; log rotates; warm-up fills the cache."""
+    key = tmdb._discover_key
+    assert key({"vote_average.gte": 6, "page": 1}) == key({"vote_average.gte": "6.0", "page": 1.0})
+    assert key({"with_genres": "35|10749"}) == key({"with_genres": "10749|35"})
+    assert key({"with_genres": "35,18|27"}) == key({"with_genres": "27|18,35"})
+    assert key({"with_genres": "35|10749"}) != key({"with_genres": "35,10749"})  # Either vs both
+    assert key({"vote_average.gte": 6}) != key({"vote_average.gte": 6.5})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = str(Path(tmp) / "requests.log")
+        saved_max = request_log.REQUEST_LOG_MAX_BYTES
+        request_log.REQUEST_LOG_MAX_BYTES = 200
+        try:
+            for filters in [{"with_genres": "35"}] * 3 + [{"with_genres": "18", "sort_by": None}] * 2:
+                request_log.record(filters, path=log)
+            assert not os.path.exists(log)  # record() only buffers
+
+            async def flusher():
+                task = asyncio.create_task(request_log.flush_periodically(every=0.01))
+                await asyncio.sleep(0.05)
+                task.cancel()
+
+            asyncio.run(flusher())
+            for filters in [{"with_genres": "27"}] * 10:
+                request_log.record(filters, path=log)
+            request_log.flush()
+            request_log.record({"with_genres": "27"}, path=log)
+            request_log.flush()  # Log past 200 bytes: rotated to requests.log.1 before this write
+            with open(log, "a") as f:
+                f.write('{"with_genres": "2')  # Torn line
+        finally:
+            request_log.REQUEST_LOG_MAX_BYTES = saved_max
+        assert os.path.exists(log + ".1")
+        top = request_log.top_signatures(3, path=log)
+        assert top == [{"with_genres": "27"}, {"with_genres": "35"}, {"with_genres": "18"}]
+
+    with fake_tmdb(tmdb_answer) as calls:
+        assert asyncio.run(tmdb.warm_discover_cache_async(top)) == 3
+        warmed = len(calls)
+        asyncio.run(tmdb.discover_movies_async({"with_genres": "35"}, limit=20))
+        assert len(calls) == warmed  # Served from the warmed cache
+    print(f"  top signatures: {top}")
+
+
+def test_u25():
+    """U-25: search == brute force (OR/AND lists, ranges on the sort column, unknown runtime); fallbacks."""
+    rng = np.random.default_rng(0)
+    movies = [index_record({
+        "id": i,
+        "genre_ids": [int(g) for g in rng.choice([18, 35, 27, 10749], size=rng.integers(0, 3), replace=False)],
+        "vote_average": round(float(rng.uniform(4, 9)), 1),
+        "vote_count": int(rng.integers(0, 500)),
+        "popularity": float(rng.uniform(0, 100)),
+        "release_date": "" if i % 17 == 0 else f"{rng.integers(1970, 2025)}-0{rng.integers(1, 10)}-15",
+        "runtime": 0 if i % 13 == 0 else int(rng.integers(70, 180)),
+        "original_language": str(rng.choice(["en", "fr", "ko"])),
+        "provider_ids": [int(p) for p in rng.choice([8, 337, 9], size=rng.integers(0, 3), replace=False)],
+    }) for i in range(1, 2001)]
+    index = CatalogIndex(movies)
+
+    def brute(filters, limit):
+        def either(value, have):
+            return any(all(int(x) in have for x in group.split(",")) for group in str(value).split("|"))
+
+        def keep(m):
+            date = int(m["release_date"].replace("-", "") or 0)
+            return (m["vote_count"] >= 50
+                    and ("with_genres" not in filters or either(filters["with_genres"], m["genre_ids"]))
+                    and ("with_watch_providers" not in filters or either(filters["with_watch_providers"], m["provider_ids"]))
+                    and filters.get("with_original_language", m["original_language"]) == m["original_language"]
+                    and m["vote_average"] >= float(filters.get("vote_average_gte", 0)) - 1e-6
+                    and ("with_runtime_gte" not in filters or 0 < m["runtime"] and m["runtime"] >= filters["with_runtime_gte"])
+                    and ("with_runtime_lte" not in filters or 0 < m["runtime"] <= filters["with_runtime_lte"])
+                    and ("release_date_gte" not in filters or 0 < date and date >= int(filters["release_date_gte"].replace("-", "")))
+                    and ("release_date_lte" not in filters or 0 < date <= int(filters["release_date_lte"].replace("-", ""))))
+
+        field, _, direction = filters.get("sort_by", "popularity.desc").partition(".")
+        field = "release_date" if field == "primary_release_date" else field
+        kept = sorted((m for m in movies if keep(m)), key=lambda m: m[field], reverse=direction == "desc")
+        return [m[field] for m in kept[:limit]]
+
+    queries = [
+        {"with_genres": "35|10749", "vote_average_gte": 6.5},
+        {"with_genres": "35,18", "sort_by": "vote_average.desc", "vote_average_gte": 7.1},  # Range on the sort column
+        {"with_runtime_lte": 100, "sort_by": "primary_release_date.asc"},  # Unknown runtime / date never match
+        {"with_watch_providers": "8|337", "with_original_language": "fr", "sort_by": "vote_count.asc"},
+        {"release_date_gte": "2000-01-01", "release_date_lte": "2010-12-31", "sort_by": "release_date.desc"},
+        {"with_genres": "99"},  # Unknown genre
+    ]
+    for filters in queries:
+        field = filters.get("sort_by", "popularity").partition(".")[0].replace("primary_", "")
+        got = [m[field] for m in index.search(filters, limit=50)]
+        assert got == brute(filters, 50), filters  # Same sort values (ties may come in any order)
+
+    top = index.search({"with_genres": "35"}, limit=5)
+    assert not {m["id"] for m in top} & {m["id"] for m in index.search({"with_genres": "35"}, 5, exclude_ids={m["id"] for m in top})}
+    assert index.search({"with_cast": "31"}) is None  # Cast filters go to TMDB
+    assert index.search({"sort_by": "revenue.desc"}) is None
+    assert index.search({"with_genres": "35", "with_keywords": None}) is not None  # Empty values are ignored
+
+    # _discover_local: fewer than CATALOG_INDEX_MIN_RESULTS movies → TMDB; a replaced mirror is reloaded
+    with tempfile.TemporaryDirectory() as tmp, fake_tmdb(tmdb_answer) as calls:
+        path = Path(tmp) / "mirror.jsonl"
+        path.write_text("".join(json.dumps(m) + "\n" for m in movies[:100]))
+        saved = tmdb.CATALOG_INDEX_PATH, tmdb._catalog_index, tmdb._catalog_index_mtime
+        tmdb.CATALOG_INDEX_PATH = str(path)
+        try:
+            tmdb.load_catalog_index()
+            assert len(tmdb.discover_movies({"with_genres": "35|18|27|10749"}, limit=10)) == 10
+            assert calls == []  # Answered locally
+            tmdb.discover_movies({"with_genres": "35", "with_original_language": "ko", "vote_average_gte": 8.9}, limit=10)
+            assert len(calls) >= 1  # Too few local matches
+            path.write_text("".join(json.dumps(m) + "\n" for m in movies))
+            os.utime(path, (time.time() + 5, time.time() + 5))
+            tmdb._get_catalog_index()
+            for _ in range(100):
+                if len(tmdb._catalog_index) == len(movies):
+                    break
+                time.sleep(0.02)
+            assert len(tmdb._catalog_index) == len(movies)
+        finally:
+            tmdb.CATALOG_INDEX_PATH, tmdb._catalog_index, tmdb._catalog_index_mtime = saved
+    print(f"  {len(queries)} queries match the brute-force scan over {len(movies)} movies")
+
+
+# Run all tests
+if __name__ == "__main__":
+    print("=" * 60)
+    print("WatchNext — Unit Micro-Tests")
+    print("=" * 60)
+
+    tests = [
+        ("U-01", "Concurrent enrichment", test_u01),
+        ("U-02", "Async pipeline", test_u02),
+        ("U-03", "SQLite TMDB cache", test_u03),
+        ("U-04", "Content neighbour table", test_u04),
+        ("U-05", "Top-k + normalised CF factors", test_u05),
+        ("U-06", "Batch similarity", test_u06),
+        ("U-07", "Model artifacts", test_u07),
+        ("U-08", "Array-backed ID map", test_u08),
+        ("U-09", "Pooled TMDB client", test_u09),
+        ("U-10", "Singleflight", test_u10),
+        ("U-11", "Response cache", test_u11),
+        ("U-12", "Shared Redis mood cache", test_u12),
+        ("U-13", "Semantic mood cache", test_u13),
+        ("U-14", "Rule-based mood parser", test_u14),
+        ("U-15", "Local ranker", test_u15),
+        ("U-16", "SSE streaming", test_u16),
+        ("U-17", "Stage metrics", test_u17),
+        ("U-18", "Early-start enrichment", test_u18),
+        ("U-19", "Request budget", test_u19),
+        ("U-20", "Single-call enrichment", test_u20),
+        ("U-21", "Local movie catalogue", test_u21),
+        ("U-22", "Person ID resolution", test_u22),
+        ("U-23", "Multi-page Discover", test_u23),
+        ("U-24", "Discover cache + request log", test_u24),
+        ("U-25", "Catalogue index", test_u25),
+    ]
+
+    for test_id, desc, fn in tests:
+        print(f"\n--- {test_id}: {desc} ---")
+        try:
+            fn()
+            passed = True
+        except Exception as e:
+            passed = False
+            print(f"  ERROR: {type(e).__name__}: {e}")
+        results[test_id] = "PASS" if passed else "FAIL"
+        print(f"  → {results[test_id]}")
+
+    print("\n" + "=" * 60)
+    print("RESULTS")
+    print("=" * 60)
+    for test_id, result in results.items():
+        print(f"  {test_id}: {result}")
+    total_pass = sum(1 for r in results.values() if r == "PASS")
+    print(f"\n  {total_pass}/{len(results)} PASS")
+    print(f"  Gate: {'PASS' if total_pass == len(results) else 'FAIL'}")
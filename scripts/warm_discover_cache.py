@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+WatchNext — Warm the Discover cache from the request log
+
+Reads the filter dicts logged by /recommend (REQUEST_LOG_PATH, see
+core/request_log.py), and fetches the Discover pages of the N most common
+ones into the TMDB cache. Only useful with a shared cache (TMDB_CACHE_PATH):
+the API warms its own in-process cache at startup already.
+
+Run it from cron a little more often than DISCOVER_CACHE_TTL (default 6 h)
+so the popular filter space never expires.
+
+Usage: python scripts/warm_discover_cache.py [N]   (default DISCOVER_WARMUP_TOP)
+"""
+
+import sys
+import asyncio
+import logging
+from pathlib import Path
+from dotenv import load_dotenv
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+async def warm(n):
+    from core.request_log import REQUEST_LOG_PATH, top_signatures
+    from core.tmdb_client import close_clients, open_clients, warm_discover_cache_async
+
+    signatures = top_signatures(n)
+    print(f"  {len(signatures)} filter signatures from {REQUEST_LOG_PATH}")
+    open_clients()
+    try:
+        warmed = await warm_discover_cache_async(signatures)
+    finally:
+        await close_clients()
+    print(f"  {warmed} cached")
+
+
+def main():
+    load_dotenv(PROJECT_ROOT / ".env")
+    logging.basicConfig(level=logging.INFO)
+
+    from core.request_log import REQUEST_LOG_PATH
+    from core.tmdb_client import DISCOVER_WARMUP_TOP
+
+    if not REQUEST_LOG_PATH:
+        print("REQUEST_LOG_PATH is not set — no request log to warm the cache from")
+        sys.exit(1)
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DISCOVER_WARMUP_TOP
+    print(f"Warming the Discover cache with the top {n} filter signatures")
+    asyncio.run(warm(n))
+
+
+if __name__ == "__main__":
+    # Add project root to path so we can import core
+    sys.path.insert(0, str(PROJECT_ROOT))
+    main()